@@ -12,11 +12,13 @@
     Instead of reloading individual modules simply reload(abc_pipe)
     This will require you to do an initial import for telims_pipe, but
     after that you will not need to reload individual modules, only the
-    root module 'abc_pipe'.
+    root module 'abc_pipe'. Only the modules changed on disk, and the ones
+    importing them, are reloaded (see pipe_utils/module_reloader.py).
 
 This __init__ is for transport. If placed in maya/scripts directory, you
-can simply: import abc_pipe. This __init__ will automatically append
-the path to rigging_tools inside the sys.path list.
+can simply: import abc_pipe. This __init__ will automatically make the
+pipe importable, through the import index (see pipe_core/import_index.py)
+rather than its directories on sys.path.
 """
 
 #------------------------------------------------------------------------------#
@@ -26,20 +28,15 @@ the path to rigging_tools inside the sys.path list.
 from maya import cmds
 
 # internal
-import sys
 import settings
 
 #------------------------------------------------------------------------------#
 #--------------------------------------------------------------------- START --#
 
-# add telims_pipe to the PYTHONPATH variable for this session
-sys.path.append(settings.root_path)
-for directory in settings.directories:
-    sys.path.append(directory)
-
-# reset all modules
-if globals().has_key('init_modules'):
-    for m in [x for x in sys.modules.keys() if x not in init_modules]:
-        del(sys.modules[m])
-else:
-    init_modules = sys.modules.keys()
+# serve the pipe's imports from the import index for this session
+from pipe_core import import_index
+import_index.install(cmds.internalVar(upd=True) + import_index.CACHE_FILE)
+
+# reload the modules that changed since the last import, and their dependents
+from pipe_utils import module_reloader
+module_reloader.reload_changed()
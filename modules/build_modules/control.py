@@ -13,6 +13,11 @@
     ctrl_class = control.Control(asset, side, part, size, color)
     ctrl_class.circle()
 
+    # many controls at once, straight from the shape library
+    controls = control.Control.create_many([
+        {"asset": "kong", "side": "l", "part": "finger", "shape": "cube"},
+        {"asset": "kong", "side": "r", "part": "finger", "size": 2}])
+
 """
 
 #------------------------------------------------------------------------------#
@@ -20,10 +25,21 @@
 
 # built-in
 import pymel.core as pm
+from maya import OpenMaya
+
+# internal
+from modules.build_modules import shape_library
 
 # external
-from pipe_utils import xform_utils
-from pipe_utils.name_utils import NameUtils
+from pipe_utils import api_undo
+from pipe_utils.name_utils import NameIndex
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+# color: (override color, left, right), None where the side is not used
+COLORS = {"yellow": (17, None, None), "blue": (None, 6, 13),
+          "red": (None, 13, 6)}
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
@@ -49,73 +65,101 @@ class Control(object):
         self.ctrl_grp = None
         self.ctrl_name = None
 
-    def circle(self):
+    @classmethod
+    def create_many(cls, specs):
         """
-        Builds a circle control.
+        Builds many controls in one pass, returns the Control objects, with
+        ctrl and ctrl_grp as full path names.
+        @params:
+            specs: List of dicts of Control arguments, plus "shape" (see
+                   shape_library.shape_names(), defaults to "circle").
+        NOTES:
+            The transforms come from one MDagModifier, the controls are one
+            undo entry (see pipe_utils.api_undo).
         """
-        self._build_name()
-        if self.ctrl_name:
-            self.ctrl = pm.circle(n=self.ctrl_name, ch=0, o=1, nr=[1, 0, 0])[0]
-
-        self._finalize_ctrl()
-
-    def _build_name(self):
+        controls = list()
+        shapes = list()
+        for spec in specs:
+            spec = dict(spec)
+            shapes.append(spec.pop("shape", "circle"))
+            controls.append(cls(**spec))
+        cls._build_many(controls, shapes)
+        return controls
+
+    @classmethod
+    def _build_many(cls, controls, shapes):
         """
-        Builds the name of the control.
+        Builds the ctrl, zero group and shape of each control.
         """
-        self.ctrl_name = NameUtils.get_unique_name(self.asset,
-                                                   self.side,
-                                                   self.part,
-                                                   "ctrl")
+        # every name up front, ctrl then zero group, like xform_utils.zero
+        index = NameIndex()
+        modifier = OpenMaya.MDagModifier()
+        transforms = list()
+        for control in controls:
+            control.ctrl_name = index.get_unique_name(control.asset,
+                                                      control.side,
+                                                      control.part, "ctrl")
+            group_name = index.get_unique_name(control.asset, control.side,
+                                               control.part, "grp")
+            group = modifier.createNode("transform")
+            modifier.renameNode(group, group_name)
+            ctrl = modifier.createNode("transform", group)
+            modifier.renameNode(ctrl, control.ctrl_name)
+            transforms.append((group, ctrl))
+
+        # shapes, built sized and aimed, with the transforms on undo/redo
+        curves = list()
+        def add_shapes():
+            for control, shape, (group, ctrl) in zip(controls, shapes,
+                                                     transforms):
+                curve = shape_library.create(shape, ctrl, control.size,
+                                             control.aim_axis)
+                curve_fn = OpenMaya.MFnDagNode(curve)
+                curve_fn.setName(control.ctrl_name + "Shape")
+                color = control._get_color_index()
+                if color is not None:
+                    curve_fn.findPlug("overrideEnabled").setBool(True)
+                    curve_fn.findPlug("overrideColor").setInt(color)
+                curves.append(curve)
+
+        def remove_shapes():
+            shape_modifier = OpenMaya.MDagModifier()
+            for curve in curves:
+                shape_modifier.deleteNode(curve)
+            shape_modifier.doIt()
+            del curves[:]
+
+        api_undo.do_it(modifier, add_shapes, remove_shapes)
+        for control, (group, ctrl) in zip(controls, transforms):
+            control.ctrl = OpenMaya.MFnDagNode(ctrl).fullPathName()
+            control.ctrl_grp = OpenMaya.MFnDagNode(group).fullPathName()
 
-    def _finalize_ctrl(self):
+    def circle(self):
         """
-        Orientates, scales and zeroes out the control.
+        Builds a circle control.
         """
-        self._aim_ctrl()
-        self._set_ctrl_color()
-
-        if self.size != 1:
-            for shape in self.ctrl.getShapes():
-                pm.scale(shape.cv, self.size, self.size, self.size, r=1)
-            pm.delete(self.ctrl, ch=1)
+        self.build("circle")
 
-        self.ctrl_grp = xform_utils.zero(self.ctrl)
-
-    def _aim_ctrl(self):
+    def build(self, shape="circle"):
         """
-        Aims control based on a provided aim axis.
+        Builds the control from the shape library, zeroed out.
+        @params:
+            shape: See shape_library.shape_names().
         """
-        y = 0
-        z = 0
-
-        if self.aim_axis == "y":
-            z = 90
-        elif self.aim_axis == "z":
-            y = -90
+        self._build_many([self], [shape])
+        self.ctrl = pm.PyNode(self.ctrl)
+        self.ctrl_grp = pm.PyNode(self.ctrl_grp)
 
-        for shape in self.ctrl.getShapes():
-            pm.rotate(shape.cv, 0, y, z, r=1)
-
-    def _set_ctrl_color(self):
+    def _get_color_index(self):
         """
-        Sets the color of the control object.
+        Returns the override color of the control, None if it has none.
         """
-        for shape in self.ctrl.getShapes():
-            if self.color == "yellow":
-                shape.overrideEnabled.set(True)
-                shape.overrideColor.set(17)
-            elif self.color == "blue":
-                if self.side == "l":
-                    shape.overrideEnabled.set(True)
-                    shape.overrideColor.set(6)
-                elif self.side == "r":
-                    shape.overrideEnabled.set(True)
-                    shape.overrideColor.set(13)
-            elif self.color == "red":
-                if self.side == "l":
-                    shape.overrideEnabled.set(True)
-                    shape.overrideColor.set(13)
-                elif self.side == "r":
-                    shape.overrideEnabled.set(True)
-                    shape.overrideColor.set(6)
+        if self.color not in COLORS:
+            return None
+        color, left, right = COLORS[self.color]
+        if self.side == "l":
+            return left or color
+        elif self.side == "r":
+            return right or color
+        return color
+
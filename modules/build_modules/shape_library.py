@@ -0,0 +1,166 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Library of control shapes, kept as plain CV/knot data.
+
+    The circle is built in, every curve shape of mel/wireShape.mel (arrow,
+    cross, square, cube, orient, bulb, sphere, plus) is read from the
+    script once and cached. Shapes are built straight from the data with
+    MFnNurbsCurve.create, size and aim already in the points, so there is
+    no per-CV scale/rotate and no history to delete afterwards.
+
+:use:
+    from modules.build_modules import shape_library
+    print shape_library.shape_names()
+    shape = shape_library.create("cube", transform, size=2, aim_axis="y")
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import re
+import math
+
+# third-party
+from maya import OpenMaya
+
+# internal
+import settings
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+WIRE_SHAPE = settings.MEL + "wireShape.mel"
+
+# maya's 8 section circle, radius 1, normal y
+CIRCLE_POINTS = ((0.7836, 0, -0.7836), (0, 0, -1.1082), (-0.7836, 0, -0.7836),
+                 (-1.1082, 0, 0), (-0.7836, 0, 0.7836), (0, 0, 1.1082),
+                 (0.7836, 0, 0.7836), (1.1082, 0, 0))
+
+# aim axis: (rotate y, rotate z), the x axis is the shape's own
+AIM_ROTATIONS = {"x": (0, 0), "y": (0, 90), "z": (-90, 0)}
+
+# {name: {"degree": int, "periodic": bool, "points": [], "knots": []}}
+_SHAPES = dict()
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def shape_names():
+    """
+    Returns the names of every shape in the library.
+    """
+    return sorted(_get_shapes())
+
+def get_shape(name):
+    """
+    Returns the data of a shape.
+    """
+    shapes = _get_shapes()
+    if name not in shapes:
+        raise KeyError("No control shape named {0}".format(name))
+    return shapes[name]
+
+def get_points(name, size=1, aim_axis="x"):
+    """
+    Returns the CVs of a shape as an MPointArray, scaled and aimed.
+    @params:
+        name: Shape name, see shape_names().
+        size: Uniform scale.
+        aim_axis: Axis the shape faces, "x", "y" or "z".
+    """
+    rotate_y, rotate_z = AIM_ROTATIONS[aim_axis]
+    rotation = OpenMaya.MEulerRotation(0, math.radians(rotate_y),
+                                       math.radians(rotate_z)).asMatrix()
+    points = OpenMaya.MPointArray()
+    for x, y, z in get_shape(name)["points"]:
+        points.append(OpenMaya.MPoint(x * size, y * size, z * size) *
+                      rotation)
+    return points
+
+def create(name, parent, size=1, aim_axis="x"):
+    """
+    Builds a shape under a transform, returns the shape's MObject.
+    @params:
+        name: Shape name, see shape_names().
+        parent: MObject of the transform.
+        size: Uniform scale.
+        aim_axis: Axis the shape faces, "x", "y" or "z".
+    """
+    shape = get_shape(name)
+    knots = OpenMaya.MDoubleArray()
+    for knot in shape["knots"]:
+        knots.append(knot)
+    form = OpenMaya.MFnNurbsCurve.kOpen
+    if shape["periodic"]:
+        form = OpenMaya.MFnNurbsCurve.kPeriodic
+
+    curve_fn = OpenMaya.MFnNurbsCurve()
+    return curve_fn.create(get_points(name, size, aim_axis), knots,
+                           shape["degree"], form, False, False, parent)
+
+def _get_shapes():
+    """
+    Fills the cache on first use.
+    """
+    if not _SHAPES:
+        _SHAPES.update(_circles())
+        _SHAPES.update(_read_wire_shapes(WIRE_SHAPE))
+    return _SHAPES
+
+def _circles():
+    """
+    The circle in each plane, "circle" faces x like pm.circle(nr=[1, 0, 0]).
+    """
+    # periodic, the first degree points close the curve
+    points = list(CIRCLE_POINTS) + list(CIRCLE_POINTS[:3])
+    knots = [float(knot) for knot in xrange(-2, 11)]
+    planes = {"circleY": lambda x, y, z: (x, y, z),
+              "circleX": lambda x, y, z: (y, x, z),
+              "circleZ": lambda x, y, z: (x, z, y)}
+
+    circles = dict()
+    for name, swap in planes.iteritems():
+        circles[name] = {"degree": 3, "periodic": True, "knots": knots,
+                         "points": [swap(*point) for point in points]}
+    circles["circle"] = circles["circleX"]
+    return circles
+
+def _read_wire_shapes(path):
+    """
+    Reads the curve shapes of wireShape.mel, {name: shape data}.
+    """
+    with open(path) as mel_file:
+        script = mel_file.read()
+
+    shapes = dict()
+    names = list()
+    for line in script.splitlines():
+        case = re.search(r'case "(\w+)"', line)
+        if case:
+            names.append(case.group(1))
+            continue
+        if "break" in line:
+            names = list()
+            continue
+
+        command = re.search(r"`curve (.*?)`", line)
+        if not command:
+            continue
+        flags = command.group(1)
+        numbers = r"(-?[\d.]+)"
+        degree = int(re.search(r"-d " + numbers, flags).group(1))
+        points = re.findall(r"-p {0} {0} {0}".format(numbers), flags)
+        knots = re.findall(r"-k " + numbers, flags)
+        for name in names:
+            shapes[name] = {
+                "degree": degree, "periodic": False,
+                "points": [tuple(float(v) for v in p) for p in points],
+                "knots": [float(knot) for knot in knots]}
+    return shapes
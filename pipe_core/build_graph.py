@@ -0,0 +1,465 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Dependency ordered rig builds.
+
+    Every step declares what it needs and what it makes, as keys, i.e.,
+    "hooks.spine", "joints.l_arm", "controls.l_hand". The graph orders the
+    steps so each one runs after the steps making its inputs, then runs
+    them all in one undo chunk with the viewport and evaluation suspended,
+    timing each step and counting the nodes it created.
+
+    A step's build function gets the build context, a dict of every output
+    made so far, and returns a dict of its own outputs. API edits in a
+    step go through pipe_utils.api_undo, so the whole run undoes at once.
+
+    Module files found by BuildSession declare the same at module level:
+        INPUTS = ["hooks.spine"]
+        OUTPUTS = ["hooks.l_arm", "joints.l_arm"]
+        GUIDES = ["l_arm_guide", "l_elbow_guide", "l_wrist_guide"]
+        def build(context):
+            ...
+            return {"hooks.l_arm": hooks, "joints.l_arm": joints}
+
+    Checkpoints: with a checkpoint directory, each step is hashed (its
+    source file, its settings, its guide matrices, the inputs given in the
+    context and the hashes of the steps it depends on). After a step
+    builds, the nodes it made are exported with its outputs, incoming
+    connections and the parents of its roots under other steps' nodes. On
+    the next run a step whose hash is unchanged is restored from that file
+    instead of built, a change rebuilds the step and everything downstream
+    of it.
+
+:use:
+    from pipe_core import build_graph, build_session
+    graph = build_graph.BuildGraph()
+    graph.add("spine", spine.build, outputs=["hooks.spine"])
+    graph.add("l_arm", arm.build, ["hooks.spine"], ["hooks.l_arm"], side="l")
+    graph.add("l_hand", hand.build, ["hooks.l_arm"], side="l")
+    context = graph.run()
+    graph.print_report()
+
+    # incremental, unchanged steps come back from their checkpoint
+    context = graph.run(checkpoints="D:/kong/rig_checkpoints")
+
+    # every module BuildSession found
+    session = build_session.BuildSession()
+    graph = build_graph.BuildGraph.from_session(session)
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import imp
+import json
+import timeit
+import hashlib
+import inspect
+
+# third-party
+from maya import cmds, OpenMaya
+
+# external
+from pipe_utils import api_undo
+from pipe_utils.decorators import undo, viewport_off, suspend_evaluation
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+MANIFEST = "checkpoints.json"
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class BuildStep(object):
+    """
+    One step of a build.
+    """
+    def __init__(self, name, build, inputs=None, outputs=None, guides=None,
+                 **kwargs):
+        """
+        @params:
+            name: Unique step name, i.e., "l_arm".
+            build: Function taking the build context (and kwargs),
+                   returning a dict of its outputs.
+            inputs: Keys it needs.
+            outputs: Keys it makes.
+            guides: Guide nodes it reads, part of its checkpoint hash.
+            kwargs: Passed on to build.
+        """
+        self.name = name
+        self.build = build
+        self.inputs = list(inputs or list())
+        self.outputs = list(outputs or list())
+        self.guides = list(guides or list())
+        self.kwargs = kwargs
+
+    def get_hash(self, upstream, provided=None):
+        """
+        Hash of everything the step's result depends on.
+        @params:
+            upstream: Hashes of the steps it depends on.
+            provided: {key: value} of its inputs no step makes, given in
+                      the context, i.e., a skeleton. Transforms named in
+                      them are hashed with their world matrices.
+        """
+        sha = hashlib.sha1()
+        try:
+            with open(inspect.getsourcefile(self.build), "rb") as source:
+                sha.update(source.read())
+        except (TypeError, IOError):
+            sha.update(repr(self.build))
+        sha.update(json.dumps(self.kwargs, sort_keys=True, default=str))
+        for guide in self.guides:
+            matrix = cmds.xform(guide, q=True, ws=True, m=True)
+            sha.update(json.dumps([round(value, 6) for value in matrix]))
+        for value in sorted(upstream):
+            sha.update(value)
+        if provided:
+            sha.update(json.dumps(provided, sort_keys=True, default=str))
+            for node in _get_transforms(provided.values()):
+                matrix = cmds.xform(node, q=True, ws=True, m=True)
+                sha.update(json.dumps([round(value, 6) for value in matrix]))
+        return sha.hexdigest()
+
+    def __repr__(self):
+        return "BuildStep({0})".format(self.name)
+
+
+class BuildGraph(object):
+    """
+    Orders and runs build steps.
+    """
+    def __init__(self):
+        self.steps = list()
+        self.report = list()
+
+    @classmethod
+    def from_session(cls, session, names=None):
+        """
+        Graph of the modules a BuildSession found, one step per module
+        declaring INPUTS, OUTPUTS and build().
+        @params:
+            session: pipe_core.build_session.BuildSession.
+            names: Module file names to use, defaults to all of them.
+        """
+        graph = cls()
+        for name in names or session.available_modules:
+            path = session.modules_dic[name]
+            module_name = os.path.splitext(name)[0]
+            module = imp.load_source(module_name, path)
+            if not hasattr(module, "build"):
+                continue
+            graph.add(module_name, module.build,
+                      getattr(module, "INPUTS", None),
+                      getattr(module, "OUTPUTS", None),
+                      getattr(module, "GUIDES", None))
+        return graph
+
+    def add(self, name, build, inputs=None, outputs=None, guides=None,
+            **kwargs):
+        """
+        Adds a step, returns it. See BuildStep.
+        """
+        if name in [step.name for step in self.steps]:
+            raise ValueError("Build step {0} already exists.".format(name))
+        step = BuildStep(name, build, inputs, outputs, guides, **kwargs)
+        self.steps.append(step)
+        return step
+
+    def get_makers(self):
+        """
+        Returns {key: name of the step making it}.
+        """
+        makers = dict()
+        for step in self.steps:
+            for output in step.outputs:
+                if output in makers:
+                    message = "{0} is made by both {1} and {2}."
+                    raise ValueError(message.format(output, makers[output],
+                                                    step.name))
+                makers[output] = step.name
+        return makers
+
+    def order(self, provided=None):
+        """
+        Returns the steps, every step after the steps making its inputs.
+        Steps with nothing between them keep the order they were added in.
+        @params:
+            provided: Keys available before the build, i.e., a skeleton.
+        """
+        provided = set(provided or list())
+        makers = self.get_makers()
+
+        # step: steps it waits on
+        waiting = dict()
+        for step in self.steps:
+            waiting[step.name] = set()
+            for key in step.inputs:
+                if key in makers:
+                    waiting[step.name].add(makers[key])
+                elif key not in provided:
+                    message = "Nothing makes {0}, needed by {1}."
+                    raise ValueError(message.format(key, step.name))
+
+        ordered = list()
+        done = set()
+        pending = list(self.steps)
+        while pending:
+            ready = [step for step in pending if waiting[step.name] <= done]
+            if not ready:
+                names = ", ".join(step.name for step in pending)
+                raise ValueError("Build steps depend on each other: " + names)
+            # one at a time keeps the added order among equals
+            step = ready[0]
+            ordered.append(step)
+            done.add(step.name)
+            pending.remove(step)
+        return ordered
+
+    def run(self, context=None, checkpoints=None):
+        """
+        Runs the steps in order, one undo chunk, viewport and evaluation
+        suspended. Returns the build context, the report is on self.report.
+        @params:
+            context: Outputs available before the build, {key: value}.
+            checkpoints: Checkpoint directory, restores unchanged steps
+                         and saves the built ones.
+        """
+        context = dict(context or dict())
+        steps = self.order(context)
+        self.report = list()
+
+        # loaded outside the undo chunk, steps' modifiers undo through it
+        api_undo.load_plugin()
+        self._run(steps, context, checkpoints)
+        return context
+
+    def print_report(self):
+        """
+        Prints the time and node count of every step of the last run.
+        """
+        total_time = 0.0
+        total_nodes = 0
+        for data in self.report:
+            step = data["step"]
+            if data.get("restored"):
+                step += " (restored)"
+            print "{0:<24} {1:>8.3f} sec {2:>7} nodes".format(
+                step, data["time"], data["nodes"])
+            total_time += data["time"]
+            total_nodes += data["nodes"]
+        print "{0:<24} {1:>8.3f} sec {2:>7} nodes".format("total", total_time,
+                                                         total_nodes)
+
+    @undo
+    @viewport_off
+    @suspend_evaluation
+    def _run(self, steps, context, checkpoints=None):
+        """
+        Runs the steps, tracking the nodes each makes with a node added
+        callback rather than scanning the scene around every step.
+        """
+        manifest = dict()
+        if checkpoints:
+            manifest = read_manifest(checkpoints)
+        makers = self.get_makers()
+        hashes = dict()
+
+        created = list()
+        def node_added(mobject, data):
+            created.append(OpenMaya.MObjectHandle(mobject))
+        callback = OpenMaya.MDGMessage.addNodeAddedCallback(node_added)
+
+        try:
+            for step in steps:
+                del created[:]
+                start = timeit.default_timer()
+
+                restored = False
+                if checkpoints:
+                    upstream = [hashes[makers[key]] for key in step.inputs
+                                if key in makers]
+                    provided = dict((key, context.get(key)) for key in
+                                    step.inputs if key not in makers)
+                    hashes[step.name] = step.get_hash(upstream, provided)
+                    checkpoint = manifest.get(step.name, dict())
+                    if checkpoint.get("hash") == hashes[step.name]:
+                        outputs = restore_checkpoint(checkpoints, checkpoint)
+                        restored = True
+                if not restored:
+                    outputs = step.build(context, **step.kwargs) or dict()
+                elapsed = timeit.default_timer() - start
+
+                missing = [key for key in step.outputs if key not in outputs]
+                if missing:
+                    message = "Build step {0} did not make {1}."
+                    raise ValueError(message.format(step.name,
+                                                    ", ".join(missing)))
+                context.update(outputs)
+                self.report.append({"step": step.name, "time": elapsed,
+                                    "nodes": len(created),
+                                    "restored": restored})
+
+                if checkpoints and not restored:
+                    nodes = [_get_name(handle) for handle in created
+                             if handle.isValid()]
+                    manifest[step.name] = save_checkpoint(
+                        checkpoints, step.name, hashes[step.name], nodes,
+                        dict((key, outputs[key]) for key in step.outputs))
+                    write_manifest(checkpoints, manifest)
+        finally:
+            OpenMaya.MMessage.removeCallback(callback)
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def read_manifest(directory):
+    """
+    Returns the checkpoints saved in a directory, {step: checkpoint}.
+    """
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return dict()
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+def write_manifest(directory, manifest):
+    with open(os.path.join(directory, MANIFEST), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4, sort_keys=True)
+
+def save_checkpoint(directory, name, step_hash, nodes, outputs):
+    """
+    Exports the nodes a step made, returns the checkpoint.
+    @params:
+        directory: Checkpoint directory.
+        name: Step name.
+        step_hash: See BuildStep.get_hash.
+        nodes: Nodes the step made.
+        outputs: The step's outputs, anything json can take.
+    """
+    checkpoint = {"hash": step_hash, "file": None, "outputs": outputs,
+                  "connections": list(), "parents": list()}
+    if not nodes:
+        return checkpoint
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    path = os.path.join(directory, name + ".ma")
+
+    # connections coming in from other steps are not in the export
+    connections = list()
+    node_set = set(cmds.ls(nodes))
+    plugs = cmds.listConnections(nodes, c=True, p=True, s=True, d=False,
+                                 sh=True) or list()
+    for destination, source in zip(plugs[::2], plugs[1::2]):
+        if source.split(".")[0] not in node_set:
+            connections.append((source, destination))
+
+    # roots parented under other steps' nodes, i.e., arm under spine,
+    # are exported from the world, the export would take their ancestors
+    long_names = set(cmds.ls(nodes, long=True))
+    roots = list()
+    for node in cmds.ls(nodes, long=True, type="transform"):
+        parent = node.rpartition("|")[0]
+        if parent and parent not in long_names:
+            roots.append((node, parent))
+    roots.sort(key=lambda root: root[0].count("|"))
+
+    # the nodes by object, their paths change when unparented
+    selection_list = OpenMaya.MSelectionList()
+    for node in nodes:
+        selection_list.add(node)
+
+    parents = list()
+    for node, parent in reversed(roots):
+        world_name = cmds.parent(node, world=True,
+                                 relative=True)[0].rpartition("|")[2]
+        parents.append((world_name, node.rpartition("|")[2], parent))
+    parents.reverse()
+    names = list()
+    try:
+        selection_list.getSelectionStrings(names)
+        selection = cmds.ls(sl=True)
+        cmds.select(names, r=True, ne=True)
+        cmds.file(path, force=True, exportSelected=True, type="mayaAscii",
+                  preserveReferences=False, constructionHistory=False,
+                  channels=True, constraints=True, expressions=True,
+                  shader=True)
+        cmds.select(selection, r=True)
+    finally:
+        _restore_parents(parents)
+
+    checkpoint["file"] = os.path.basename(path)
+    checkpoint["connections"] = connections
+    checkpoint["parents"] = parents
+    checkpoint["nodes"] = [name.rpartition("|")[2] for name in names]
+    return checkpoint
+
+def restore_checkpoint(directory, checkpoint):
+    """
+    Imports a step's nodes and reconnects them, returns its outputs.
+    Raises a RuntimeError if a name clash renamed any of them, its outputs,
+    connections and parents would point at the wrong nodes.
+    """
+    if not checkpoint["file"]:
+        return checkpoint["outputs"]
+    path = os.path.join(directory, checkpoint["file"])
+    new_nodes = cmds.file(path, i=True, type="mayaAscii", namespace=":",
+                          mergeNamespacesOnClash=True,
+                          preserveReferences=False, returnNewNodes=True)
+    imported = set(node.rpartition("|")[2] for node in new_nodes or list())
+    renamed = [name for name in checkpoint.get("nodes", list())
+               if name not in imported]
+    if renamed:
+        message = "Checkpoint {0} clashes with the scene, renamed {1}."
+        raise RuntimeError(message.format(checkpoint["file"],
+                                          ", ".join(renamed)))
+    _restore_parents(checkpoint.get("parents", list()))
+    for source, destination in checkpoint["connections"]:
+        cmds.connectAttr(source, destination, f=True)
+    return checkpoint["outputs"]
+
+def _restore_parents(parents):
+    """
+    Parents roots exported from the world back under their parents, in
+    order, shallowest first.
+    @params:
+        parents: [(name in the world, name, parent's full path)].
+    """
+    for world_name, name, parent in parents:
+        node = cmds.parent("|" + world_name, parent, relative=True)[0]
+        if world_name != name:
+            cmds.rename(node, name)
+
+def _get_transforms(values):
+    """
+    Existing transforms named in values, searched through lists and dicts.
+    """
+    names = list()
+    pending = list(values)
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        elif isinstance(value, basestring):
+            names.append(value)
+    names = [name for name in names if cmds.objExists(name)]
+    return sorted(set(cmds.ls(names, long=True, type="transform")))
+
+def _get_name(handle):
+    """
+    Full path of DAG nodes, name of the rest.
+    """
+    mobject = handle.object()
+    if mobject.hasFn(OpenMaya.MFn.kDagNode):
+        return OpenMaya.MFnDagNode(mobject).fullPathName()
+    return OpenMaya.MFnDependencyNode(mobject).name()
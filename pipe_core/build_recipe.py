@@ -0,0 +1,537 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Build recipes, for modules repeated many times (fingers, legs,
+    tentacles).
+
+    One module build is recorded as plain data: the nodes it made (type,
+    name, parent), their changed attribute values, dynamic attributes,
+    curve shapes and connections, plus where its root nodes sit. The
+    recipe is then replayed once per instance with other names and
+    placements. Every instance goes through the same few modifiers, so
+    building many instances costs a dict walk per node instead of the
+    module's own command calls.
+
+    Names are changed with string replacements, applied to node names,
+    external plugs and the recorded build outputs alike:
+        replace=[("_index", "_middle")]
+
+:use:
+    from pipe_core import build_recipe
+    recipe = build_recipe.record(finger.build, context, part="index")
+    outputs = recipe.replay_many([
+        {"replace": [("index", "middle")], "matrix": middle_offset},
+        {"replace": [("index", "ring")], "matrix": ring_offset}])
+    recipe.save("D:/kong/finger.json")
+
+    # as one build step
+    graph.add("l_fingers", build_recipe.instance_build(finger.build,
+              [{"part": "index"}, {"replace": [("index", "middle")]}]))
+
+:NOTES:
+    Mesh and surface shapes are not recorded, curves are. A replay is
+    one undo entry (see pipe_utils.api_undo). Lock, keyable and channel
+    box states are replayed after the values.
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import json
+
+# third-party
+from maya import cmds, OpenMaya
+
+# external
+from pipe_utils import api_undo, attr_schema
+from pipe_utils.name_utils import NameIndex
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+# dynamic attribute types replay can rebuild, see attr_schema
+DYNAMIC_TYPES = ("double", "float", "long", "bool", "enum")
+
+# local values of root transforms, replaced by the instance placement
+PLACED_ATTRIBUTES = set(attribute + axis for attribute in
+                        ("translate", "rotate", "scale", "shear",
+                         "jointOrient") for axis in "XYZ")
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def record(build, *args, **kwargs):
+    """
+    Runs a build and records what it made, returns the Recipe. The build's
+    return value is kept as the recipe's outputs.
+    """
+    created = list()
+    def node_added(mobject, data):
+        created.append(OpenMaya.MObjectHandle(mobject))
+    callback = OpenMaya.MDGMessage.addNodeAddedCallback(node_added)
+    try:
+        outputs = build(*args, **kwargs)
+    finally:
+        OpenMaya.MMessage.removeCallback(callback)
+
+    nodes = list()
+    for handle in created:
+        if not handle.isValid():
+            continue
+        mobject = handle.object()
+        if mobject.hasFn(OpenMaya.MFn.kDagNode):
+            nodes.append(OpenMaya.MFnDagNode(mobject).fullPathName())
+        else:
+            nodes.append(OpenMaya.MFnDependencyNode(mobject).name())
+    return Recipe.from_nodes(nodes, outputs)
+
+def instance_build(build, instances):
+    """
+    Returns a build function for BuildGraph, building the first instance
+    and replaying it for the others.
+    @params:
+        build: The module's build function.
+        instances: Dicts, the first holds the build's kwargs, the others
+                   are replay_many instances.
+    """
+    def build_instances(context):
+        recipe = record(build, context, **instances[0])
+        outputs = dict(recipe.outputs or dict())
+        for result in recipe.replay_many(instances[1:]):
+            outputs.update(result)
+        return outputs
+    return build_instances
+
+def replace_names(value, replace):
+    """
+    Applies string replacements to a name, or to the names in a list or
+    dict.
+    """
+    if isinstance(value, basestring):
+        for old, new in replace:
+            value = value.replace(old, new)
+        return value
+    if isinstance(value, (list, tuple)):
+        return [replace_names(item, replace) for item in value]
+    if isinstance(value, dict):
+        return dict((replace_names(key, replace),
+                     replace_names(item, replace))
+                    for key, item in value.iteritems())
+    return value
+
+def _get_mobject(name):
+    selection_list = OpenMaya.MSelectionList()
+    selection_list.add(name)
+    mobject = OpenMaya.MObject()
+    selection_list.getDependNode(0, mobject)
+    return mobject
+
+def _get_plugs(node, names):
+    """
+    MPlugs of a node's attributes, in the order of names.
+    """
+    return [attr_schema.get_plug("{0}.{1}".format(node, name))
+            for name in names]
+
+def _curve_data(curve):
+    """
+    Curve geometry as data for a shape's cached plug.
+    """
+    points = OpenMaya.MPointArray()
+    for point in curve["points"]:
+        points.append(OpenMaya.MPoint(*point))
+    knots = OpenMaya.MDoubleArray()
+    for knot in curve["knots"]:
+        knots.append(knot)
+    data = OpenMaya.MFnNurbsCurveData().create()
+    OpenMaya.MFnNurbsCurve().create(points, knots, curve["degree"],
+                                    curve["form"], False, False, data)
+    return data
+
+def _to_mmatrix(values):
+    matrix = OpenMaya.MMatrix()
+    OpenMaya.MScriptUtil.createMatrixFromList(list(values), matrix)
+    return matrix
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class Recipe(object):
+    """
+    A recorded module build.
+    """
+    def __init__(self, nodes=None, connections=None, outputs=None):
+        """
+        @params:
+            nodes: List of node dicts, parents before children.
+            connections: List of (source, destination), a plug is either
+                         [node index, attribute] or an external plug name.
+            outputs: The recorded build's outputs.
+        """
+        self.nodes = list(nodes or list())
+        self.connections = list(connections or list())
+        self.outputs = outputs
+
+    @classmethod
+    def from_nodes(cls, nodes, outputs=None):
+        """
+        Records existing nodes.
+        """
+        # parents before children, creation order otherwise
+        long_names = [cmds.ls(node, l=True)[0] for node in nodes]
+        long_names.sort(key=lambda node: node.count("|"))
+        index = dict((name, count) for count, name in enumerate(long_names))
+
+        recipe = cls(outputs=outputs)
+        for node in long_names:
+            data = {"type": cmds.nodeType(node),
+                    "name": node.split("|")[-1], "parent": None,
+                    "dag": node.startswith("|"), "world": None,
+                    "attributes": cls._read_attributes(node),
+                    "dynamic": cls._read_dynamic(node), "curve": None,
+                    "states": cls._read_states(node)}
+            if data["dag"]:
+                parent = node.rsplit("|", 1)[0]
+                if parent in index:
+                    data["parent"] = index[parent]
+                elif cmds.objectType(node, isAType="transform"):
+                    data["world"] = cmds.xform(node, q=True, ws=True, m=True)
+            if data["type"] == "nurbsCurve" and data["parent"] is not None:
+                data["curve"] = cls._read_curve(node)
+            recipe.nodes.append(data)
+
+        # connections into the recorded nodes
+        short_names = [cmds.ls(node)[0] for node in long_names]
+        short_index = dict((name, count) for count, name in
+                           enumerate(short_names))
+        for node in short_names:
+            plugs = cmds.listConnections(node, c=True, p=True, s=True,
+                                         d=False, sh=True) or list()
+            for destination, source in zip(plugs[::2], plugs[1::2]):
+                node_name, attribute = destination.split(".", 1)
+                destination = [short_index[node], attribute]
+                node_name, attribute = source.split(".", 1)
+                if node_name in short_index:
+                    source = [short_index[node_name], attribute]
+                recipe.connections.append((source, destination))
+        return recipe
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as recipe_file:
+            data = json.load(recipe_file)
+        return cls(data["nodes"], data["connections"], data["outputs"])
+
+    def save(self, path):
+        data = {"nodes": self.nodes, "connections": self.connections,
+                "outputs": self.outputs}
+        with open(path, "w") as recipe_file:
+            json.dump(data, recipe_file)
+
+    def replay(self, replace=None, matrix=None, parent=None, inputs=None):
+        """
+        Replays one instance, returns its outputs. See replay_many.
+        """
+        instance = {"replace": replace, "matrix": matrix, "parent": parent,
+                    "inputs": inputs}
+        return self.replay_many([instance])[0]
+
+    def replay_many(self, instances):
+        """
+        Replays the recipe once per instance, one undo entry, returns the
+        outputs per instance.
+        @params:
+            instances: List of dicts:
+                replace: List of (old, new) for names.
+                matrix: World offset of the instance from the recorded
+                        build, 16 floats.
+                parent: Parent of its root nodes, defaults to the world.
+                inputs: {recorded external plug: plug}, external plugs
+                        not given have replace applied.
+        """
+        names = NameIndex()
+        dg_modifier = OpenMaya.MDGModifier()
+        dag_modifier = OpenMaya.MDagModifier()
+
+        # nodes
+        built = list()
+        for instance in instances:
+            replace = instance.get("replace") or list()
+            parent = None
+            if instance.get("parent"):
+                parent = _get_mobject(instance["parent"])
+            objects = list()
+            for data in self.nodes:
+                name = self._unique_name(names, replace_names(data["name"],
+                                                             replace))
+                if not data["dag"]:
+                    mobject = dg_modifier.createNode(data["type"])
+                    dg_modifier.renameNode(mobject, name)
+                else:
+                    node_parent = parent
+                    if data["parent"] is not None:
+                        node_parent = objects[data["parent"]]
+                    if node_parent is None:
+                        mobject = dag_modifier.createNode(data["type"])
+                    else:
+                        mobject = dag_modifier.createNode(data["type"],
+                                                          node_parent)
+                    dag_modifier.renameNode(mobject, name)
+                objects.append(mobject)
+            built.append(objects)
+        dg_modifier.doIt()
+        dag_modifier.doIt()
+
+        # curve geometry, attributes, values, connections
+        modifier = OpenMaya.MDGModifier()
+        results = list()
+        for instance, objects in zip(instances, built):
+            replace = instance.get("replace") or list()
+            for data, mobject in zip(self.nodes, objects):
+                if data["curve"]:
+                    plug = OpenMaya.MFnDependencyNode(mobject).findPlug(
+                        "cached")
+                    modifier.newPlugValue(plug, _curve_data(data["curve"]))
+                for attribute in data["dynamic"]:
+                    modifier.addAttribute(
+                        mobject, attr_schema.create_attribute(attribute))
+            modifier.doIt()
+
+            plug_names = dict()
+            for count, mobject in enumerate(objects):
+                plug_names[count] = self._get_name(mobject)
+            for data, mobject in zip(self.nodes, objects):
+                node = self._get_name(mobject)
+                for attribute, value in data["attributes"].iteritems():
+                    if data["world"] and attribute in PLACED_ATTRIBUTES:
+                        continue
+                    plug = attr_schema.get_plug(node + "." + attribute)
+                    if plug.isLocked():
+                        continue
+                    if isinstance(value, bool):
+                        modifier.newPlugValueBool(plug, value)
+                    elif isinstance(value, (int, long)):
+                        modifier.newPlugValueInt(plug, value)
+                    else:
+                        modifier.newPlugValueDouble(plug, value)
+            inputs = instance.get("inputs") or dict()
+            for source, destination in self.connections:
+                if isinstance(source, list):
+                    source = "{0}.{1}".format(plug_names[source[0]],
+                                              source[1])
+                else:
+                    source = inputs.get(source,
+                                        replace_names(source, replace))
+                destination = "{0}.{1}".format(plug_names[destination[0]],
+                                               destination[1])
+                modifier.connect(attr_schema.get_plug(source),
+                                 attr_schema.get_plug(destination))
+            modifier.doIt()
+
+            # recorded names to the new ones
+            renamed = dict()
+            for count, data in enumerate(self.nodes):
+                renamed[data["name"]] = plug_names[count].split("|")[-1]
+            results.append(self._map_outputs(self.outputs, renamed,
+                                             replace))
+
+        # placements and channel states are plug edits, done again on redo,
+        # locks come off before undo
+        def finish():
+            for instance, objects in zip(instances, built):
+                self._place(objects, instance)
+                self._set_states(objects)
+
+        def unlock():
+            for objects in built:
+                self._set_states(objects, unlock=True)
+
+        def undo():
+            unlock()
+            modifier.undoIt()
+            dag_modifier.undoIt()
+            dg_modifier.undoIt()
+
+        def redo():
+            dg_modifier.doIt()
+            dag_modifier.doIt()
+            modifier.doIt()
+            finish()
+
+        finish()
+        api_undo.commit(undo, redo)
+        return results
+
+    def _place(self, objects, instance):
+        """
+        Moves the root transforms to the instance's placement.
+        """
+        offset = OpenMaya.MMatrix()
+        if instance.get("matrix"):
+            offset = _to_mmatrix(instance["matrix"])
+        for data, mobject in zip(self.nodes, objects):
+            if not data["world"]:
+                continue
+            world = _to_mmatrix(data["world"]) * offset
+            parent = OpenMaya.MMatrix()
+            if instance.get("parent"):
+                selection_list = OpenMaya.MSelectionList()
+                selection_list.add(instance["parent"])
+                dag_path = OpenMaya.MDagPath()
+                selection_list.getDagPath(0, dag_path)
+                parent = dag_path.inclusiveMatrix()
+            transform_fn = OpenMaya.MFnTransform(mobject)
+            transform_fn.set(OpenMaya.MTransformationMatrix(
+                world * parent.inverse()))
+
+    def _set_states(self, objects, unlock=False):
+        """
+        Applies the recorded lock, keyable and channel box states.
+        @params:
+            objects: The instance's nodes.
+            unlock: Only unlock the recorded locked plugs.
+        """
+        for data, mobject in zip(self.nodes, objects):
+            states = data.get("states")
+            if not states:
+                continue
+            node = self._get_name(mobject)
+            if unlock:
+                for plug in _get_plugs(node, states["locked"]):
+                    plug.setLocked(False)
+                continue
+
+            keyable = set(states["keyable"])
+            channel_box = set(states["channel_box"])
+            channels = keyable | channel_box
+            for flag in ("keyable", "channelBox"):
+                channels.update(cmds.listAttr(node, **{flag: True}) or
+                                list())
+            channels = sorted(channels)
+            for name, plug in zip(channels, _get_plugs(node, channels)):
+                plug.setKeyable(name in keyable)
+                if name not in keyable:
+                    plug.setChannelBox(name in channel_box)
+            for plug in _get_plugs(node, states["locked"]):
+                plug.setLocked(True)
+
+    def _map_outputs(self, value, renamed, replace):
+        """
+        Outputs of an instance, recorded node names swapped for new ones.
+        """
+        if isinstance(value, basestring):
+            node, dot, attribute = value.partition(".")
+            short_name = node.split("|")[-1]
+            if short_name in renamed:
+                return renamed[short_name] + dot + attribute
+            return replace_names(value, replace)
+        if isinstance(value, (list, tuple)):
+            return [self._map_outputs(item, renamed, replace)
+                    for item in value]
+        if isinstance(value, dict):
+            return dict((replace_names(key, replace),
+                         self._map_outputs(item, renamed, replace))
+                        for key, item in value.iteritems())
+        return value
+
+    def _unique_name(self, names, name):
+        unique_name = name
+        count = 1
+        while names.exists(unique_name):
+            count += 1
+            unique_name = "{0}{1}".format(name, count)
+        names.reserve(unique_name)
+        return unique_name
+
+    def _get_name(self, mobject):
+        if mobject.hasFn(OpenMaya.MFn.kDagNode):
+            return OpenMaya.MFnDagNode(mobject).fullPathName()
+        return OpenMaya.MFnDependencyNode(mobject).name()
+
+    @classmethod
+    def _read_attributes(cls, node):
+        """
+        Scalar attribute values that differ from their defaults.
+        """
+        attributes = dict()
+        names = cmds.listAttr(node, settable=True, scalar=True,
+                              write=True) or list()
+        for name in names:
+            plug = "{0}.{1}".format(node, name)
+            try:
+                value = cmds.getAttr(plug)
+                default = cmds.attributeQuery(name.split(".")[-1], node=node,
+                                              listDefault=True)
+            except (RuntimeError, TypeError, ValueError):
+                continue
+            if not isinstance(value, (bool, int, long, float)):
+                continue
+            if default and abs(float(value) - default[0]) < 1e-9:
+                continue
+            attributes[name] = value
+        return attributes
+
+    @classmethod
+    def _read_dynamic(cls, node):
+        """
+        Dynamic attributes as attr_schema declarations.
+        """
+        dynamic = list()
+        for name in cmds.listAttr(node, ud=True) or list():
+            if "." in name:
+                continue
+            attribute_type = cmds.attributeQuery(name, node=node,
+                                                 attributeType=True)
+            if attribute_type not in DYNAMIC_TYPES:
+                continue
+            data = {"name": name, "type": attribute_type, "default": None,
+                    "minimum": None, "maximum": None, "enum": None,
+                    "keyable": cmds.attributeQuery(name, node=node,
+                                                   keyable=True),
+                    "locked": cmds.getAttr(node + "." + name, lock=True)}
+            default = cmds.attributeQuery(name, node=node, listDefault=True)
+            if default:
+                data["default"] = default[0]
+            if attribute_type == "enum":
+                data["enum"] = cmds.attributeQuery(name, node=node,
+                                                   listEnum=True)[0]
+            else:
+                if cmds.attributeQuery(name, node=node, minExists=True):
+                    data["minimum"] = cmds.attributeQuery(
+                        name, node=node, minimum=True)[0]
+                if cmds.attributeQuery(name, node=node, maxExists=True):
+                    data["maximum"] = cmds.attributeQuery(
+                        name, node=node, maximum=True)[0]
+            dynamic.append(data)
+        return dynamic
+
+    @classmethod
+    def _read_states(cls, node):
+        """
+        Locked, keyable and channel box (non keyable, displayed) plugs.
+        """
+        return {"locked": cmds.listAttr(node, locked=True) or list(),
+                "keyable": cmds.listAttr(node, keyable=True) or list(),
+                "channel_box": cmds.listAttr(node, channelBox=True) or list()}
+
+    @classmethod
+    def _read_curve(cls, node):
+        """
+        The geometry of a curve shape.
+        """
+        curve_fn = OpenMaya.MFnNurbsCurve(_get_mobject(node))
+        points = OpenMaya.MPointArray()
+        curve_fn.getCVs(points)
+        knots = OpenMaya.MDoubleArray()
+        curve_fn.getKnots(knots)
+        return {"degree": curve_fn.degree(), "form": curve_fn.form(),
+                "points": [(points[count].x, points[count].y,
+                            points[count].z)
+                           for count in xrange(points.length())],
+                "knots": [knots[count] for count in xrange(knots.length())]}
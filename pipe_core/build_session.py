@@ -7,6 +7,10 @@
 
 :description:
     Responsible for finding all available modules.
+
+    Discovery goes through a ModuleRegistry cached in the Maya user prefs,
+    so opening the autorig only lists directories that changed, and module
+    metadata is there without importing the modules.
 """
 
 #------------------------------------------------------------------------------#
@@ -16,9 +20,17 @@
 import os
 import pymel.core as pm
 
+# internal
+from pipe_core.module_registry import ModuleRegistry
+
 # external
 import settings
 
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+CACHE_FILE = "telims_module_registry.json"
+
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
 
@@ -34,35 +46,39 @@ class BuildSession(object):
         self.exclude_dirs = ["build_modules"]
         self.exclude_files = ["__init__.py"]
         self.modules_dic = dict()
+        self.module_info = dict()
         self.available_modules = list()
+        self.registry = None
 
         # let's begin
         self._get_avaliable_modules()
 
+    def refresh(self, full=False):
+        """
+        Picks up new and changed modules.
+        @params:
+            full: Check every file, not only changed directories.
+        """
+        self.registry.refresh(full)
+        self._store_modules()
+
     def _get_avaliable_modules(self):
         """
         Looks for all the available modules.
         """
         path = settings.MODULES
         if os.path.exists(path):
-            self._check_path(path)
+            cache_path = os.path.join(pm.internalVar(userPrefDir=True),
+                                      CACHE_FILE)
+            self.registry = ModuleRegistry(path, cache_path,
+                                           self.exclude_dirs,
+                                           self.exclude_files)
+            self._store_modules()
 
-    def _check_path(self, path):
+    def _store_modules(self):
         """
-        Checks the given path for any py files.
+        Stores the registry's modules on the session.
         """
-        path_files = os.listdir(path)
-        modules = list()
-        for path_file in path_files:
-            # exclude directories
-            if os.path.isdir(path + path_file):
-                if path_file not in self.exclude_dirs:
-                    self._check_path(path + path_file)
-            # modules
-            if path_file.endswith(".py"):
-                if path_file not in self.exclude_files:
-                    modules.append(path_file)
-                    self.modules_dic[path_file] = path + path_file
-
-        # store the available modules
-        self.available_modules += modules
+        self.available_modules = sorted(self.registry.modules)
+        self.modules_dic = dict(self.registry.paths)
+        self.module_info = dict(self.registry.modules)
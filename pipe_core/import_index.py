@@ -0,0 +1,254 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Serves the pipeline's imports from an index of module name: file,
+    instead of putting the pipe's directories on sys.path.
+
+    With every directory on sys.path, each import in the session (Maya's
+    and other tools' too) stats every one of them, a few calls per
+    directory and per miss, all over the network share. The index is
+    built once by listing the code directories, kept in a cache file with
+    the mtime of every listed directory, and only built again when one of
+    those changed (a file added, removed or renamed).
+
+    One entry stands for the whole pipe on sys.path, where root_path used
+    to be, so the pipe's modules keep their priority behind Maya's own.
+    Its importer (sys.path_hooks) answers from the index with a dict
+    lookup, packages get the same kind of entry as their __path__. The
+    resource directories (images, icons, mel, shelves) are no longer on
+    sys.path at all.
+
+    Module names are the ones the old sys.path gave: the packages under
+    root_path (pipe_utils.name_utils), then the modules of each code
+    directory by themselves (name_utils), first one found wins.
+
+    Files added during the session are found once the index is refreshed,
+    install() again or reload(abc_pipe).
+
+    The source mtime of every module it loads is kept, so a module edited
+    after its import is known to be stale (see pipe_utils.module_reloader).
+
+    Run from the pipe archive (settings.ARCHIVE), install() does nothing,
+    zipimport keeps the archive's index in memory already.
+
+:use:
+    from pipe_core import import_index
+    import_index.install(cache_path)
+
+    # after adding a module
+    import_index.refresh()
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import sys
+import imp
+import json
+
+# internal
+import settings
+
+# external
+from pipe_core.module_registry import list_directory
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+CACHE_VERSION = 1
+CACHE_FILE = "abc_import_index.json"
+
+# the pipe's sys.path entry, packages get ENTRY + their directory
+ENTRY = "<abc_pipe_index>"
+
+# session state, kept if the module is reloaded, the index entry is the
+# only way to the pipe's modules on sys.path
+
+# module name: (file, is package)
+_INDEX = globals().get("_INDEX", dict())
+
+# the cache file of the last install
+_CACHE_PATH = globals().get("_CACHE_PATH", [None])
+
+# module name: source mtime when it was (re)loaded
+_LOADED = globals().get("_LOADED", dict())
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class IndexImporter(object):
+    """
+    PEP 302 importer for the index entries of sys.path.
+    """
+    def __init__(self, entry):
+        if not entry.startswith(ENTRY):
+            raise ImportError("Not an import index entry.")
+        self.entry = entry
+
+    def find_module(self, fullname, path=None):
+        if fullname in _INDEX:
+            return self
+        return None
+
+    def load_module(self, fullname):
+        """
+        Loads (or reloads) a module, compiled files are used and written
+        the same as a regular import.
+        """
+        path, is_package = _INDEX[fullname]
+        if is_package:
+            module = imp.load_module(fullname, None, path,
+                                     ("", "", imp.PKG_DIRECTORY))
+            module.__path__ = [ENTRY + path]
+        else:
+            module = imp.load_source(fullname, path)
+        module.__loader__ = self
+        _LOADED[fullname] = _get_mtime(path)
+        return module
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def install(cache_path=None):
+    """
+    Loads the index, building it if the tree changed, and swaps the pipe's
+    directories on sys.path for the index entry.
+    @params:
+        cache_path: The cache file, built every session if None.
+    """
+    if settings.ARCHIVE:
+        return
+    _CACHE_PATH[0] = cache_path
+    _INDEX.clear()
+    _INDEX.update(load_index(cache_path))
+
+    # a reloaded module brings a new importer, drop the old one
+    sys.path_hooks[:] = [hook for hook in sys.path_hooks
+                         if getattr(hook, "__name__", None) !=
+                         IndexImporter.__name__]
+    sys.path_hooks.insert(0, IndexImporter)
+    for entry in sys.path_importer_cache.keys():
+        if entry.startswith(ENTRY):
+            del sys.path_importer_cache[entry]
+
+    # the entry goes where root_path was
+    pipe_paths = set(_normalize(path) for path in
+                     (settings.root_path,) + settings.directories)
+    position = None
+    for count in reversed(range(len(sys.path))):
+        if sys.path[count] == ENTRY or \
+                _normalize(sys.path[count]) in pipe_paths:
+            position = count
+            del sys.path[count]
+    if position is None:
+        sys.path.append(ENTRY)
+    else:
+        sys.path.insert(position, ENTRY)
+
+def get_load_mtime(name):
+    """
+    Returns the source mtime of a module when the index loaded it, None if
+    it didn't load it.
+    """
+    return _LOADED.get(name)
+
+def refresh():
+    """
+    Checks the tree again, i.e., after adding a module this session.
+    """
+    _INDEX.clear()
+    _INDEX.update(load_index(_CACHE_PATH[0]))
+
+def load_index(cache_path=None):
+    """
+    Returns the index from the cache file, or built and cached if any
+    listed directory changed since.
+    """
+    root = _normalize(settings.root_path)
+    cache = _read_cache(cache_path)
+    if cache and cache.get("version") == CACHE_VERSION and \
+            cache.get("root") == root and \
+            _is_current(cache["directories"]):
+        return dict((name, tuple(value)) for name, value
+                    in cache["modules"].iteritems())
+
+    modules, directories = build_index()
+    _write_cache(cache_path, {"version": CACHE_VERSION, "root": root,
+                              "directories": directories,
+                              "modules": modules})
+    return modules
+
+def build_index():
+    """
+    Lists the code directories, returns ({module name: (file, is package)},
+    {directory: mtime}).
+    """
+    modules = dict()
+    directories = dict()
+    search_paths = [settings.root_path] + list(settings.code_directories)
+    for path in search_paths:
+        _scan(_normalize(path), "", modules, directories)
+    return modules, directories
+
+def _scan(directory, prefix, modules, directories):
+    """
+    Indexes the modules and packages of a directory, and of the packages
+    in it.
+    """
+    directories[directory] = os.path.getmtime(directory)
+    packages = list()
+    for name, is_dir, mtime in list_directory(directory):
+        path = os.path.join(directory, name)
+        if is_dir:
+            if os.path.isfile(os.path.join(path, "__init__.py")):
+                packages.append(name)
+                modules.setdefault(prefix + name, (path, True))
+        elif name.endswith(".py") and name != "__init__.py":
+            modules.setdefault(prefix + name[:-3], (path, False))
+
+    for name in packages:
+        _scan(os.path.join(directory, name), prefix + name + ".", modules,
+              directories)
+
+def _is_current(directories):
+    for directory, mtime in directories.iteritems():
+        try:
+            if os.path.getmtime(directory) != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+def _get_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def _normalize(path):
+    return os.path.normpath(os.path.abspath(path))
+
+def _read_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path) as cache_file:
+            return json.load(cache_file)
+    except (IOError, ValueError):
+        return None
+
+def _write_cache(cache_path, cache):
+    if not cache_path:
+        return
+    try:
+        with open(cache_path, "w") as cache_file:
+            json.dump(cache, cache_file)
+    except IOError:
+        pass
@@ -0,0 +1,213 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Registry of the autorig modules, read without importing them.
+
+    Module metadata is read from the module's source with ast, only
+    module level literals are used:
+        NAME = "Arm"
+        VERSION = "1.0.0"
+        INPUTS = ["hooks.spine"]
+        OUTPUTS = ["hooks.l_arm"]
+        GUIDES = ["l_arm_guide"]
+        HEADER_IMAGE = "armHeader.png"
+
+    Results are kept in a cache file with the mtime of every directory and
+    file. A directory whose mtime is unchanged is taken from the cache as
+    is, without listing it or touching its files. A changed directory is
+    listed again (scandir, when there is one) and only files whose mtime
+    changed are parsed again. Editing a file in place does not change its
+    directory's mtime, refresh(full=True) checks every file.
+
+:use:
+    from pipe_core import module_registry
+    registry = module_registry.ModuleRegistry(settings.MODULES, cache_path)
+    for name, info in registry.modules.iteritems():
+        print name, info["name"], info["version"], info["inputs"]
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import ast
+import json
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+CACHE_VERSION = 1
+
+# module level name: metadata key, default
+METADATA = (("NAME", "name", None), ("VERSION", "version", None),
+            ("INPUTS", "inputs", list()), ("OUTPUTS", "outputs", list()),
+            ("GUIDES", "guides", list()),
+            ("HEADER_IMAGE", "header_image", None))
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def read_metadata(path):
+    """
+    Reads a module's metadata from its source, without importing it.
+    """
+    info = dict((key, list(default) if isinstance(default, list) else
+                 default) for name, key, default in METADATA)
+    names = dict((name, key) for name, key, default in METADATA)
+    with open(path) as module_file:
+        try:
+            tree = ast.parse(module_file.read(), path)
+        except SyntaxError:
+            return info
+
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id in names:
+                try:
+                    info[names[target.id]] = ast.literal_eval(node.value)
+                except ValueError:
+                    pass
+    info["has_build"] = any(isinstance(node, ast.FunctionDef) and
+                            node.name == "build" for node in tree.body)
+    return info
+
+def list_directory(path):
+    """
+    Returns [(name, is directory, mtime)] of a directory, one listing.
+    """
+    entries = list()
+    if scandir:
+        for entry in scandir(path):
+            entries.append((entry.name, entry.is_dir(),
+                            entry.stat().st_mtime))
+        return entries
+
+    for name in os.listdir(path):
+        full_path = os.path.join(path, name)
+        entries.append((name, os.path.isdir(full_path),
+                        os.path.getmtime(full_path)))
+    return entries
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class ModuleRegistry(object):
+    """
+    The modules under a directory, with their metadata.
+    """
+    def __init__(self, root, cache_path=None, exclude_dirs=None,
+                 exclude_files=None):
+        """
+        @params:
+            root: Modules directory, i.e., settings.MODULES.
+            cache_path: The cache file, no cache if None.
+            exclude_dirs: Directory names to skip.
+            exclude_files: File names to skip.
+        """
+        self.root = os.path.normpath(root)
+        self.cache_path = cache_path
+        self.exclude_dirs = list(exclude_dirs or list())
+        self.exclude_files = list(exclude_files or list())
+
+        # {directory: {"mtime": float, "dirs": [], "files": {name: info}}}
+        self.directories = dict()
+        self.modules = dict()
+        self.paths = dict()
+
+        self._read_cache()
+        self.refresh()
+
+    def refresh(self, full=False):
+        """
+        Brings the registry up to date, writes the cache if anything changed.
+        @params:
+            full: Also check the mtime of every file in unchanged
+                  directories.
+        """
+        directories = dict()
+        changed = self._scan(self.root, directories, full)
+        removed = set(directories) != set(self.directories)
+        self.directories = directories
+        if changed or removed:
+            self._write_cache()
+
+        # flatten, file name: metadata
+        self.modules = dict()
+        self.paths = dict()
+        for directory in sorted(self.directories):
+            files = self.directories[directory]["files"]
+            for name in sorted(files):
+                self.modules[name] = files[name]
+                self.paths[name] = os.path.join(directory, name)
+
+    def _scan(self, directory, directories, full):
+        """
+        Scans a directory and the ones below it, returns True if anything
+        had to be read again.
+        """
+        cached = self.directories.get(directory)
+        mtime = os.path.getmtime(directory)
+        changed = False
+
+        if cached and cached["mtime"] == mtime and not full:
+            data = cached
+        else:
+            changed = True
+            cached_files = (cached or dict()).get("files", dict())
+            data = {"mtime": mtime, "dirs": list(), "files": dict()}
+            for name, is_dir, file_mtime in list_directory(directory):
+                if is_dir:
+                    if name not in self.exclude_dirs:
+                        data["dirs"].append(name)
+                    continue
+                if not name.endswith(".py") or name in self.exclude_files:
+                    continue
+                info = cached_files.get(name)
+                if not info or info["mtime"] != file_mtime:
+                    info = read_metadata(os.path.join(directory, name))
+                    info["mtime"] = file_mtime
+                data["files"][name] = info
+
+        directories[directory] = data
+        for name in data["dirs"]:
+            if self._scan(os.path.join(directory, name), directories, full):
+                changed = True
+        return changed
+
+    def _read_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except ValueError:
+            return
+        if cache.get("version") == CACHE_VERSION and \
+                cache.get("root") == self.root:
+            self.directories = cache["directories"]
+
+    def _write_cache(self):
+        if not self.cache_path:
+            return
+        cache = {"version": CACHE_VERSION, "root": self.root,
+                 "directories": self.directories}
+        try:
+            with open(self.cache_path, "w") as cache_file:
+                json.dump(cache, cache_file)
+        except IOError:
+            pass
@@ -99,7 +99,8 @@ class AutorigUI(MayaQWidgetDockableMixin, QtGui.QWidget):
         modules_menu_name = QtGui.QLabel('MODULES: ')
         modules_menu = QtGui.QComboBox()
         for module in self.build_session.available_modules:
-            modules_menu.addItem(module)
+            info = self.build_session.module_info.get(module, dict())
+            modules_menu.addItem(info.get("name") or module, module)
         modules_menu.setFixedWidth(200)
         modules_menu.setStyleSheet('background-color: #2f2f2f;')
         modules_menu_layout.addWidget(modules_menu_name)
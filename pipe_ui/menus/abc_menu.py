@@ -7,21 +7,45 @@
 
 :description:
     abc menu.
+
+    The menu is built from TOOLS, a static registry of labels and module
+    paths. A tool's module is only imported when its menu item is used,
+    then kept, so building the menu at startup pulls in no tool code,
+    PyMEL or PySide.
+
+:use:
+    from pipe_ui.menus import abc_menu
+    abc_menu.abc_menu()
+    abc_menu.launch("Overlap Tool")
 """
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- IMPORTS --#
 
+# built-in
+import importlib
+from functools import partial
+
 # third-party
-import pymel.core as pm
 from maya import cmds, mel
 
-# external
-from rig_tools import curve_joint_generator
-from pipe_ui import autorig_ui, joint_renamer_ui, overlap_tool_ui
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+# label, module, class, method called on the instance (None for none)
+TOOLS = (
+    ("Autorig V1", "pipe_ui.autorig_ui", "AutorigUI", "build_gui"),
+    ("Overlap Tool", "pipe_ui.overlap_tool_ui", "OverlapToolUI", None),
+    ("Joint Renamer", "pipe_ui.joint_renamer_ui", "JointRenamerUI", None),
+    ("Curve Joint Generator", "rig_tools.curve_joint_generator",
+     "CurveJointGenerator", None),
+    )
+
+# label: imported module
+_LOADED = dict()
 
 #------------------------------------------------------------------------------#
-#------------------------------------------------------------------- CLASSES --#
+#----------------------------------------------------------------- FUNCTIONS --#
 
 def abc_menu(*args):
     """
@@ -41,33 +65,46 @@ def abc_menu(*args):
     abc_menu = cmds.menu("ABC", parent=gMainWindow, label='ABC')
 
     # menu items
-    cmds.menuItem(parent=abc_menu, label='Autorig V1', c=autorig)
-    cmds.menuItem(parent=abc_menu, label='Overlap Tool', c=overlap_tool)
-    cmds.menuItem(parent=abc_menu, label='Joint Renamer', c=joint_renamer)
-    cmds.menuItem(parent=abc_menu, label='Curve Joint Generator',
-                  c=joints_on_a_curve)
+    for label, module_name, class_name, method in TOOLS:
+        cmds.menuItem(parent=abc_menu, label=label, c=partial(launch, label))
+
+def launch(label, *args):
+    """
+    Imports a tool on first use and opens it.
+    """
+    for tool_label, module_name, class_name, method in TOOLS:
+        if tool_label == label:
+            break
+    else:
+        return cmds.warning("No tool named {0}".format(label))
+
+    if label not in _LOADED:
+        _LOADED[label] = importlib.import_module(module_name)
+    tool = getattr(_LOADED[label], class_name)()
+    if method:
+        getattr(tool, method)()
+    return tool
 
 def autorig(*args):
     """
     Autorig V1
     """
-    initialize = autorig_ui.AutorigUI()
-    tool = initialize.build_gui()
+    return launch("Autorig V1")
 
 def joint_renamer(*args):
     """
     Joint Renamer
     """
-    tool = joint_renamer_ui.JointRenamerUI()
+    return launch("Joint Renamer")
 
 def joints_on_a_curve(*args):
     """
     Tool for generating joints on a curve.
     """
-    tool = curve_joint_generator.CurveJointGenerator()
+    return launch("Curve Joint Generator")
 
 def overlap_tool(*args):
     """
     Tool for building dynamic rigs onto FK rigs.
     """
-    tool = overlap_tool_ui.OverlapToolUI()
+    return launch("Overlap Tool")
@@ -45,11 +45,17 @@ from maya import cmds, mel
 from PySide import QtGui, QtCore
 
 # internal
-from rig_tools import overlap_tool
+from rig_tools import overlap_tool, overlap_cache
 
 # external
 from pipe_utils.ui_utils import UIUtils
 
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+WEDGE_RANGES = (("drag", 0.0, 0.2), ("damp", 0.0, 0.5),
+                ("stiffness", 0.5, 1.0))
+
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
 
@@ -62,6 +68,7 @@ class OverlapToolUI(UIUtils):
 
         # grab our api class
         self.overlap_obj = overlap_tool.OverlapTool()
+        self.recorder = overlap_cache.Recorder(overlap_cache.CACHE)
 
         # super class
         super(OverlapToolUI, self).__init__(parent=parent, *args, **kwargs)
@@ -71,6 +78,8 @@ class OverlapToolUI(UIUtils):
         self.point_lock = None
         self.frame_range = None
         self.parent_control = None
+        self.wedge_store = None
+        self.wedge_rig = None
 
         # notification presets
         self.button = QtGui.QMessageBox.Ok
@@ -100,8 +109,8 @@ class OverlapToolUI(UIUtils):
 
         # build main window
         window = self.window(window_name, window_title, widget)
-        window.setMinimumSize(300, 420)
-        window.setMaximumSize(300, 420)
+        window.setMinimumSize(300, 450)
+        window.setMaximumSize(300, 450)
 
         # stay on top
         self.setWindowFlags(QtCore.Qt.WindowStaysOnTopHint)
@@ -136,6 +145,51 @@ class OverlapToolUI(UIUtils):
         # self.batch.addAction(self.batch_build)
         self.batch.addAction(self.batch_bake)
         self.batch.addAction(self.batch_delete)
+        self.batch_solve = QtGui.QAction("Bake Verlet (Parallel)", self.menu)
+        self.batch.addAction(self.batch_solve)
+
+        # cache
+        self.cache = self.menu.addMenu("Cache")
+
+        # items
+        self.cache_spill = QtGui.QAction("Spill To Disk", self.menu)
+        self.cache_spill.setCheckable(True)
+        self.cache_clear = QtGui.QAction("Clear", self.menu)
+        self.cache.addAction(self.cache_spill)
+        self.cache.addAction(self.cache_clear)
+
+        # offline solver
+        self.verlet = self.menu.addMenu("Verlet")
+
+        # items
+        self.verlet_bake = QtGui.QAction("Bake Rig", self.menu)
+        self.verlet_quick = QtGui.QAction("Quick Overlap (Selected)", self.menu)
+        self.verlet.addAction(self.verlet_bake)
+        self.verlet.addAction(self.verlet_quick)
+
+        # nucleus
+        self.solver = self.menu.addMenu("Nucleus")
+
+        # items
+        self.solver_shared = QtGui.QAction("Build On Shared Nucleus",
+                                           self.menu)
+        self.solver_shared.setCheckable(True)
+        self.solver_share = QtGui.QAction("Move Rig To Shared", self.menu)
+        self.solver_private = QtGui.QAction("Move Rig To Private", self.menu)
+        self.solver.addAction(self.solver_shared)
+        self.solver.addAction(self.solver_share)
+        self.solver.addAction(self.solver_private)
+
+        # wedge
+        self.wedge = self.menu.addMenu("Wedge")
+
+        # items
+        self.wedge_run = QtGui.QAction("Wedge Rig...", self.menu)
+        self.wedge_apply = QtGui.QAction("Apply Variant...", self.menu)
+        self.wedge_clear = QtGui.QAction("Clear Preview", self.menu)
+        self.wedge.addAction(self.wedge_run)
+        self.wedge.addAction(self.wedge_apply)
+        self.wedge.addAction(self.wedge_clear)
 
         # help
         self.help = self.menu.addMenu("Help")
@@ -295,10 +349,25 @@ class OverlapToolUI(UIUtils):
         bake_button.setStyleSheet("background-color: yellow; color: black;")
         delete_button = QtGui.QPushButton("Delete")
         delete_button.setStyleSheet("background-color: red;")
+        update_button = QtGui.QPushButton("Update")
         build_layout.addWidget(build_button)
+        build_layout.addWidget(update_button)
         build_layout.addWidget(bake_button)
         build_layout.addWidget(delete_button)
 
+        # key reduction
+        reduce_layout = QtGui.QHBoxLayout()
+        main_layout.addLayout(reduce_layout)
+
+        reduce_label = QtGui.QLabel("Reduce Keys (tolerance, 0 = off): ")
+        self.reduce_box = QtGui.QDoubleSpinBox()
+        self.reduce_box.setDecimals(3)
+        self.reduce_box.setSingleStep(0.01)
+        self.reduce_box.setValue(0.01)
+        self.reduce_box.setMaximumWidth(70)
+        reduce_layout.addWidget(reduce_label)
+        reduce_layout.addWidget(self.reduce_box)
+
         # control settings
         control_options_layout = QtGui.QHBoxLayout()
         main_layout.addLayout(control_options_layout)
@@ -348,6 +417,7 @@ class OverlapToolUI(UIUtils):
         # signals
         build_button.clicked.connect(self._build)
         delete_button.clicked.connect(self._delete)
+        update_button.clicked.connect(self._update)
         self.play_button.clicked.connect(self._play)
         self.reset_button.clicked.connect(self._reset)
         bake_button.clicked.connect(self._bake)
@@ -359,6 +429,17 @@ class OverlapToolUI(UIUtils):
         select_all_button.clicked.connect(self._select_all_dynamic_controls)
         self.batch_bake.triggered.connect(self._batch_bake)
         self.batch_delete.triggered.connect(self._batch_delete)
+        self.batch_solve.triggered.connect(self._batch_solve)
+        self.cache_spill.toggled.connect(self._cache_spill)
+        self.cache_clear.triggered.connect(overlap_cache.CACHE.clear)
+        self.verlet_bake.triggered.connect(self._verlet_bake)
+        self.verlet_quick.triggered.connect(self._verlet_quick)
+        self.solver_share.triggered.connect(self._share_nucleus)
+        self.solver_private.triggered.connect(self._unshare_nucleus)
+        self.wedge_run.triggered.connect(self._wedge)
+        self.wedge_apply.triggered.connect(self._wedge_apply)
+        self.wedge_clear.triggered.connect(
+            self.overlap_obj.delete_wedge_preview)
         self.confluence_page.triggered.connect(self.overlap_obj.confluence_page)
         self.properties_page.triggered.connect(self.overlap_obj.properties_page)
         stiffness_ramp.clicked.connect(self._stiffness_ramp)
@@ -438,8 +519,13 @@ class OverlapToolUI(UIUtils):
             return
 
         # build
+        shared_nucleus = None
+        if self.solver_shared.isChecked():
+            name = self._shared_nucleus_name(self.parent_control)
+            shared_nucleus = name
         self.overlap_obj.build(self.rig_name, self.parent_control,
-                           self.controls, self.point_lock, self.frame_range)
+                           self.controls, self.point_lock, self.frame_range,
+                           shared_nucleus)
 
         rigs = self._find_rigs()
         rigs.reverse()
@@ -455,6 +541,55 @@ class OverlapToolUI(UIUtils):
         # select dynamic control
         self._select_dynamic_control()
 
+    def _update(self):
+        """
+        Updates the current rig in place with the point lock and frame
+        range options, and the selected FK controls if any.
+        """
+        rig = self._current_meta_node()
+        if not rig:
+            msg = "Please 'Build' your rig first."
+            QtGui.QMessageBox.information(self, self.title, msg, self.button)
+            return
+        controls = cmds.ls(sl=True)
+        if len(controls) <= 1:
+            controls = None
+        point_lock = self.point_lock_option.currentIndex()
+        start = self.start_frame_box.value()
+        end = self.end_frame_box.value()
+        self.overlap_obj.update(rig, controls, point_lock, (start, end))
+        if controls:
+            self.controls = controls
+
+    def _shared_nucleus_name(self, parent_control):
+        """
+        Shared nucleus per character, taken from the parent control's
+        namespace, "overlap" for the scene if it has none.
+        """
+        if parent_control and ":" in parent_control:
+            return parent_control.rsplit(":", 1)[0].replace(":", "_")
+        return "overlap"
+
+    def _share_nucleus(self):
+        """
+        Moves the current rig onto the shared nucleus.
+        """
+        rig = self._current_meta_node()
+        if not rig:
+            return
+        parent_control = self.overlap_obj.meta(rig)["parentControl"]
+        name = self._shared_nucleus_name(parent_control)
+        self.overlap_obj.share_nucleus(rig, name)
+
+    def _unshare_nucleus(self):
+        """
+        Moves the current rig back onto its own nucleus.
+        """
+        rig = self._current_meta_node()
+        if not rig:
+            return
+        self.overlap_obj.unshare_nucleus(rig)
+
     def _find_rigs(self):
         """
         Finds all Dynamic rigs in the scene.
@@ -530,7 +665,10 @@ class OverlapToolUI(UIUtils):
             return
 
         # bake animation
-        bake_animation = self.overlap_obj.bake(controls, frame_range)
+        tolerance = self.reduce_box.value()
+        rig = self._current_meta_node()
+        bake_animation = self.overlap_obj.bake(controls, frame_range,
+                                               tolerance, rig)
 
     def _batch_bake(self):
         """
@@ -540,8 +678,122 @@ class OverlapToolUI(UIUtils):
         start = self.start_frame_box.value()
         end = self.end_frame_box.value()
         frame_range = (start, end)
+        tolerance = self.reduce_box.value()
+
+        self.overlap_obj.batch_bake(frame_range, tolerance)
+
+    def _batch_solve(self):
+        """
+        Bakes all rigs with the offline solver in worker processes.
+        """
+        start = self.start_frame_box.value()
+        end = self.end_frame_box.value()
+        tolerance = self.reduce_box.value()
+        self.overlap_obj.batch_solve((start, end), tolerance)
+
+    def _verlet_bake(self):
+        """
+        Bakes the current rig with the offline solver instead of nHair.
+        """
+        rig = self._current_meta_node()
+        if not rig:
+            msg = "Please 'Build' your rig first."
+            QtGui.QMessageBox.information(self, self.title, msg, self.button)
+            return
+        start = self.start_frame_box.value()
+        end = self.end_frame_box.value()
+        tolerance = self.reduce_box.value()
+        self.overlap_obj.solve_rig(rig, (start, end), tolerance)
+
+    def _verlet_quick(self):
+        """
+        Keys overlap straight onto the selected FK controls, no rig needed.
+        """
+        controls = cmds.ls(sl=True)
+        if len(controls) <= 1:
+            msg = "Please select more than one FK control."
+            QtGui.QMessageBox.information(self, self.title, msg, self.button)
+            return
+        start = self.start_frame_box.value()
+        end = self.end_frame_box.value()
+        point_lock = self.point_lock_option.currentIndex()
+        tolerance = self.reduce_box.value()
+        self.overlap_obj.solve([controls], (start, end), None, point_lock,
+                               tolerance=tolerance)
+
+    def _wedge(self):
+        """
+        Wedges the current rig over the picked ranges and previews it.
+        """
+        rig = self._current_meta_node()
+        if not rig:
+            msg = "Please 'Build' your rig first."
+            QtGui.QMessageBox.information(self, self.title, msg, self.button)
+            return
+
+        # ranges
+        dialog = QtGui.QDialog(self)
+        dialog.setWindowTitle("Wedge")
+        layout = QtGui.QFormLayout(dialog)
+        boxes = dict()
+        for setting, low, high in WEDGE_RANGES:
+            row = QtGui.QHBoxLayout()
+            boxes[setting] = list()
+            for value in (low, high):
+                box = QtGui.QDoubleSpinBox()
+                box.setDecimals(3)
+                box.setSingleStep(0.05)
+                box.setValue(value)
+                row.addWidget(box)
+                boxes[setting].append(box)
+            enabled = QtGui.QCheckBox()
+            enabled.setChecked(True)
+            row.addWidget(enabled)
+            boxes[setting].append(enabled)
+            layout.addRow(setting, row)
+        steps = QtGui.QSpinBox()
+        steps.setRange(2, 10)
+        steps.setValue(3)
+        layout.addRow("Steps", steps)
+        buttons = QtGui.QDialogButtonBox(QtGui.QDialogButtonBox.Ok |
+                                         QtGui.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addRow(buttons)
+        if not dialog.exec_():
+            return
 
-        self.overlap_obj.batch_bake(frame_range)
+        ranges = dict()
+        for setting, (low, high, enabled) in boxes.iteritems():
+            if enabled.isChecked():
+                ranges[setting] = (low.value(), high.value())
+        if not ranges:
+            return
+
+        start = self.start_frame_box.value()
+        end = self.end_frame_box.value()
+        self.wedge_store = self.overlap_obj.wedge(rig, ranges, steps.value(),
+                                                  (start, end))
+        self.wedge_rig = rig
+        self.overlap_obj.preview_wedge(self.wedge_store)
+
+    def _wedge_apply(self):
+        """
+        Applies the picked wedge variant to the rig it came from.
+        """
+        if not self.wedge_store:
+            msg = "Please 'Wedge Rig' first."
+            QtGui.QMessageBox.information(self, self.title, msg, self.button)
+            return
+        labels = [self.wedge_store.label(index) for index in
+                  xrange(len(self.wedge_store.variants))]
+        label, ok = QtGui.QInputDialog.getItem(self, "Wedge", "Variant:",
+                                               labels, 0, False)
+        if not ok:
+            return
+        tolerance = self.reduce_box.value()
+        self.overlap_obj.apply_wedge(self.wedge_rig, self.wedge_store,
+                                     labels.index(label), tolerance)
 
     def _play(self):
         """
@@ -550,11 +802,58 @@ class OverlapToolUI(UIUtils):
         if self.play_button.text() == "PLAY":
             self.play_button.setText("STOP")
             self.play_button.setStyleSheet("background-color: red;")
+            if not self._play_cached():
+                self._record()
             cmds.InteractivePlayback()
         elif self.play_button.text() == "STOP":
             self.play_button.setStyleSheet("background-color: light gray;")
             self.play_button.setText("PLAY")
             cmds.play(state=False)
+            self.recorder.stop()
+
+    def _play_cached(self):
+        """
+        Plays the current rig from the cache if its solve is cached.
+        """
+        rig = self._current_meta_node()
+        if not rig:
+            return False
+        frame_range = (self.start_frame_box.value(),
+                       self.end_frame_box.value())
+        return self.overlap_obj.play_cached(rig, frame_range)
+
+    def _record(self):
+        """
+        Records the current rig while it plays, so baking it is free.
+        """
+        rig = self._current_meta_node()
+        if not rig or not self.controls:
+            return
+        start = self.start_frame_box.value()
+        end = self.end_frame_box.value()
+        frame_range = (start, end)
+        key = self.overlap_obj.cache_key(rig, frame_range)
+        self.recorder.start(key, self.controls, frame_range)
+
+    def _cache_spill(self, state):
+        """
+        Toggles spilling the overlap cache to disk.
+        """
+        overlap_cache.CACHE.spill = None
+        if state:
+            overlap_cache.CACHE.spill = overlap_cache.spill_path()
+
+    def _current_meta_node(self):
+        """
+        Returns the meta node of the rig in the rig box.
+        """
+        current_rig = self.rig_box.currentText()
+        if not current_rig:
+            return
+        meta_nodes = self.overlap_obj.find_meta_attribute("metaNode")
+        for node in meta_nodes:
+            if node.startswith(current_rig):
+                return node
 
     def _reset(self):
         """
@@ -611,28 +910,14 @@ class OverlapToolUI(UIUtils):
         overlap_data = dict()
         dy_attrs = dict()
         if mode == "save":
-            current_rig = self.rig_box.currentText()
-            meta_nodes = self.overlap_obj.find_meta_attribute("metaNode")
-            controls = self.overlap_obj.find_meta_attribute("dynamicControl")
-            meta_node = None
-            for node in meta_nodes:
-                if node.startswith(current_rig):
-                    meta_node = node
+            meta_node = self._current_meta_node()
             if meta_node:
                 # data
-                attributes = cmds.listAttr(meta_node, ud=True)
-                for attribute in attributes:
-                    value = cmds.getAttr("{0}.{1}".format(meta_node, attribute))
-                    overlap_data[attribute] = value
+                overlap_data.update(self.overlap_obj.meta(meta_node))
                 # attributes
-                for control in controls:
-                    if control.startswith(current_rig):
-                        attributes = cmds.listAttr(control, ud=True)
-                        for attribute in attributes:
-                            value = cmds.getAttr("{0}.{1}".format(control,
-                                                                  attribute))
-                            dy_attrs[attribute] = value
-                        overlap_data["dynamicAttributes"] = dy_attrs
+                control = overlap_data["dynamicControl"]
+                dy_attrs = self.overlap_obj.read_settings(control)
+                overlap_data["dynamicAttributes"] = dy_attrs
                 path = self.overlap_obj._json_save(overlap_data)
                 return path
             return overlap_data
@@ -0,0 +1,320 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Animation utilities, mainly for thinning out baked (dense) animation.
+
+:use:
+    from pipe_utils import anim_utils
+    controls = cmds.ls(sl=True)
+    anim_utils.reduce_keys(controls, ("rx", "ry", "rz"), tolerance=0.05)
+
+    # dense keys in and out, values[node][attribute][frame]
+    times, values = anim_utils.read_keys(controls, ("rx", "ry", "rz"))
+    anim_utils.write_keys(controls, ("rx", "ry", "rz"), times, values)
+
+:NOTES:
+    The reduction is Ramer-Douglas-Peucker style, but the error is measured
+    against the curve Maya will actually draw once the remaining keys get
+    tangents fitted to the samples (fixed, at the samples' slope, Hermite
+    segments), not against straight lines. All curves that share the same
+    key times (which is every curve coming out of bakeResults) are reduced
+    together in one NumPy pass.
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# third-party
+from maya import cmds, OpenMaya, OpenMayaAnim
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
+
+# external
+from pipe_utils import api_undo
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+ANGULAR_CURVES = (OpenMayaAnim.MFnAnimCurve.kAnimCurveTA,
+                  OpenMayaAnim.MFnAnimCurve.kAnimCurveUA)
+LINEAR_CURVES = (OpenMayaAnim.MFnAnimCurve.kAnimCurveTL,
+                 OpenMayaAnim.MFnAnimCurve.kAnimCurveUL)
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def _neighbours(keep):
+    """
+    Returns the previous and next kept index for every sample.
+    @params:
+        keep: Boolean array (curves, samples).
+    """
+    count = keep.shape[1]
+    index = numpy.arange(count)
+    prev_idx = numpy.where(keep, index, 0)
+    prev_idx = numpy.maximum.accumulate(prev_idx, axis=1)
+    next_idx = numpy.where(keep, index, count - 1)
+    next_idx = numpy.minimum.accumulate(next_idx[:, ::-1], axis=1)[:, ::-1]
+    return prev_idx, next_idx
+
+def slopes(times, values):
+    """
+    The slope of the samples at every sample, per frame (central
+    differences, one sided at the ends). Kept keys get these as tangents.
+    @params:
+        times: Array (samples).
+        values: Array (curves, samples).
+    """
+    times = numpy.asarray(times, dtype=float)
+    values = numpy.atleast_2d(numpy.asarray(values, dtype=float))
+    result = numpy.empty_like(values)
+    result[:, 1:-1] = ((values[:, 2:] - values[:, :-2]) /
+                       (times[2:] - times[:-2]))
+    result[:, 0] = (values[:, 1] - values[:, 0]) / (times[1] - times[0])
+    result[:, -1] = (values[:, -1] - values[:, -2]) / (times[-1] - times[-2])
+    return result
+
+def _evaluate(times, values, key_slopes, keep):
+    """
+    Evaluates the curve through the kept keys, with their fitted tangents,
+    at every sample.
+    @params:
+        times: Array (samples).
+        values: Array (curves, samples).
+        key_slopes: Tangent slopes, array (curves, samples).
+        keep: Boolean array (curves, samples).
+    """
+    rows = numpy.arange(values.shape[0])[:, None]
+    prev_idx, next_idx = _neighbours(keep)
+
+    # hermite segment between the surrounding kept keys
+    t0 = times[prev_idx]
+    t1 = times[next_idx]
+    length = t1 - t0
+    length[length == 0] = 1.0
+    s = (times[None, :] - t0) / length
+    s2 = s * s
+    s3 = s2 * s
+    h00 = 2 * s3 - 3 * s2 + 1
+    h10 = s3 - 2 * s2 + s
+    h01 = -2 * s3 + 3 * s2
+    h11 = s3 - s2
+
+    return (h00 * values[rows, prev_idx] +
+            h10 * length * key_slopes[rows, prev_idx] +
+            h01 * values[rows, next_idx] +
+            h11 * length * key_slopes[rows, next_idx])
+
+def simplify(times, values, tolerance):
+    """
+    Finds the minimal set of keys that reproduce the samples within tolerance,
+    each kept key's tangent being the samples' slope there (see slopes()).
+    Returns a boolean keep mask (curves, samples).
+    @params:
+        times: Shared key times (samples).
+        values: Key values (curves, samples).
+        tolerance: Maximum allowed deviation, in the curves' UI units.
+    """
+    times = numpy.asarray(times, dtype=float)
+    values = numpy.atleast_2d(numpy.asarray(values, dtype=float))
+    curves, count = values.shape
+    keep = numpy.zeros((curves, count), dtype=bool)
+    keep[:, 0] = True
+    keep[:, -1] = True
+    if count < 3:
+        return keep
+
+    key_slopes = slopes(times, values)
+    rows = numpy.arange(curves)[:, None]
+    while True:
+        error = numpy.abs(values - _evaluate(times, values, key_slopes, keep))
+        error[keep] = 0.0
+        error[error <= tolerance] = 0.0
+        if not error.any():
+            break
+
+        # split every offending segment at its worst sample
+        segment = _neighbours(keep)[0]
+        flat = (rows * count + segment).ravel()
+        order = numpy.lexsort((-error.ravel(), flat))
+        first = numpy.ones(order.size, dtype=bool)
+        first[1:] = flat[order][1:] != flat[order][:-1]
+        worst = order[first]
+        worst = worst[error.ravel()[worst] > 0.0]
+        keep.ravel()[worst] = True
+
+    return keep
+
+def _anim_curves(nodes, attributes):
+    """
+    Returns the anim curves driving the given attributes.
+    """
+    curves = list()
+    for node in nodes:
+        for attribute in attributes:
+            plug = "{0}.{1}".format(node, attribute)
+            if not cmds.objExists(plug):
+                continue
+            # also finds curves sitting behind a pairBlend
+            connected = cmds.keyframe(plug, q=True, n=True)
+            if connected:
+                curves.append(connected[0])
+    return curves
+
+def reduce_keys(nodes, attributes, time_range=None, tolerance=0.01):
+    """
+    Removes redundant keys from baked animation.
+    Returns a tuple of (keys before, keys after).
+    @params:
+        nodes: Objects whose animation you want to reduce.
+        attributes: Attributes to reduce, i.e., ("tx", "ty", "tz").
+        time_range: Tuple (int(start), int(end)), None for the whole curve.
+        tolerance: Maximum allowed deviation, in the curves' UI units.
+    """
+    if not NUMPY:
+        message = "Key reduction requires numpy, keys left untouched."
+        OpenMaya.MGlobal.displayWarning(message)
+        return (0, 0)
+
+    kwargs = dict()
+    if time_range:
+        kwargs["time"] = (time_range[0], time_range[1])
+
+    # group curves by their key times, baked curves all share them
+    blocks = dict()
+    for curve in _anim_curves(nodes, attributes):
+        times = cmds.keyframe(curve, q=True, tc=True, **kwargs)
+        if not times or len(times) < 3:
+            continue
+        values = cmds.keyframe(curve, q=True, vc=True, **kwargs)
+        block = blocks.setdefault(tuple(times), ([], []))
+        block[0].append(curve)
+        block[1].append(values)
+
+    # tangent angles are per second
+    frame_rate = OpenMaya.MTime(1.0, OpenMaya.MTime.kSeconds).asUnits(
+        OpenMaya.MTime.uiUnit())
+
+    before = 0
+    after = 0
+    for times, (curves, values) in blocks.iteritems():
+        keep = simplify(times, values, tolerance)
+        angles = numpy.degrees(numpy.arctan(slopes(times, values) *
+                                            frame_rate))
+        for count, curve in enumerate(curves):
+            remove = [(times[i], times[i]) for i in
+                      numpy.flatnonzero(~keep[count])]
+            before += len(times)
+            after += len(times) - len(remove)
+            if remove:
+                cmds.cutKey(curve, time=remove, clear=True)
+            for index in numpy.flatnonzero(keep[count]):
+                angle = float(angles[count, index])
+                cmds.keyTangent(curve, e=True, time=(times[index],
+                                times[index]), ia=angle, oa=angle)
+
+    return (before, after)
+
+def read_keys(nodes, attributes, time_range=None):
+    """
+    Reads dense (baked) keys, returns a tuple of (times, values).
+    values is nested as values[node][attribute][frame], in UI units.
+    @params:
+        nodes: Objects to read.
+        attributes: Attributes to read, i.e., ("tx", "ty", "tz").
+        time_range: Tuple (int(start), int(end)), None for the whole curve.
+    """
+    kwargs = dict()
+    if time_range:
+        kwargs["time"] = (time_range[0], time_range[1])
+
+    times = list()
+    values = list()
+    for node in nodes:
+        node_values = list()
+        for attribute in attributes:
+            plug = "{0}.{1}".format(node, attribute)
+            if not times:
+                times = cmds.keyframe(plug, q=True, tc=True, **kwargs) or list()
+            key_values = cmds.keyframe(plug, q=True, vc=True, **kwargs)
+            node_values.append(key_values or list())
+        values.append(node_values)
+    return times, values
+
+def write_keys(nodes, attributes, times, values):
+    """
+    Writes dense keys straight onto the anim curves through the API, as
+    one undo entry. Existing keys inside the time range are replaced.
+    @params:
+        nodes: Objects to key.
+        attributes: Attributes to key, i.e., ("tx", "ty", "tz").
+        times: Key times (frames).
+        values: Nested values[node][attribute][frame], in UI units.
+    """
+    if not times:
+        return
+
+    # let maya make the curves, constrained channels get their pairBlend
+    cmds.setKeyframe(nodes, at=attributes, t=times[0])
+
+    change = OpenMayaAnim.MAnimCurveChange()
+    for node_count, node in enumerate(nodes):
+        for attr_count, attribute in enumerate(attributes):
+            plug = "{0}.{1}".format(node, attribute)
+            curve = cmds.keyframe(plug, q=True, n=True)
+            if not curve:
+                continue
+            _set_curve(curve[0], times, values[node_count][attr_count],
+                       change)
+    api_undo.commit(change.undoIt, change.redoIt)
+
+def _set_curve(curve, times, values, change):
+    """
+    Replaces the keys of an anim curve in the given time range.
+    @params:
+        change: MAnimCurveChange keeping the edits for undo.
+    """
+    selection_list = OpenMaya.MSelectionList()
+    selection_list.add(curve)
+    mobject = OpenMaya.MObject()
+    selection_list.getDependNode(0, mobject)
+    curve_fn = OpenMayaAnim.MFnAnimCurve(mobject)
+
+    # unit conversion, the API wants internal units
+    curve_type = curve_fn.animCurveType()
+    convert = lambda value: value
+    if curve_type in ANGULAR_CURVES:
+        unit = OpenMaya.MAngle.uiUnit()
+        convert = lambda value: OpenMaya.MAngle(value, unit).asRadians()
+    elif curve_type in LINEAR_CURVES:
+        unit = OpenMaya.MDistance.uiUnit()
+        convert = lambda value: OpenMaya.MDistance(value,
+                                                   unit).asCentimeters()
+
+    # clear the range
+    start = times[0]
+    end = times[-1]
+    time_unit = OpenMaya.MTime.uiUnit()
+    for index in reversed(xrange(curve_fn.numKeys())):
+        frame = curve_fn.time(index).asUnits(time_unit)
+        if start <= frame <= end:
+            curve_fn.remove(index, change)
+
+    # add
+    time_array = OpenMaya.MTimeArray()
+    value_array = OpenMaya.MDoubleArray()
+    for time, value in zip(times, values):
+        time_array.append(OpenMaya.MTime(time, time_unit))
+        value_array.append(convert(value))
+    curve_fn.addKeys(time_array, value_array,
+                     OpenMayaAnim.MFnAnimCurve.kTangentAuto,
+                     OpenMayaAnim.MFnAnimCurve.kTangentAuto, True, change)
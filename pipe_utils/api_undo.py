@@ -0,0 +1,98 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Puts API edits on Maya's undo queue.
+
+    API modifiers and plug edits (setLocked, MFnTransform.set) don't make
+    undo entries. Every function doing them hands its modifier, or its own
+    undo and redo, over here once the edit is done. The abcApiUndo command
+    (plugins/abcApiUndo.py) keeps them, so Ctrl+Z reverts the edit, and
+    inside decorators.undo it's part of that chunk's one entry.
+
+:use:
+    from pipe_utils import api_undo
+    modifier = OpenMaya.MDagModifier()
+    ...
+    api_undo.do_it(modifier)
+
+    # edits that aren't a modifier
+    api_undo.commit(undo_function, redo_function)
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# third-party
+from maya import cmds
+
+# internal
+import settings
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+PLUGIN = "abcApiUndo"
+COMMAND = "abcApiUndo"
+
+# (undo, redo) waiting for the command to take them
+_PENDING = list()
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def load_plugin():
+    if not cmds.pluginInfo(PLUGIN, q=True, loaded=True):
+        cmds.loadPlugin(settings.PLUGINS + PLUGIN + ".py", quiet=True)
+
+def commit(undo, redo):
+    """
+    Adds an edit that is already done to the undo queue.
+    @params:
+        undo: Reverts the edit.
+        redo: Does it again after undo.
+    """
+    load_plugin()
+    _PENDING.append((undo, redo))
+    try:
+        getattr(cmds, COMMAND)()
+    finally:
+        # the command didn't take it, i.e., it failed to run
+        if _PENDING and _PENDING[-1] == (undo, redo):
+            _PENDING.pop()
+
+def do_it(modifier, after=None, before_undo=None):
+    """
+    Runs a modifier's pending operations and adds it to the undo queue,
+    returns the modifier.
+    @params:
+        modifier: MDGModifier or MDagModifier.
+        after: Runs after doIt and on redo, edits the modifier can't hold.
+        before_undo: Runs before undoIt, reverts after.
+    """
+    modifier.doIt()
+    if after:
+        after()
+
+    def undo():
+        if before_undo:
+            before_undo()
+        modifier.undoIt()
+
+    def redo():
+        modifier.doIt()
+        if after:
+            after()
+
+    commit(undo, redo)
+    return modifier
+
+def take_pending():
+    """
+    The command's side, the oldest edit waiting.
+    """
+    return _PENDING.pop(0)
@@ -0,0 +1,223 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Declarative attribute schemas.
+
+    A Schema is plain data: the attributes to add to a node, the connections
+    to make and the plug values to set. apply() builds all of it through
+    one MDGModifier, instead of an addAttr/setAttr/connectAttr round-trip
+    per item, as one undo entry (see pipe_utils.api_undo).
+
+    Plugs are strings and may use format keys, "{node}" is the node the
+    schema is applied to, anything else is passed to apply():
+        ("{node}.drag", "{hair}.drag")
+
+:use:
+    from pipe_utils import attr_schema
+    schema = attr_schema.Schema()
+    schema.add("drag", default=0.05, connect=["{hair}.drag"])
+    schema.extend(attr_schema.ramp("Attract", "{hair}.attractionScale",
+                                   (1, .8, .6, .4, .2, 0)))
+    schema.apply("tail_DyCtrl", hair="tail_DyHairShape")
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# third-party
+from maya import OpenMaya
+
+# external
+from pipe_utils import api_undo
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+NUMERIC_TYPES = {
+    "float": OpenMaya.MFnNumericData.kFloat,
+    "double": OpenMaya.MFnNumericData.kDouble,
+    "long": OpenMaya.MFnNumericData.kInt,
+    "bool": OpenMaya.MFnNumericData.kBoolean,
+    }
+RAMP_SUFFIXES = ("Start", "01", "02", "03", "04", "End")
+RAMP_POSITIONS = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+SMOOTH = 3
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def ramp(prefix, ramp_plug, values, positions=RAMP_POSITIONS,
+         interpolation=SMOOTH, keyable=True):
+    """
+    Schema driving a ramp attribute from one float attribute per point,
+    i.e., AttractStart, Attract01-04, AttractEnd.
+    @params:
+        prefix: Attribute prefix, i.e., "Attract".
+        ramp_plug: The ramp, i.e., "{hair}.attractionScale".
+        values: Default value per point.
+        positions: Position per point.
+        interpolation: Ramp interpolation, 3 = smooth.
+    """
+    schema = Schema()
+    ramp_name = ramp_plug.rsplit(".", 1)[-1]
+    for count, suffix in enumerate(RAMP_SUFFIXES):
+        element = "{0}[{1}].{2}".format(ramp_plug, count, ramp_name)
+        schema.add(prefix + suffix, default=values[count], minimum=0,
+                   maximum=1, keyable=keyable,
+                   connect=[element + "_FloatValue"])
+        schema.set(element + "_Position", positions[count])
+        schema.set(element + "_Interp", interpolation)
+    return schema
+
+def create_attribute(data):
+    """
+    Builds an attribute MObject from its declaration, see Schema.add.
+    """
+    if data["type"] == "enum":
+        attr_fn = OpenMaya.MFnEnumAttribute()
+        attribute = attr_fn.create(data["name"], data["name"],
+                                   data["default"] or 0)
+        for count, field in enumerate(data["enum"].split(":")):
+            if field:
+                attr_fn.addField(field, count)
+    else:
+        attr_fn = OpenMaya.MFnNumericAttribute()
+        attribute = attr_fn.create(data["name"], data["name"],
+                                   NUMERIC_TYPES[data["type"]],
+                                   data["default"] or 0)
+        if data["minimum"] is not None:
+            attr_fn.setMin(data["minimum"])
+        if data["maximum"] is not None:
+            attr_fn.setMax(data["maximum"])
+    attr_fn.setKeyable(data["keyable"])
+    attr_fn.setStorable(True)
+    return attribute
+
+def get_plug(name):
+    """
+    Returns the MPlug of "node.attribute", array elements included.
+    """
+    selection_list = OpenMaya.MSelectionList()
+    selection_list.add(name)
+    plug = OpenMaya.MPlug()
+    selection_list.getPlug(0, plug)
+    return plug
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class Schema(object):
+    """
+    Attributes, connections and values to apply to a node.
+    """
+    def __init__(self):
+        self.attributes = list()
+        self.connections = list()
+        self.values = list()
+
+    def add(self, name, type="float", default=None, minimum=None,
+            maximum=None, keyable=True, locked=False, enum=None,
+            connect=None):
+        """
+        Declares an attribute.
+        @params:
+            name: Long name.
+            type: "float", "double", "long", "bool" or "enum".
+            default: Default value.
+            minimum, maximum: Hard limits.
+            keyable: Keyable, shows in the channel box.
+            locked: Locked after creation, i.e., headers.
+            enum: Enum names, i.e., "on:off".
+            connect: Destination plugs it drives.
+        """
+        self.attributes.append({"name": name, "type": type,
+                                "default": default, "minimum": minimum,
+                                "maximum": maximum, "keyable": keyable,
+                                "locked": locked, "enum": enum})
+        for destination in connect or list():
+            self.connect("{node}." + name, destination)
+        return self
+
+    def header(self, name, label="settings"):
+        """
+        Declares a locked enum used as a channel box header.
+        """
+        return self.add(name, "enum", enum=label + ":", locked=True)
+
+    def connect(self, source, destination):
+        """
+        Declares a connection.
+        """
+        self.connections.append((source, destination))
+        return self
+
+    def set(self, plug, value):
+        """
+        Declares a plug value.
+        """
+        self.values.append((plug, value))
+        return self
+
+    def extend(self, schema):
+        """
+        Appends another schema.
+        """
+        self.attributes.extend(schema.attributes)
+        self.connections.extend(schema.connections)
+        self.values.extend(schema.values)
+        return self
+
+    def apply(self, node, modifier=None, **context):
+        """
+        Applies the schema to a node in one undoable modifier, returns the
+        modifier.
+        @params:
+            node: The node receiving the attributes.
+            modifier: Add to an existing MDGModifier/MDagModifier, one not
+                      on the undo queue yet.
+            context: Values for the format keys in the plugs.
+        """
+        context["node"] = node
+        if modifier is None:
+            modifier = OpenMaya.MDGModifier()
+
+        selection_list = OpenMaya.MSelectionList()
+        selection_list.add(node)
+        mobject = OpenMaya.MObject()
+        selection_list.getDependNode(0, mobject)
+
+        # attributes have to exist before anything can plug into them
+        for data in self.attributes:
+            modifier.addAttribute(mobject, create_attribute(data))
+        modifier.doIt()
+
+        for source, destination in self.connections:
+            modifier.connect(get_plug(source.format(**context)),
+                             get_plug(destination.format(**context)))
+        for plug, value in self.values:
+            plug = get_plug(plug.format(**context))
+            if isinstance(value, bool):
+                modifier.newPlugValueBool(plug, value)
+            elif isinstance(value, int):
+                modifier.newPlugValueInt(plug, value)
+            else:
+                modifier.newPlugValueDouble(plug, value)
+
+        # locking is a plug state, not a modifier operation, locked
+        # attributes can't be removed on undo
+        node_fn = OpenMaya.MFnDependencyNode(mobject)
+        locked = [data["name"] for data in self.attributes if data["locked"]]
+        def lock():
+            for name in locked:
+                node_fn.findPlug(name).setLocked(True)
+
+        def unlock():
+            for name in locked:
+                node_fn.findPlug(name).setLocked(False)
+
+        return api_undo.do_it(modifier, lock, unlock)
@@ -87,3 +87,23 @@ def viewport_off(function):
         finally:
             mel.eval("paneLayout -e -manage true $gMainPane")
     return wrapper
+
+def suspend_evaluation(function):
+    """
+    Decorator - suspends viewport refresh and parallel evaluation while
+    func is running, both are restored after, even on failure.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        mode = None
+        if hasattr(cmds, "evaluationManager"):
+            mode = cmds.evaluationManager(q=True, mode=True)[0]
+            cmds.evaluationManager(mode="off")
+        cmds.refresh(suspend=True)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            cmds.refresh(suspend=False)
+            if mode:
+                cmds.evaluationManager(mode=mode)
+    return wrapper
@@ -12,6 +12,16 @@
     from utils import name_utils
     name = name_utils.get_unique_name(char, side, node_type, suffix)
     loc = pm.spaceLocator(n=name)
+
+    # many hooks, indexed, and connected module to module
+    index = hook_utils.HookIndex()
+    hooks = HookUtils.create_hooks([
+        {"asset": "kong", "side": "c", "part": "spine", "in_out": "out",
+         "snap_to": "kong_c_chest01_bindJnt"},
+        {"asset": "kong", "side": "l", "part": "arm", "in_out": "in",
+         "snap_to": "kong_l_clavicle01_bindJnt"}], index)
+    HookUtils.connect_hooks([(("kong", "c", "spine"), ("kong", "l", "arm"))],
+                            index)
 """
 
 #------------------------------------------------------------------------------#
@@ -19,10 +29,18 @@
 
 # built-in
 import pymel.core as pm
+from maya import cmds, OpenMaya
 
 # external
 import settings
-from name_utils import NameUtils
+from pipe_utils.attr_schema import get_plug
+from name_utils import NameUtils, NameIndex
+from pipe_utils import api_undo
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+HOOK_TYPES = {"in": 0, "out": 1}
 
 #------------------------------------------------------------------------------#
 #----------------------------------------------------------------- FUNCTIONS --#
@@ -61,3 +79,225 @@ class HookUtils(object):
         if snap_to:
             pm.xform(hook, ws=1, matrix=snap_to.wm.get())
         return hook
+
+    @classmethod
+    def create_hooks(cls, specs, index=None):
+        """
+        Creates many hooks in one pass, one undo entry, returns the hooks.
+        Same hooks as create_hook, full path names, in the order of specs.
+
+        :parameters:
+            specs: List of dicts, asset, side, part and in_out as in
+                   create_hook, plus either:
+                   snap_to: Object to snap to, or
+                   matrix: World matrix, 16 floats.
+            index: HookIndex the new hooks are added to.
+
+        :notes:
+            Nodes, names and hookType attributes go through one
+            MDagModifier, snap matrices are read in one pass. The
+            modifier is on Maya's undo queue through api_undo.
+        """
+        snap_matrices = get_world_matrices([spec["snap_to"] for spec in specs
+                                            if spec.get("snap_to")])
+
+        names = NameIndex()
+        modifier = OpenMaya.MDagModifier()
+        nodes = list()
+        for spec in specs:
+            name = names.get_unique_name(spec.get("asset", "asset"),
+                                         spec.get("side", "c"),
+                                         spec.get("part", "part"), "loc")
+            if settings.HOOK_NODE_TYPE == "locator":
+                node = modifier.createNode("transform")
+                shape = modifier.createNode("locator", node)
+                modifier.renameNode(shape, name + "Shape")
+            else:
+                node = modifier.createNode(settings.HOOK_NODE_TYPE)
+            modifier.renameNode(node, name)
+
+            attr_fn = OpenMaya.MFnNumericAttribute()
+            attribute = attr_fn.create("hookType", "hookType",
+                                       OpenMaya.MFnNumericData.kFloat,
+                                       HOOK_TYPES[spec.get("in_out", "in")])
+            modifier.addAttribute(node, attribute)
+            nodes.append(node)
+
+        matrices = list()
+        for spec in specs:
+            matrix = spec.get("matrix")
+            if spec.get("snap_to"):
+                matrix = snap_matrices.pop(0)
+            if matrix is not None:
+                matrix = to_mmatrix(matrix)
+            matrices.append(matrix)
+
+        # locks and matrices after doIt and on redo, a locked attribute
+        # can't be removed on undo
+        def set_hooks():
+            for node, matrix in zip(nodes, matrices):
+                transform_fn = OpenMaya.MFnTransform(node)
+                transform_fn.findPlug("hookType").setLocked(True)
+                if matrix is not None:
+                    transform_fn.set(OpenMaya.MTransformationMatrix(matrix))
+
+        def unlock_hooks():
+            for node in nodes:
+                OpenMaya.MFnDependencyNode(node).findPlug(
+                    "hookType").setLocked(False)
+
+        api_undo.do_it(modifier, set_hooks, unlock_hooks)
+
+        hooks = list()
+        for spec, node in zip(specs, nodes):
+            hook = OpenMaya.MFnDagNode(node).fullPathName()
+            hooks.append(hook)
+            if index is not None:
+                index.add(hook, spec.get("asset", "asset"),
+                          spec.get("side", "c"), spec.get("part", "part"),
+                          spec.get("in_out", "in"))
+        return hooks
+
+    @classmethod
+    def connect_hooks(cls, connections, index=None):
+        """
+        Makes out hooks drive in hooks, offsets kept, one undo entry.
+        Hooks are paired in creation order, the first out hook of a part
+        drives its first in hook and so on.
+
+        :parameters:
+            connections: List of (out key, in key), keys as
+                         (asset, side, part).
+            index: HookIndex to resolve the keys, a scene scan if None.
+
+        :notes:
+            Every pair is resolved first, then all multMatrix and
+            decomposeMatrix nodes and connections go through one
+            MDGModifier, on Maya's undo queue through api_undo.
+        """
+        if index is None:
+            index = HookIndex.from_scene()
+
+        # resolve every pair up front
+        pairs = list()
+        for out_key, in_key in connections:
+            drivers = index.find(*out_key, in_out="out")
+            driven = index.find(*in_key, in_out="in")
+            if not drivers or not driven:
+                message = "No hooks to connect {0} to {1}."
+                raise ValueError(message.format(out_key, in_key))
+            if len(drivers) != len(driven):
+                message = "{0} has {1} out hooks, {2} has {3} in hooks."
+                raise ValueError(message.format(out_key, len(drivers),
+                                                in_key, len(driven)))
+            pairs.extend(zip(drivers, driven))
+
+        cmds.loadPlugin("matrixNodes", qt=True)
+        world_matrices = get_world_matrices([hook for pair in pairs
+                                             for hook in pair])
+        modifier = OpenMaya.MDGModifier()
+        nodes = list()
+        for count, (driver, hook) in enumerate(pairs):
+            driver_matrix = world_matrices[count * 2]
+            hook_matrix = world_matrices[count * 2 + 1]
+            mult = modifier.createNode("multMatrix")
+            decompose = modifier.createNode("decomposeMatrix")
+            modifier.renameNode(mult, hook.split("|")[-1] + "MM")
+            modifier.renameNode(decompose, hook.split("|")[-1] + "DM")
+            nodes.append((mult, decompose, hook_matrix *
+                          driver_matrix.inverse()))
+        modifier.doIt()
+
+        connections = (("{driver}.worldMatrix[0]", "{mult}.matrixIn[1]"),
+                       ("{hook}.parentInverseMatrix[0]", "{mult}.matrixIn[2]"),
+                       ("{mult}.matrixSum", "{decompose}.inputMatrix"),
+                       ("{decompose}.outputTranslate", "{hook}.translate"),
+                       ("{decompose}.outputRotate", "{hook}.rotate"),
+                       ("{decompose}.outputScale", "{hook}.scale"))
+        for (driver, hook), (mult, decompose, offset) in zip(pairs, nodes):
+            names = {"driver": driver, "hook": hook,
+                     "mult": OpenMaya.MFnDependencyNode(mult).name(),
+                     "decompose": OpenMaya.MFnDependencyNode(decompose).name()}
+            matrix_data = OpenMaya.MFnMatrixData()
+            modifier.newPlugValue(get_plug(names["mult"] + ".matrixIn[0]"),
+                                  matrix_data.create(offset))
+            for source, destination in connections:
+                modifier.connect(get_plug(source.format(**names)),
+                                 get_plug(destination.format(**names)))
+        api_undo.do_it(modifier)
+
+
+class HookIndex(object):
+    """
+    In memory index of hooks, by (asset, side, part, in_out).
+    """
+    def __init__(self):
+        self.hooks = dict()
+
+    @classmethod
+    def from_scene(cls):
+        """
+        Indexes every hook in the scene, one scan. Asset, side and part are
+        read back from the hook names.
+        """
+        index = cls()
+        hooks = cmds.ls("*.hookType", "*:*.hookType", o=True, l=True)
+        for hook in hooks or list():
+            hook_type = cmds.getAttr(hook + ".hookType")
+            in_out = "out" if hook_type else "in"
+            temp = hook.split("|")[-1].split(":")[-1].split("_")
+            if len(temp) < 3:
+                continue
+            index.add(hook, temp[0], temp[1], temp[2].split("0")[0], in_out)
+        return index
+
+    def add(self, hook, asset, side, part, in_out):
+        key = (asset, side, part, in_out)
+        self.hooks.setdefault(key, list()).append(hook)
+
+    def find(self, asset=None, side=None, part=None, in_out=None):
+        """
+        Returns the hooks matching the given fields, None matches anything.
+        """
+        query = (asset, side, part, in_out)
+        hooks = list()
+        for key in sorted(self.hooks):
+            if all(value is None or value == field
+                   for value, field in zip(query, key)):
+                hooks.extend(self.hooks[key])
+        return hooks
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def get_world_matrices(nodes):
+    """
+    Returns the world matrix of each node as MMatrix, one API pass.
+    """
+    # a selection list merges repeats
+    unique = list()
+    seen = set()
+    for node in nodes:
+        if node not in seen:
+            seen.add(node)
+            unique.append(node)
+    selection_list = OpenMaya.MSelectionList()
+    for node in unique:
+        selection_list.add(node)
+
+    matrices = dict()
+    for count, node in enumerate(unique):
+        dag_path = OpenMaya.MDagPath()
+        selection_list.getDagPath(count, dag_path)
+        matrices[node] = dag_path.inclusiveMatrix()
+    return [matrices[node] for node in nodes]
+
+def to_mmatrix(matrix):
+    """
+    Returns an MMatrix from 16 floats, MMatrix passes through.
+    """
+    if isinstance(matrix, OpenMaya.MMatrix):
+        return matrix
+    mmatrix = OpenMaya.MMatrix()
+    OpenMaya.MScriptUtil.createMatrixFromList(list(matrix), mmatrix)
+    return mmatrix
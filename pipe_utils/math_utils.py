@@ -0,0 +1,57 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Transform math on NumPy arrays, no Maya, row vectors like Maya's
+    matrices.
+
+:use:
+    from pipe_utils import math_utils
+    angles = math_utils.euler_from_matrix(matrices[..., :3, :3], "xyz")
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# third party
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+ROTATE_ORDERS = ("xyz", "yzx", "zxy", "xzy", "yxz", "zyx")
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def euler_from_matrix(matrix, rotate_order="xyz"):
+    """
+    Extracts maya euler angles (degrees) from row-vector rotation matrices.
+    @params:
+        matrix: Array (..., 3, 3), scale free.
+        rotate_order: One of ROTATE_ORDERS.
+    """
+    axes = ["xyz".index(axis) for axis in rotate_order]
+    odd = rotate_order not in ("xyz", "yzx", "zxy")
+    m = matrix[..., axes, :][..., :, axes]
+
+    # m = Rx(a) * Ry(b) * Rz(c) in the permuted frame
+    b = numpy.arcsin(numpy.clip(-m[..., 0, 2], -1.0, 1.0))
+    a = numpy.arctan2(m[..., 1, 2], m[..., 2, 2])
+    c = numpy.arctan2(m[..., 0, 1], m[..., 0, 0])
+    angles = numpy.degrees(numpy.stack((a, b, c), axis=-1))
+    if odd:
+        angles = -angles
+
+    # back to x, y, z
+    result = numpy.empty_like(angles)
+    result[..., axes] = angles
+    return result
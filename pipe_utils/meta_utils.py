@@ -0,0 +1,209 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Metadata stored on meta nodes (settings.META_NODE_TYPE) as one JSON
+    record per node, in a single string attribute:
+        {"type": "overlapRig", "version": 1, "data": {...}}
+
+    Reads are cached per node. The cache entry is dropped by an attribute
+    changed callback as soon as the record attribute is set, so the cache
+    is never stale, whoever writes the node. Opening or starting a new
+    scene clears the whole cache, its node handles' hashes get reused.
+
+    Nodes from before the record (one string attribute per field) are
+    still read, see read(legacy=True).
+
+:use:
+    from pipe_utils import meta_utils
+    node = meta_utils.create("overlapRig", {"rigName": "tail"}, "tail_META")
+    data = meta_utils.read(node)
+    meta_utils.update(node, startFrame=10)
+    records = meta_utils.read_all("overlapRig")
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import json
+
+# third-party
+from maya import cmds, OpenMaya
+
+# internal
+import settings
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+RECORD_ATTR = "metaRecord"
+VERSION = 1
+
+# {MObjectHandle hash: record}, {MObjectHandle hash: callback ids}
+_CACHE = dict()
+_CALLBACKS = dict()
+
+# scene opened/new callback ids, kept across reload() to remove them
+_SCENE_CALLBACKS = globals().get("_SCENE_CALLBACKS", list())
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def create(record_type, data, name=None):
+    """
+    Creates a meta node holding a record, returns the node.
+    @params:
+        record_type: Type of record, i.e., "overlapRig".
+        data: Dict, anything json can take.
+        name: Node name.
+    """
+    kwargs = dict()
+    if name:
+        kwargs["name"] = name
+    node = cmds.createNode(settings.META_NODE_TYPE, **kwargs)
+    write(node, data, record_type)
+    return node
+
+def write(node, data, record_type=None):
+    """
+    Writes a node's record.
+    @params:
+        node: The meta node.
+        data: Dict, anything json can take.
+        record_type: Type of record, defaults to the existing one.
+    """
+    if not cmds.attributeQuery(RECORD_ATTR, node=node, exists=True):
+        cmds.addAttr(node, ln=RECORD_ATTR, dt="string")
+    if record_type is None:
+        record_type = read_record(node).get("type")
+    record = {"type": record_type, "version": VERSION, "data": data}
+    cmds.setAttr("{0}.{1}".format(node, RECORD_ATTR), json.dumps(record),
+                 type="string")
+
+def update(node, **values):
+    """
+    Updates fields of a node's record.
+    """
+    data = dict(read(node))
+    data.update(values)
+    write(node, data)
+    return data
+
+def read(node, legacy=True):
+    """
+    Returns the data of a node's record.
+    @params:
+        node: The meta node.
+        legacy: Read one attribute per field nodes, if it has no record.
+    """
+    record = read_record(node, legacy)
+    return record.get("data", dict())
+
+def read_record(node, legacy=True):
+    """
+    Returns the whole record of a node, cached.
+    """
+    mobject = _get_mobject(node)
+    key = OpenMaya.MObjectHandle(mobject).hashCode()
+    if key in _CACHE:
+        return _CACHE[key]
+
+    node_fn = OpenMaya.MFnDependencyNode(mobject)
+    if node_fn.hasAttribute(RECORD_ATTR):
+        value = node_fn.findPlug(RECORD_ATTR).asString()
+        record = json.loads(value) if value else dict()
+    elif legacy:
+        record = {"type": None, "version": 0, "data": _read_legacy(node)}
+    else:
+        record = dict()
+
+    _CACHE[key] = record
+    _watch(mobject, key)
+    return record
+
+def read_all(record_type, legacy_suffix=None):
+    """
+    Reads every record of a type in the scene, returns {node: data}.
+    @params:
+        record_type: Type of record, i.e., "overlapRig".
+        legacy_suffix: Also return nodes without a record whose name ends
+                       with it, i.e., "DyMETA".
+    """
+    records = dict()
+    for node in cmds.ls(type=settings.META_NODE_TYPE):
+        record = read_record(node)
+        if record.get("type") == record_type:
+            records[node] = record["data"]
+        elif legacy_suffix and record.get("version") == 0:
+            if node.endswith(legacy_suffix):
+                records[node] = record["data"]
+    return records
+
+def clear_cache():
+    """
+    Drops the cache and its callbacks, i.e., on scene change.
+    """
+    for callbacks in _CALLBACKS.itervalues():
+        for callback in callbacks:
+            OpenMaya.MMessage.removeCallback(callback)
+    _CALLBACKS.clear()
+    _CACHE.clear()
+
+def _watch_scene():
+    """
+    Clears the cache after File > New and File > Open.
+    """
+    for callback in _SCENE_CALLBACKS:
+        OpenMaya.MMessage.removeCallback(callback)
+    del _SCENE_CALLBACKS[:]
+    for message in (OpenMaya.MSceneMessage.kAfterNew,
+                    OpenMaya.MSceneMessage.kAfterOpen):
+        _SCENE_CALLBACKS.append(OpenMaya.MSceneMessage.addCallback(
+            message, _scene_changed))
+
+def _scene_changed(*args):
+    clear_cache()
+
+def _read_legacy(node):
+    """
+    Reads the one attribute per field layout.
+    """
+    data = dict()
+    for attribute in cmds.listAttr(node, ud=True) or list():
+        data[attribute] = cmds.getAttr("{0}.{1}".format(node, attribute))
+    return data
+
+def _watch(mobject, key):
+    """
+    Drops the cached record when any attribute of the node changes or the
+    node is deleted.
+    """
+    if key in _CALLBACKS:
+        return
+    _CALLBACKS[key] = (
+        OpenMaya.MNodeMessage.addAttributeChangedCallback(
+            mobject, _attribute_changed, key),
+        OpenMaya.MNodeMessage.addNodePreRemovalCallback(
+            mobject, _node_removed, key))
+
+def _attribute_changed(message, plug, other_plug, key):
+    _CACHE.pop(key, None)
+
+def _node_removed(mobject, key):
+    _CACHE.pop(key, None)
+    for callback in _CALLBACKS.pop(key, list()):
+        OpenMaya.MMessage.removeCallback(callback)
+
+def _get_mobject(node):
+    selection_list = OpenMaya.MSelectionList()
+    selection_list.add(node)
+    mobject = OpenMaya.MObject()
+    selection_list.getDependNode(0, mobject)
+    return mobject
+
+_watch_scene()
@@ -0,0 +1,236 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Reloads only the pipeline modules that changed, and the modules
+    importing them, in dependency order.
+
+    The source mtime of every pipeline module (any module loaded from
+    under settings.root_path) is kept from when it was loaded: from the
+    import index, else the source mtime compiled into its .pyc. A module
+    edited between its import and the first check is reloaded too.
+    Imports are read from the source with ast, cached per mtime, to build
+    the dependency graph. A file loaded under two names (the import index
+    serves the modules of the code directories by themselves too, i.e.,
+    "name_utils" and "pipe_utils.name_utils") is reloaded under both.
+
+:use:
+    from pipe_utils import module_reloader
+    reloaded = module_reloader.reload_changed()
+
+    # reload(abc_pipe) does the same, see the root __init__
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import sys
+import ast
+import struct
+try:
+    from importlib import reload
+except ImportError:
+    pass
+
+# internal
+import settings
+
+# external
+from pipe_core import import_index
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+# module name: source mtime at its last (re)load
+_MTIMES = dict()
+
+# source path: (mtime, imported names)
+_IMPORTS = dict()
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def reload_changed(verbose=True):
+    """
+    Reloads changed pipeline modules and their dependents, returns the
+    reloaded module names in the order they were reloaded.
+    """
+    modules = get_pipeline_modules()
+    mtimes = dict((name, _get_mtime(path)) for name, path
+                  in modules.iteritems())
+
+    # modules seen for the first time are compared to when they loaded
+    changed = set()
+    for name, mtime in mtimes.iteritems():
+        if name not in _MTIMES:
+            _MTIMES[name] = _get_load_mtime(name, mtime)
+        if _MTIMES[name] != mtime:
+            changed.add(name)
+    if not changed:
+        return list()
+
+    graph = get_dependency_graph(modules)
+    to_reload = get_dependents(graph, changed)
+    reloaded = list()
+    for name in sort_dependencies(graph, to_reload):
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        reload(module)
+        _MTIMES[name] = mtimes[name]
+        reloaded.append(name)
+        if verbose:
+            print "Reloaded {0}".format(name)
+    return reloaded
+
+def get_pipeline_modules():
+    """
+    Returns {module name: source path} of the loaded pipeline modules.
+    """
+    root = os.path.normcase(os.path.abspath(settings.root_path))
+    modules = dict()
+    for name, module in sys.modules.items():
+        path = getattr(module, "__file__", None)
+        if not path or name in (__name__, "__main__"):
+            continue
+        path = os.path.abspath(path)
+        if not os.path.normcase(path).startswith(root):
+            continue
+        # the root package is the one reloading
+        if os.path.normcase(os.path.dirname(path)) == root and \
+                os.path.basename(path).startswith("__init__."):
+            continue
+        if path.endswith((".pyc", ".pyo")):
+            path = path[:-1]
+        modules[name] = path
+    return modules
+
+def get_dependency_graph(modules):
+    """
+    Returns {module name: pipeline modules it imports}.
+    """
+    graph = dict()
+    for name, path in modules.iteritems():
+        package = name.rpartition(".")[0]
+        if path.endswith("__init__.py"):
+            package = name
+        graph[name] = set()
+        for imported in _get_imports(path):
+            # implicit relative first, then absolute
+            candidates = [imported]
+            if package:
+                candidates.insert(0, package + "." + imported)
+            for candidate in candidates:
+                if candidate in modules and candidate != name:
+                    graph[name].add(candidate)
+                    break
+
+        # the same file under another name
+        for other, other_path in modules.iteritems():
+            if other != name and other_path == path:
+                graph[name].add(other)
+    return graph
+
+def get_dependents(graph, names):
+    """
+    Returns names plus every module depending on them, directly or not.
+    """
+    dependents = dict((name, set()) for name in graph)
+    for name, imports in graph.iteritems():
+        for imported in imports:
+            dependents.setdefault(imported, set()).add(name)
+
+    found = set(names)
+    pending = list(names)
+    while pending:
+        for dependent in dependents.get(pending.pop(), set()):
+            if dependent not in found:
+                found.add(dependent)
+                pending.append(dependent)
+    return found
+
+def sort_dependencies(graph, names):
+    """
+    Orders names so each comes after the modules it imports. Import
+    cycles are broken by name.
+    """
+    ordered = list()
+    done = set()
+    visiting = set()
+
+    def visit(name):
+        if name in done or name in visiting:
+            return
+        visiting.add(name)
+        for imported in sorted(graph.get(name, set())):
+            if imported in names:
+                visit(imported)
+        visiting.discard(name)
+        done.add(name)
+        ordered.append(name)
+
+    for name in sorted(names):
+        visit(name)
+    return ordered
+
+def _get_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def _get_load_mtime(name, default):
+    """
+    The source mtime a module was loaded from, default (the current one)
+    if unknown.
+    """
+    mtime = import_index.get_load_mtime(name)
+    if mtime is not None:
+        return mtime
+
+    # a .pyc starts with the magic number and the source mtime it's from
+    module_file = getattr(sys.modules.get(name), "__file__", "")
+    if module_file.endswith((".pyc", ".pyo")):
+        try:
+            with open(module_file, "rb") as compiled:
+                header = compiled.read(8)
+        except IOError:
+            return default
+        if len(header) == 8 and default is not None:
+            # whole seconds, the stat mtime isn't
+            compiled_mtime = struct.unpack("<I", header[4:])[0]
+            if compiled_mtime != int(default):
+                return compiled_mtime
+    return default
+
+def _get_imports(path):
+    """
+    Module names a source file imports, cached per mtime.
+    """
+    mtime = _get_mtime(path)
+    cached = _IMPORTS.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    imports = set()
+    try:
+        with open(path) as source:
+            tree = ast.parse(source.read(), path)
+    except (IOError, SyntaxError):
+        tree = None
+    for node in ast.walk(tree) if tree else list():
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.add(node.module)
+            # from package import module
+            imports.update(node.module + "." + alias.name
+                           for alias in node.names)
+    _IMPORTS[path] = (mtime, imports)
+    return imports
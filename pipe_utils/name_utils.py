@@ -12,6 +12,11 @@
     from utils import name_utils
     name = name_utils.get_unique_name(char, side, node_type, suffix)
     loc = pm.spaceLocator(n=name)
+
+    # many names at once, no objExists per name
+    index = name_utils.NameIndex()
+    names = [index.get_unique_name(char, side, node_type, suffix)
+             for count in xrange(200)]
 """
 
 #------------------------------------------------------------------------------#
@@ -20,6 +25,11 @@
 # built-in
 from maya import OpenMaya, cmds
 
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+ROOT_NAME = '{0}_{1}_{2}0{3}_{4}'
+
 #------------------------------------------------------------------------------#
 #----------------------------------------------------------------- FUNCTIONS --#
 
@@ -41,7 +51,7 @@ class NameUtils(object):
         """
 
         # naming convention
-        root_name = '{0}_{1}_{2}0{3}_{4}'
+        root_name = ROOT_NAME
         name = root_name.format(asset, side, part, str(1), suffix)
 
         count = 1
@@ -50,3 +60,49 @@ class NameUtils(object):
             name = root_name.format(asset, side, part, count, suffix)
 
         return name
+
+
+class NameIndex(object):
+    """
+    Snapshot of the short names in the scene, for building many unique
+    names in memory. Names handed out are reserved, so they stay unique
+    between each other before anything is created or renamed.
+    """
+    def __init__(self, names=None):
+        """
+        @params:
+            names: Names to index, defaults to every node in the scene.
+        """
+        if names is None:
+            names = cmds.ls()
+        self.names = set(name.split("|")[-1] for name in names)
+        self.counts = dict()
+
+    def exists(self, name):
+        return name in self.names
+
+    def reserve(self, name):
+        self.names.add(name)
+
+    def release(self, names):
+        """
+        Frees names, i.e., of nodes that are about to be renamed.
+        """
+        for name in names:
+            self.names.discard(name.split("|")[-1])
+        self.counts.clear()
+
+    def get_unique_name(self, asset="asset", side="c", part="part",
+                        suffix="loc"):
+        """
+        Same as NameUtils.get_unique_name, against the index.
+        """
+        key = (asset, side, part, suffix)
+        count = self.counts.get(key, 1)
+        name = ROOT_NAME.format(asset, side, part, count, suffix)
+        while name in self.names:
+            count += 1
+            name = ROOT_NAME.format(asset, side, part, count, suffix)
+        self.counts[key] = count + 1
+        self.names.add(name)
+        return name
@@ -14,7 +14,6 @@
 
 # built-in
 import os
-import sys
 import json
 import shutil
 
@@ -69,12 +68,10 @@ def win_path_convert(path=None):
     return path
 
 def reset_all_modules():
-    """Resets all system modules, used for reloading."""
-    if globals().has_key('init_modules'):
-        for m in [x for x in sys.modules.keys() if x not in init_modules]:
-            del(sys.modules[m])
-    else:
-        init_modules = sys.modules.keys()
+    """Reloads changed pipeline modules and their dependents, used for
+    reloading. See pipe_utils.module_reloader."""
+    from pipe_utils import module_reloader
+    return module_reloader.reload_changed()
 
 def build_path(folder, name):
     return win_path_convert(os.path.join(os.path.dirname(os.path.realpath(__file__)),
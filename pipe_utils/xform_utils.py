@@ -7,17 +7,45 @@
 
 :description:
     Base module for zeroing out objects.
+
+:use:
+    from pipe_utils import xform_utils
+    grp = xform_utils.zero(pm.PyNode("kong_l_arm01_ctrl"))
+
+    # whole hierarchies, one API pass
+    groups = xform_utils.zero_many(cmds.ls(sl=True), hierarchy=True)
 """
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- IMPORTS --#
 
 # third-party
-from maya import OpenMaya
+from maya import OpenMaya, cmds
 import pymel.core as pm
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 # internal
-from name_utils import NameUtils
+from name_utils import NameUtils, NameIndex
+
+# external
+from pipe_utils import api_undo
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+# plug, axes, value, set on the zeroed objects
+ZERO_VALUES = (("translate", ("X", "Y", "Z"), 0.0),
+               ("rotate", ("X", "Y", "Z"), 0.0),
+               ("scale", ("X", "Y", "Z"), 1.0),
+               ("shear", ("XY", "XZ", "YZ"), 0.0))
+JOINT_ORIENT = ("jointOrient", ("X", "Y", "Z"), 0.0)
+
+# transforms hierarchy mode leaves alone
+SKIP_TYPES = ("constraint", "ikEffector")
 
 #------------------------------------------------------------------------------#
 #----------------------------------------------------------------- FUNCTIONS --#
@@ -44,5 +72,162 @@ def zero(obj):
     # rebuild
     obj.setParent(grp)
     if parent:
-        grp.setParent(par)
+        grp.setParent(parent)
     return grp
+
+def zero_many(objects, hierarchy=False):
+    """
+    Groups and zeroes out many objects at once, one undo entry, returns the
+    groups. The groups are full paths, in the order of the objects, parents
+    before children for hierarchies.
+    @params:
+        objects: Transforms, names or PyNodes.
+        hierarchy: Also zero every transform below them, constraints and
+                   ik effectors excluded.
+    NOTES:
+        World matrices are read in one pass, the groups are created,
+        reparented and the objects reset through one MDagModifier, on Maya's
+        undo queue through api_undo. What reset can't clear (locked
+        channels, rotateAxis, pivots) stays in the objects' local matrices,
+        the group offsets take it out, computed together (numpy when there
+        is numpy).
+    """
+    paths = list()
+    for path in cmds.ls([str(obj) for obj in objects], l=True,
+                        type="transform"):
+        if path not in paths:
+            paths.append(path)
+    if hierarchy and paths:
+        given = set(paths)
+        below = cmds.listRelatives(paths, ad=True, f=True,
+                                   type="transform") or list()
+        skip = set(cmds.ls(below, l=True, type=list(SKIP_TYPES)) or list())
+        paths += [path for path in set(below) if path not in given and
+                  path not in skip]
+        # parents before their children
+        paths.sort(key=lambda path: path.count("|"))
+    if not paths:
+        return list()
+
+    # world and parent world matrices, one pass
+    dag_paths = list()
+    worlds = list()
+    parents = list()
+    selection_list = OpenMaya.MSelectionList()
+    for path in paths:
+        selection_list.add(path)
+    for count in xrange(selection_list.length()):
+        dag_path = OpenMaya.MDagPath()
+        selection_list.getDagPath(count, dag_path)
+        dag_paths.append(dag_path)
+        worlds.append(dag_path.inclusiveMatrix())
+        parents.append(dag_path.exclusiveMatrix())
+
+    # groups, under the objects' parents
+    index = NameIndex()
+    modifier = OpenMaya.MDagModifier()
+    groups = list()
+    for dag_path in dag_paths:
+        node = dag_path.node()
+        parent = OpenMaya.MFnDagNode(dag_path).parent(0)
+        if parent.hasFn(OpenMaya.MFn.kWorld):
+            group = modifier.createNode("transform")
+        else:
+            group = modifier.createNode("transform", parent)
+        name = _group_name(index, dag_path.partialPathName())
+        modifier.renameNode(group, name)
+        _queue_inverse_scale(modifier, node)
+        modifier.reparentNode(node, group)
+        _queue_zero(modifier, node)
+        groups.append(group)
+
+    # groups take the objects' offsets, again on redo, read once the
+    # objects are reset under groups still at identity
+    nodes = [dag_path.node() for dag_path in dag_paths]
+    offsets = list()
+    def set_offsets():
+        if not offsets:
+            remaining = list()
+            for node in nodes:
+                dag_path = OpenMaya.MDagPath()
+                OpenMaya.MDagPath.getAPathTo(node, dag_path)
+                remaining.append(dag_path.inclusiveMatrix() *
+                                 dag_path.exclusiveMatrixInverse())
+            offsets.extend(_group_offsets(remaining, worlds, parents))
+        for group, offset in zip(groups, offsets):
+            transform_fn = OpenMaya.MFnTransform(group)
+            transform_fn.set(OpenMaya.MTransformationMatrix(offset))
+    api_undo.do_it(modifier, set_offsets)
+
+    return [OpenMaya.MFnDagNode(group).fullPathName() for group in groups]
+
+def _group_offsets(remaining, worlds, parents):
+    """
+    Returns local inverse * world * parent world inverse per object, as
+    MMatrix, the group matrix keeping the object where it was.
+    @params:
+        remaining: The objects' local matrices left after reset.
+        worlds: Their world matrices before.
+        parents: Their parents' world matrices.
+    """
+    if not NUMPY:
+        return [local.inverse() * world * parent.inverse() for local, world,
+                parent in zip(remaining, worlds, parents)]
+
+    remaining = numpy.array([_matrix_to_list(matrix) for matrix in remaining])
+    worlds = numpy.array([_matrix_to_list(matrix) for matrix in worlds])
+    parents = numpy.array([_matrix_to_list(matrix) for matrix in parents])
+    remaining = remaining.reshape(-1, 4, 4)
+    worlds = worlds.reshape(-1, 4, 4)
+    parents = parents.reshape(-1, 4, 4)
+    offsets = numpy.einsum("nij,njk,nkl->nil", numpy.linalg.inv(remaining),
+                           worlds, numpy.linalg.inv(parents))
+
+    matrices = list()
+    for offset in offsets:
+        matrix = OpenMaya.MMatrix()
+        OpenMaya.MScriptUtil.createMatrixFromList(offset.ravel().tolist(),
+                                                  matrix)
+        matrices.append(matrix)
+    return matrices
+
+def _matrix_to_list(matrix):
+    return [matrix(row, column) for row in xrange(4) for column in xrange(4)]
+
+def _queue_zero(modifier, node):
+    """
+    Queues identity values on an object's transform plugs, jointOrient
+    included, locked plugs are left alone.
+    """
+    node_fn = OpenMaya.MFnDependencyNode(node)
+    values = list(ZERO_VALUES)
+    if node.hasFn(OpenMaya.MFn.kJoint):
+        values.append(JOINT_ORIENT)
+    for name, axes, value in values:
+        for axis in axes:
+            plug = node_fn.findPlug(name + axis)
+            if not plug.isLocked():
+                modifier.newPlugValueDouble(plug, value)
+
+def _queue_inverse_scale(modifier, node):
+    """
+    Queues disconnecting a joint's inverseScale from its parent joint,
+    like cmds.parent does when the new parent isn't a joint.
+    """
+    if not node.hasFn(OpenMaya.MFn.kJoint):
+        return
+    plug = OpenMaya.MFnDependencyNode(node).findPlug("inverseScale")
+    sources = OpenMaya.MPlugArray()
+    plug.connectedTo(sources, True, False)
+    for count in xrange(sources.length()):
+        modifier.disconnect(sources[count], plug)
+
+def _group_name(index, name):
+    """
+    Group name as zero() builds it, against a NameIndex.
+    """
+    temp = name.split("|")[-1].split("_")
+    if len(temp) < 3:
+        return index.get_unique_name(temp[0], "c", "part", "grp")
+    return index.get_unique_name(temp[0].split('0')[0], temp[1],
+                                 temp[2].split('0')[0], "grp")
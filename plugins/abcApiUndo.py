@@ -0,0 +1,70 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    abcApiUndo command, puts API edits on Maya's undo queue.
+
+    API modifiers (MDGModifier, MDagModifier) and plug edits are not on
+    Maya's undo queue. Once an edit is done, pipe_utils.api_undo hands its
+    undo and redo functions over and calls this command, which keeps them
+    and runs them on undo and redo like any other command. Inside an undo
+    chunk (decorators.undo) it is part of that one undo entry.
+
+:use:
+    loaded by pipe_utils.api_undo, not called directly
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# third-party
+from maya import OpenMayaMPx
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+COMMAND = "abcApiUndo"
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class ApiUndo(OpenMayaMPx.MPxCommand):
+    """
+    Holds one API edit's undo and redo.
+    """
+    def __init__(self):
+        OpenMayaMPx.MPxCommand.__init__(self)
+        self.undo = None
+        self.redo = None
+
+    def doIt(self, args):
+        # the edit is done already, only take it over
+        from pipe_utils import api_undo
+        self.undo, self.redo = api_undo.take_pending()
+
+    def undoIt(self):
+        self.undo()
+
+    def redoIt(self):
+        self.redo()
+
+    def isUndoable(self):
+        return True
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def creator():
+    return OpenMayaMPx.asMPxPtr(ApiUndo())
+
+def initializePlugin(mobject):
+    plugin = OpenMayaMPx.MFnPlugin(mobject, "acarlisle", "1.0")
+    plugin.registerCommand(COMMAND, creator)
+
+def uninitializePlugin(mobject):
+    plugin = OpenMayaMPx.MFnPlugin(mobject)
+    plugin.deregisterCommand(COMMAND)
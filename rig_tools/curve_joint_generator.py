@@ -7,6 +7,21 @@
 
 :description:
     For building joints along a curve.
+
+    Two placement modes:
+        ik: joints are built along Y and snapped onto the curve with an
+            ikSplineHandle.
+        arc length: joints are placed at equal arc-length parameters of the
+            curve (MFnNurbsCurve), oriented along the chain with a shared up
+            vector in NumPy, and the chains of every selected curve are
+            created in one DAG modifier.
+
+:use:
+    from rig_tools import curve_joint_generator
+    tool = curve_joint_generator.CurveJointGenerator(gui=False,
+                                                     arc_length=True)
+    tool.build_on_curves(["hair01_crv", "hair02_crv"], 20, "kong", "c",
+                         "hair", "bindJnt")
 """
 
 #------------------------------------------------------------------------------#
@@ -16,14 +31,23 @@
 import shiboken
 import pymel.core as pm
 import maya.OpenMayaUI as mui
+from maya import OpenMaya
+
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
 
 # 3rd party
 from Qt import QtGui, QtCore, QtWidgets
 
 # external
 import settings
-from pipe_utils.name_utils import NameUtils
+from pipe_utils import api_undo
+from pipe_utils.name_utils import NameUtils, NameIndex
 from pipe_utils.ui_utils import UIUtils
+from pipe_utils.math_utils import euler_from_matrix
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
@@ -34,7 +58,8 @@ class CurveJointGenerator(UIUtils):
     """
     def __init__(self, parent=None, gui=True, joints=10, del_curve=True,
                  del_ikHandle=True, asset = "asset", side="l", part="part",
-                 suffix="bindJnt", *args, **kwargs):
+                 suffix="bindJnt", arc_length=False, up_vector=(0, 1, 0),
+                 *args, **kwargs):
         """
         Defines the curve joint generator.
 
@@ -46,6 +71,8 @@ class CurveJointGenerator(UIUtils):
             asset: For naming convention.
             side: For naming convention. (r, l, c)
             part: For naming convention.
+            arc_length: Place joints at equal arc length, no ikHandle.
+            up_vector: World up of the joints in arc length mode.
         """
 
         # super
@@ -59,6 +86,8 @@ class CurveJointGenerator(UIUtils):
         self.side = side
         self.part = part
         self.suffix = suffix
+        self.arc_length = arc_length
+        self.up_vector = up_vector
 
         if self.gui:
             self._build_ui()
@@ -98,6 +127,9 @@ class CurveJointGenerator(UIUtils):
         joints_layout.addWidget(self.joints_box)
         joints_layout.addWidget(self.del_curve)
         joints_layout.addWidget(self.del_ikHandle)
+        self.arc_length_box = QtGui.QCheckBox()
+        self.arc_length_box.setText("Arc Length")
+        joints_layout.addWidget(self.arc_length_box)
 
         # divider
         spacer = QtGui.QSpacerItem(40, 10, QtGui.QSizePolicy.Expanding,
@@ -145,6 +177,7 @@ class CurveJointGenerator(UIUtils):
         part = self.part
         joints = self.joints
         suffix = self.suffix
+        arc_length = self.arc_length
 
         if self.gui:
             asset = self.asset_name.text()
@@ -152,6 +185,16 @@ class CurveJointGenerator(UIUtils):
             part = self.part_name.text()
             joints = self.joints_box.value()
             suffix = self.suffix.currentText()
+            arc_length = self.arc_length_box.isChecked()
+
+        # every selected curve at once
+        if arc_length:
+            curves = [str(curve) for curve in pm.ls(sl=True)]
+            if not curves:
+                pm.warning("Please select a curve")
+                return
+            return self.build_on_curves(curves, joints, asset, side, part,
+                                        suffix)
         try:
             curve = pm.ls(sl=True)[0]
             curve_name = NameUtils.get_unique_name(asset, side, part, "crv")
@@ -197,6 +240,106 @@ class CurveJointGenerator(UIUtils):
         self._cleanup()
 
 
+    def build_on_curves(self, curves, joints, asset, side, part, suffix):
+        """
+        Builds a chain of joints + 1 joints along each curve, at equal arc
+        length, in one undoable DAG modifier. Returns the chains (root to
+        end).
+        @params:
+            curves: Curve transforms or shapes.
+            joints: Number of segments per curve.
+            asset, side, part, suffix: For naming convention.
+        """
+        if not NUMPY:
+            return pm.warning("Arc length placement requires numpy.")
+
+        index = NameIndex()
+        modifier = OpenMaya.MDagModifier()
+        chains = list()
+        for curve in curves:
+            matrices = self._arc_length_matrices(curve, joints)
+
+            # joint world matrices to local, root is parented to the world
+            local = matrices.copy()
+            local[1:] = numpy.matmul(matrices[1:],
+                                     numpy.linalg.inv(matrices[:-1]))
+            orients = numpy.radians(euler_from_matrix(local[:, :3, :3]))
+
+            chain = list()
+            parent = OpenMaya.MObject()
+            for count in xrange(len(local)):
+                name = index.get_unique_name(asset, side, part, suffix)
+                if count == len(local) - 1:
+                    name += "End"
+                    index.reserve(name)
+                joint = modifier.createNode("joint", parent)
+                modifier.renameNode(joint, name)
+                chain.append((joint, local[count, 3, :3], orients[count]))
+                parent = joint
+            chains.append(chain)
+        modifier.doIt()
+
+        # values, same modifier so one undo covers everything
+        names = list()
+        for chain in chains:
+            chain_names = list()
+            for joint, translate, orient in chain:
+                joint_fn = OpenMaya.MFnDependencyNode(joint)
+                for attr, values in (("translate", translate),
+                                     ("jointOrient", orient)):
+                    for axis, value in zip("XYZ", values):
+                        plug = joint_fn.findPlug(attr + axis)
+                        modifier.newPlugValueDouble(plug, float(value))
+                chain_names.append(OpenMaya.MFnDagNode(joint).fullPathName())
+            names.append(chain_names)
+        api_undo.do_it(modifier)
+        return names
+
+    def _arc_length_matrices(self, curve, joints):
+        """
+        World matrices (joints + 1, 4, 4) at equal arc length along a curve,
+        x aims down the chain, y is up.
+        """
+        selection_list = OpenMaya.MSelectionList()
+        selection_list.add(curve)
+        dag_path = OpenMaya.MDagPath()
+        selection_list.getDagPath(0, dag_path)
+        dag_path.extendToShape()
+        curve_fn = OpenMaya.MFnNurbsCurve(dag_path)
+
+        # sample
+        length = curve_fn.length()
+        positions = numpy.empty((joints + 1, 3))
+        point = OpenMaya.MPoint()
+        for count in xrange(joints + 1):
+            distance = min(length * count / float(joints), length)
+            param = curve_fn.findParamFromLength(distance)
+            curve_fn.getPointAtParam(param, point, OpenMaya.MSpace.kWorld)
+            positions[count] = (point.x, point.y, point.z)
+        tangent = curve_fn.tangent(param, OpenMaya.MSpace.kWorld)
+
+        # aim at the next joint, the end joint follows the curve tangent
+        aim = numpy.empty_like(positions)
+        aim[:-1] = positions[1:] - positions[:-1]
+        aim[-1] = (tangent.x, tangent.y, tangent.z)
+        aim /= numpy.linalg.norm(aim, axis=-1)[:, None]
+
+        # side and up from the world up, z up where they're parallel
+        up = numpy.array(self.up_vector, dtype=float)
+        side = numpy.cross(aim, up)
+        parallel = numpy.linalg.norm(side, axis=-1) < 1e-6
+        side[parallel] = numpy.cross(aim[parallel], (0.0, 0.0, 1.0))
+        side /= numpy.linalg.norm(side, axis=-1)[:, None]
+        up = numpy.cross(side, aim)
+
+        matrices = numpy.zeros((joints + 1, 4, 4))
+        matrices[:, 0, :3] = aim
+        matrices[:, 1, :3] = up
+        matrices[:, 2, :3] = side
+        matrices[:, 3, :3] = positions
+        matrices[:, 3, 3] = 1.0
+        return matrices
+
     def _cleanup(self, *args):
         """
         Cleanup
@@ -7,19 +7,31 @@
 
 :description:
     Tool for renaming joints.
+
+    All final names are built in memory against a NameIndex (a snapshot of
+    the scene's names, with the renamed joints' own names released), then
+    applied through one MDagModifier. No temp names, no objExists per name.
+    The modifier is on Maya's undo queue (pipe_utils.api_undo).
+
+:use:
+    from rig_tools import joint_renamer
+    renamer = joint_renamer.JointRenamer()
+    renamer.rename("kong", "l", "arm", "jnt")
+
+    # many chains at once
+    renamer.rename_many([(arm_joints, "kong", "l", "arm", "jnt"),
+                         (leg_joints, "kong", "l", "leg", "jnt")])
 """
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- IMPORTS --#
 
-# build in
-from random import randint
-
 # third-party
-from maya import cmds
+from maya import cmds, OpenMaya
 
 # external
-from pipe_utils.name_utils import NameUtils
+from pipe_utils import api_undo
+from pipe_utils.name_utils import NameIndex
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
@@ -38,33 +50,77 @@ class JointRenamer(object):
         """
         Renames joint hierarchy.
         """
-        new_joints = list()
-        tmp_joints = list()
-
         # get joints
-        joint_chain = cmds.ls(sl=True, dag=True, sn=True, type="joint")
+        joint_chain = cmds.ls(sl=True, dag=True, l=True, type="joint")
         if selected:
-            joint_chain = cmds.ls(sl=True, type="joint")
+            joint_chain = cmds.ls(sl=True, l=True, type="joint")
 
         # check for selection
         if not joint_chain:
             return cmds.warning("No Joints selected")
 
-        # for rebuilding
-        for joint in joint_chain:
-            random = randint(10000, 99999)
-            tmp_name = joint + str(random)
-            tmp_joint = cmds.rename(joint, tmp_name)
-            tmp_joints.append(tmp_joint)
-
-        # rename
-        for joint in tmp_joints:
-            new_name = NameUtils.get_unique_name(asset, side, part, suffix)
-            if cmds.objExists(joint):
-                new_joint = cmds.rename(joint, new_name)
-                new_joints.append(new_joint)
-
-        # end joint
-        if end_joint:
-            last_joint = new_joints[-1]
-            last_joint = cmds.rename(last_joint, last_joint + "End")
+        return self.rename_many([(joint_chain, asset, side, part, suffix)],
+                                end_joint)
+
+    def rename_many(self, chains, end_joint=None):
+        """
+        Renames many joint chains in one go, returns the new names.
+        @params:
+            chains: List of (joints, asset, side, part, suffix).
+            end_joint: Adds "End" to the last joint of every chain.
+        """
+        # the joints' own names are free to reuse
+        index = NameIndex()
+        index.release(joint for chain in chains for joint in chain[0])
+
+        # build every name in memory
+        renames = list()
+        new_chains = list()
+        for joints, asset, side, part, suffix in chains:
+            names = [index.get_unique_name(asset, side, part, suffix)
+                     for joint in joints]
+            if end_joint and names:
+                names[-1] = names[-1] + "End"
+                index.reserve(names[-1])
+            renames.extend(zip(joints, names))
+            new_chains.append(names)
+
+        self._apply(renames)
+        return new_chains
+
+    def _apply(self, renames):
+        """
+        Renames through one undoable MDagModifier, returns it.
+        @params:
+            renames: List of (joint, new name).
+        """
+        # drop names that don't change
+        pending = list()
+        for joint, name in renames:
+            short_name = joint.split("|")[-1]
+            if short_name != name:
+                pending.append((joint, short_name, name))
+
+        # rename a joint only once the joint holding its name moved off it,
+        # what's left are cycles, which never clash since a chain's joints
+        # are not siblings
+        ordered = list()
+        waiting = list(pending)
+        while waiting:
+            held = set(short_name for joint, short_name, name in waiting)
+            ready = [item for item in waiting if item[2] not in held]
+            if not ready:
+                ready = waiting
+            ordered.extend(ready)
+            ready = set(ready)
+            waiting = [item for item in waiting if item not in ready]
+
+        modifier = OpenMaya.MDagModifier()
+        selection_list = OpenMaya.MSelectionList()
+        for joint, short_name, name in ordered:
+            selection_list.add(joint)
+        for count, (joint, short_name, name) in enumerate(ordered):
+            mobject = OpenMaya.MObject()
+            selection_list.getDependNode(count, mobject)
+            modifier.renameNode(mobject, name)
+        return api_undo.do_it(modifier)
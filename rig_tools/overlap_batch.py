@@ -0,0 +1,228 @@
+#!/usr/bin/python
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Batch baking of overlap rigs in a pool of worker processes.
+
+    The scene side (OverlapTool.export_batch) writes one job file per group
+    of rigs that share solver state (the same nucleus). A job holds the rig
+    metadata (controls, rotate orders, dynamic settings, point lock) and the
+    sampled input animation. Workers solve their job with the offline
+    Verlet solver and return compact per-attribute key arrays, which
+    OverlapTool.batch_solve merges back into anim curves.
+
+    Nothing in here touches Maya. A worker is either a headless process
+    running this file as a script:
+        mayapy overlap_batch.py job.npz result.npz
+    or a LocalWorker, which solves in the calling process (no farm, no
+    mayapy, same results).
+
+:use:
+    from rig_tools import overlap_batch
+    results = overlap_batch.run(job_paths, workers=4)
+    results = overlap_batch.run(job_paths, worker=overlap_batch.LocalWorker)
+
+:see also:
+    rig_tools/overlap_solver.py
+    rig_tools/overlap_tool.py
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import sys
+import json
+import time
+import multiprocessing
+
+# third party
+try:
+    import numpy
+except ImportError:
+    pass
+
+# internal
+try:
+    from rig_tools import overlap_solver, overlap_wedge
+except ImportError:
+    # worker process, run as a script
+    import overlap_solver
+    import overlap_wedge
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+# seconds between checks on the running workers
+POLL_INTERVAL = 0.1
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def write_job(path, rigs, times):
+    """
+    Writes a job file.
+    @params:
+        path: The .npz file.
+        rigs: List of dicts, one per rig:
+            rig: Meta node name.
+            controls: The controls that get keyed, root to tip.
+            rotate_orders: Rotate order per control, i.e., "xyz".
+            settings: See overlap_solver.settings_from_attributes.
+            point_lock: "base" = 0, "both-ends" = 1.
+            world, parent: Input matrices (frames, joints, 4, 4).
+        times: Frames.
+    """
+    header = {"times": list(times), "rigs": list()}
+    arrays = dict()
+    for count, rig in enumerate(rigs):
+        data = dict((key, value) for key, value in rig.iteritems()
+                    if key not in ("world", "parent"))
+        header["rigs"].append(data)
+        arrays["world{0}".format(count)] = rig["world"]
+        arrays["parent{0}".format(count)] = rig["parent"]
+    numpy.savez(path, header=json.dumps(header), **arrays)
+    return path
+
+def read_job(path):
+    """
+    Reads a job file, returns (rigs, times) as given to write_job.
+    """
+    data = numpy.load(path)
+    header = json.loads(str(data["header"]))
+    rigs = header["rigs"]
+    for count, rig in enumerate(rigs):
+        rig["world"] = data["world{0}".format(count)]
+        rig["parent"] = data["parent{0}".format(count)]
+    return rigs, header["times"]
+
+def bake_job(path):
+    """
+    Solves a job, returns {rig: rotations} with rotations as float32 key
+    arrays (controls, 3, frames), one row per rotate attribute.
+    """
+    rigs, times = read_job(path)
+    result = dict()
+    for rig in rigs:
+        world = rig["world"][:, None]
+        parent = rig["parent"][:, None]
+        goals = world[:, :, :, 3, :3]
+        positions = overlap_solver.solve(goals, rig["settings"],
+                                         rig["point_lock"])
+        rotations = overlap_solver.chain_rotations(world, parent, positions,
+                                                   rig["rotate_orders"])
+        keys = numpy.transpose(rotations[:, 0], (1, 2, 0))
+        result[rig["rig"]] = keys.astype(numpy.float32)
+    return result
+
+def write_result(path, result):
+    """
+    Writes a worker result.
+    """
+    rigs = sorted(result)
+    arrays = dict(("keys{0}".format(count), result[rig]) for count, rig
+                  in enumerate(rigs))
+    numpy.savez(path, rigs=json.dumps(rigs), **arrays)
+
+def read_result(path):
+    """
+    Reads a worker result, {rig: key arrays}.
+    """
+    data = numpy.load(path)
+    rigs = json.loads(str(data["rigs"]))
+    return dict((rig, data["keys{0}".format(count)]) for count, rig
+                in enumerate(rigs))
+
+def run(job_paths, workers=None, worker=None):
+    """
+    Bakes the jobs in a pool of workers, returns the merged {rig: keys}.
+    @params:
+        job_paths: Job files, see write_job.
+        workers: Workers running at once, defaults to the cpu count.
+        worker: Worker class, ProcessWorker or LocalWorker.
+    """
+    if not worker:
+        worker = ProcessWorker
+    if not workers:
+        workers = multiprocessing.cpu_count()
+
+    results = dict()
+    pending = list(job_paths)
+    running = list()
+    try:
+        while pending or running:
+            # fill the pool
+            while pending and len(running) < workers:
+                job_path = pending.pop(0)
+                result_path = os.path.splitext(job_path)[0] + "_result.npz"
+                running.append(worker(job_path, result_path))
+
+            # collect whichever are done, their slots refill
+            done = [current for current in running
+                    if current.poll() is not None]
+            if not done:
+                time.sleep(POLL_INTERVAL)
+                continue
+            for current in done:
+                running.remove(current)
+                if current.poll() != 0:
+                    message = "Overlap batch worker failed: {0}"
+                    raise RuntimeError(message.format(current.job_path))
+                results.update(read_result(current.result_path))
+    finally:
+        # a failure leaves no worker behind
+        for current in running:
+            current.kill()
+    return results
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class ProcessWorker(object):
+    """
+    Bakes a job in a headless process (mayapy inside Maya).
+    """
+    def __init__(self, job_path, result_path):
+        self.job_path = job_path
+        self.result_path = result_path
+        self.process = overlap_wedge.start_worker(__file__, job_path,
+                                                  result_path)
+
+    def poll(self):
+        """
+        The exit code, None while it runs.
+        """
+        return self.process.poll()
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+
+class LocalWorker(object):
+    """
+    Stand-in for ProcessWorker, bakes the job in this process.
+    """
+    def __init__(self, job_path, result_path):
+        self.job_path = job_path
+        self.result_path = result_path
+        write_result(result_path, bake_job(job_path))
+
+    def poll(self):
+        return 0
+
+    def kill(self):
+        pass
+
+#------------------------------------------------------------------------------#
+#---------------------------------------------------------------------- MAIN --#
+
+if __name__ == "__main__":
+    write_result(sys.argv[2], bake_job(sys.argv[1]))
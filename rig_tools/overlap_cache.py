@@ -0,0 +1,255 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Simulation result cache for the overlap tool.
+
+    Every overlap rig solve is recorded per frame (the solved values of the
+    original controls, which are constrained to the dynamic joints) and
+    keyed by a hash of everything that feeds the solver:
+        - the dynamic control attribute values (what _data("save") collects)
+        - the animation on the input controls (DyFKCtrl + parent control)
+        - the frame range
+    If nothing changed, a bake writes the cached result straight to keys
+    without running nHair again, and playback follows the cached values
+    with the hair system off (see OverlapTool.play_cached).
+
+:use:
+    from rig_tools import overlap_cache
+    key = overlap_cache.build_key(dynamic_control, input_controls, (1, 100))
+    record = overlap_cache.CACHE.get(key)
+
+:see also:
+    rig_tools/overlap_tool.py
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+# third party
+from maya import cmds
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+TR_ATTRS = ("tx", "ty", "tz", "rx", "ry", "rz")
+CACHE_SIZE = 8
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def build_key(dynamic_control, input_controls, frame_range):
+    """
+    Hashes the solver inputs of an overlap rig.
+    @params:
+        dynamic_control: The rig's dynamic control (DyCtrl).
+        input_controls: Controls carrying the input animation.
+        frame_range: Tuple (int(start), int(end)).
+    """
+    # dynamic settings
+    settings = dict()
+    attributes = cmds.listAttr(dynamic_control, ud=True) or list()
+    for attribute in attributes:
+        value = cmds.getAttr("{0}.{1}".format(dynamic_control, attribute))
+        settings[attribute] = value
+
+    # input animation
+    animation = list()
+    for control in input_controls:
+        times = cmds.keyframe(control, q=True, tc=True) or list()
+        values = cmds.keyframe(control, q=True, vc=True) or list()
+        angles = cmds.keyTangent(control, q=True, ia=True, oa=True) or list()
+        animation.append([control, times, values, angles])
+
+    payload = [settings, animation, [frame_range[0], frame_range[1]]]
+    payload = json.dumps(payload, sort_keys=True)
+    return hashlib.md5(payload).hexdigest()
+
+def spill_path():
+    """
+    Default on-disk location for cache records pushed out of memory.
+    """
+    return cmds.internalVar(utd=True) + "overlap_cache/"
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class OverlapCache(object):
+    """
+    LRU cache of solved overlap rigs, with optional on-disk spill.
+    A record is a dict:
+        controls: The controls that were solved.
+        attributes: TR_ATTRS.
+        times: Frames.
+        values: values[control][attribute][frame]
+    """
+    def __init__(self, size=CACHE_SIZE, spill=None):
+        """
+        @params:
+            size: Records kept in memory.
+            spill: Directory for evicted records, None keeps memory only.
+        """
+        self.size = size
+        self.spill = spill
+        self.records = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns the cached record or None.
+        """
+        if key in self.records:
+            record = self.records.pop(key)
+            self.records[key] = record
+            return record
+
+        # spilled to disk
+        path = self._path(key)
+        if path and os.path.isfile(path):
+            fobj = open(path)
+            record = json.load(fobj)
+            fobj.close()
+            self.put(key, record)
+            return record
+
+    def put(self, key, record):
+        """
+        Stores a record, evicting the least recently used ones.
+        """
+        if key in self.records:
+            self.records.pop(key)
+        self.records[key] = record
+
+        while len(self.records) > self.size:
+            old_key, old_record = self.records.popitem(last=False)
+            self._spill(old_key, old_record)
+
+    def clear(self):
+        """
+        Clears memory and disk.
+        """
+        self.records.clear()
+        if self.spill and os.path.isdir(self.spill):
+            for path in os.listdir(self.spill):
+                if path.endswith(".json"):
+                    os.remove(os.path.join(self.spill, path))
+
+    def _path(self, key):
+        if not self.spill:
+            return
+        return os.path.join(self.spill, key + ".json")
+
+    def _spill(self, key, record):
+        path = self._path(key)
+        if not path:
+            return
+        if not os.path.isdir(self.spill):
+            os.makedirs(self.spill)
+        fobj = open(path, "w")
+        fobj.write(json.dumps(record))
+        fobj.close()
+
+
+class Recorder(object):
+    """
+    Records an overlap rig while it plays, so the next bake is free.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self.job = None
+        self.key = None
+        self.controls = list()
+        self.frame_range = None
+        self.frames = dict()
+        self.last_frame = None
+
+    def start(self, key, controls, frame_range):
+        """
+        Starts recording on every time change.
+        @params:
+            key: build_key() of the rig.
+            controls: The original (constrained) controls.
+            frame_range: Tuple (int(start), int(end)).
+        """
+        self.stop()
+        if self.cache.get(key):
+            return
+        self.key = key
+        self.controls = list(controls)
+        self.frame_range = frame_range
+        self.frames = dict()
+        self.last_frame = None
+        self.job = cmds.scriptJob(event=["timeChanged", self._record])
+
+    def stop(self):
+        """
+        Stops recording, only complete runs from the start frame are kept.
+        """
+        if self.job is not None and cmds.scriptJob(exists=self.job):
+            cmds.scriptJob(kill=self.job, force=True)
+        self.job = None
+        if not self.key:
+            return
+        self._store()
+        self.key = None
+        self.frames = dict()
+        self.last_frame = None
+
+    def _store(self):
+        """
+        Caches the recording if it's a complete run.
+        """
+        start, end = self.frame_range
+        times = range(int(start), int(end) + 1)
+        if not all(time in self.frames for time in times):
+            return
+        values = list()
+        for count, control in enumerate(self.controls):
+            values.append([[self.frames[time][count][attr] for time
+                            in times] for attr in xrange(len(TR_ATTRS))])
+        record = {"controls": self.controls,
+                  "attributes": list(TR_ATTRS),
+                  "times": times,
+                  "values": values}
+        self.cache.put(self.key, record)
+
+    def _record(self):
+        time = int(round(cmds.currentTime(q=True)))
+        start, end = self.frame_range
+
+        # nucleus is only valid when played in order from the start, any
+        # other step (scrubbing, jumping back) restarts the recording
+        if time == start:
+            self.frames = dict()
+        elif self.last_frame is None or time != self.last_frame + 1:
+            self.frames = dict()
+            self.last_frame = None
+            return
+        if time > end:
+            self.last_frame = None
+            return
+
+        values = list()
+        for control in self.controls:
+            values.append([cmds.getAttr("{0}.{1}".format(control, attr))
+                           for attr in TR_ATTRS])
+        self.frames[time] = values
+        self.last_frame = time
+
+        # keep a complete run, whatever is played after it
+        if time == end:
+            self._store()
+
+#------------------------------------------------------------------------------#
+#--------------------------------------------------------------------- CACHE --#
+
+CACHE = OverlapCache()
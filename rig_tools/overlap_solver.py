@@ -0,0 +1,265 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Offline chain solver for the overlap tool, an alternative to nHair.
+
+    Position based Verlet integration of joint chains, driven by the same
+    settings as the dynamic control (DyCtrl):
+        stiffness, Stiff(Start, 01-04, End): pull towards the input shape,
+            relative to the parent joint (bend stiffness).
+        startCurveAttract, Attract(Start, 01-04, End): pull towards the
+            input position.
+        drag: world space velocity damping.
+        motionDrag: how much of the input (follicle) motion is inherited.
+        damp: damping of the motion relative to the parent joint.
+        iterations: constraint iterations per step.
+
+    All chains with the same joint count are solved together, the time
+    loop is the only serial part (it has to be). Frames are solved in
+    memory, nothing in here touches Maya so it also runs in mayapy or a
+    plain python with numpy (see overlap_wedge, overlap_batch).
+
+:use:
+    from rig_tools import overlap_solver
+    settings = overlap_solver.settings_from_attributes(attribute_dict)
+    positions = overlap_solver.solve(goals, settings)
+    rotations = overlap_solver.chain_rotations(world, parent, positions)
+
+:see also:
+    rig_tools/overlap_tool.py
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# third party
+try:
+    import numpy
+    NUMPY = True
+except ImportError:
+    NUMPY = False
+
+# external
+from pipe_utils.math_utils import ROTATE_ORDERS, euler_from_matrix
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+RAMP_SUFFIXES = ("Start", "01", "02", "03", "04", "End")
+RAMP_POSITIONS = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+DEFAULTS = {
+    "stiffness": 1.0,
+    "startCurveAttract": 1.0,
+    "attraction": (1.0, 0.8, 0.6, 0.4, 0.2, 0.0),
+    "stiff": (1.0, 0.8, 0.6, 0.4, 0.2, 0.0),
+    "drag": 0.05,
+    "motionDrag": 0.0,
+    "damp": 0.0,
+    "iterations": 4,
+    "gravity": 9.8,
+    "substeps": 3,
+    "fps": 24.0,
+    }
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def settings_from_attributes(attributes):
+    """
+    Builds solver settings from dynamic control attribute values.
+    @params:
+        attributes: Dict of attribute: value, i.e., from _data("save").
+    """
+    settings = dict(DEFAULTS)
+    for key in ("stiffness", "startCurveAttract", "drag", "motionDrag",
+                "damp", "iterations"):
+        if key in attributes:
+            settings[key] = attributes[key]
+
+    for key, prefix in (("attraction", "Attract"), ("stiff", "Stiff")):
+        values = list(settings[key])
+        for count, suffix in enumerate(RAMP_SUFFIXES):
+            name = prefix + suffix
+            if name in attributes:
+                values[count] = attributes[name]
+        settings[key] = tuple(values)
+    return settings
+
+def ramp(values, joints):
+    """
+    Samples a six point ramp (Start, 01-04, End) along a chain.
+    """
+    positions = numpy.linspace(0.0, 1.0, joints)
+    return numpy.interp(positions, RAMP_POSITIONS, values)
+
+def solve(goals, settings=None, point_lock=0):
+    """
+    Simulates the chains, returns the solved world positions.
+    @params:
+        goals: Input world positions (frames, chains, joints, 3).
+        settings: See settings_from_attributes.
+        point_lock: "base" = 0, "both-ends" = 1.
+    """
+    if settings is None:
+        settings = DEFAULTS
+    goals = numpy.asarray(goals, dtype=float)
+    frames, chains, joints = goals.shape[:3]
+
+    # per joint weights
+    attract = settings["startCurveAttract"] * ramp(settings["attraction"],
+                                                   joints)
+    stiff = settings["stiffness"] * ramp(settings["stiff"], joints)
+    attract = numpy.clip(attract, 0.0, 1.0)[None, :, None]
+    stiff = numpy.clip(stiff, 0.0, 1.0)
+    drag = min(max(settings["drag"], 0.0), 1.0)
+    motion_drag = min(max(settings["motionDrag"], 0.0), 1.0)
+    damp = min(max(settings["damp"], 0.0), 1.0)
+    iterations = max(int(settings["iterations"]), 1)
+    substeps = max(int(settings["substeps"]), 1)
+    dt = 1.0 / (settings["fps"] * substeps)
+    gravity = numpy.array((0.0, -settings["gravity"] * dt * dt, 0.0))
+
+    # rest lengths from the first frame
+    lengths = numpy.linalg.norm(goals[0, :, 1:] - goals[0, :, :-1], axis=-1)
+
+    result = numpy.empty_like(goals)
+    position = goals[0].copy()
+    previous = goals[0].copy()
+    result[0] = position
+    for frame in xrange(1, frames):
+        for step in xrange(1, substeps + 1):
+            blend = float(step) / substeps
+            goal = goals[frame - 1] + (goals[frame] - goals[frame - 1]) * blend
+            last_goal = goals[frame - 1] + ((goals[frame] - goals[frame - 1]) *
+                                            (step - 1) / substeps)
+            goal_velocity = goal - last_goal
+
+            # velocity: world drag, inherited motion, relative damping
+            velocity = (position - previous) * (1.0 - drag)
+            velocity += (goal_velocity - velocity) * motion_drag
+            if damp:
+                relative = velocity[:, 1:] - velocity[:, :-1]
+                velocity[:, 1:] -= relative * damp
+
+            previous = position
+            position = position + velocity + gravity
+
+            for iteration in xrange(iterations):
+                # attraction to the input positions
+                position += (goal - position) * attract / iterations
+
+                # bend stiffness and length, root to tip
+                position[:, 0] = goal[:, 0]
+                for joint in xrange(1, joints):
+                    target = position[:, joint - 1] + (goal[:, joint] -
+                                                       goal[:, joint - 1])
+                    weight = stiff[joint] / iterations
+                    position[:, joint] += (target - position[:, joint]) * weight
+                    _length(position, joint - 1, joint, lengths[:, joint - 1])
+
+                # pin the tip and walk back up the chain
+                if point_lock == 1:
+                    position[:, -1] = goal[:, -1]
+                    for joint in xrange(joints - 2, 0, -1):
+                        _length(position, joint + 1, joint, lengths[:, joint])
+                    position[:, 0] = goal[:, 0]
+
+        result[frame] = position
+    return result
+
+def _length(position, anchor, joint, length):
+    """
+    Moves joint back to its rest length from anchor.
+    """
+    offset = position[:, joint] - position[:, anchor]
+    distance = numpy.linalg.norm(offset, axis=-1)
+    distance[distance == 0] = 1.0
+    position[:, joint] = (position[:, anchor] +
+                          offset * (length / distance)[:, None])
+
+def _rotation_between(start, end):
+    """
+    Minimal rotation taking start onto end, as row-vector matrices (..., 3, 3).
+    """
+    start = start / numpy.linalg.norm(start, axis=-1)[..., None]
+    end = end / numpy.linalg.norm(end, axis=-1)[..., None]
+    axis = numpy.cross(start, end)
+    sin = numpy.linalg.norm(axis, axis=-1)
+    cos = numpy.sum(start * end, axis=-1)
+    safe = numpy.where(sin > 1e-10, sin, 1.0)
+    axis = axis / safe[..., None]
+
+    # rodrigues (column-vector), transposed for maya's row vectors
+    x, y, z = axis[..., 0], axis[..., 1], axis[..., 2]
+    t = 1.0 - cos
+    matrix = numpy.empty(start.shape[:-1] + (3, 3))
+    matrix[..., 0, 0] = t * x * x + cos
+    matrix[..., 0, 1] = t * x * y - sin * z
+    matrix[..., 0, 2] = t * x * z + sin * y
+    matrix[..., 1, 0] = t * x * y + sin * z
+    matrix[..., 1, 1] = t * y * y + cos
+    matrix[..., 1, 2] = t * y * z - sin * x
+    matrix[..., 2, 0] = t * x * z - sin * y
+    matrix[..., 2, 1] = t * y * z + sin * x
+    matrix[..., 2, 2] = t * z * z + cos
+    matrix[sin <= 1e-10] = numpy.eye(3)
+    return numpy.swapaxes(matrix, -1, -2)
+
+def chain_rotations(world, parent, positions, rotate_orders=None):
+    """
+    Converts solved positions into local rotations of the controls.
+    Returns euler angles in degrees (frames, chains, joints, 3).
+    @params:
+        world: Input world matrices of the controls (frames, chains, joints,
+               4, 4), maya row-vector layout.
+        parent: Matching parentMatrix of each control.
+        positions: Solved positions from solve().
+        rotate_orders: Rotate order per joint, defaults to "xyz".
+    """
+    world = numpy.asarray(world, dtype=float)
+    parent = numpy.asarray(parent, dtype=float)
+    joints = world.shape[2]
+    if not rotate_orders:
+        rotate_orders = ["xyz"] * joints
+
+    inverse_world = numpy.linalg.inv(world)
+    local = numpy.matmul(world, numpy.linalg.inv(parent))
+
+    rotations = numpy.empty(world.shape[:3] + (3,))
+    new_world = numpy.empty_like(world)
+    for joint in xrange(joints):
+        # parent moved with the solved chain above it
+        if joint == 0:
+            new_parent = parent[:, :, 0]
+        else:
+            offset = numpy.matmul(parent[:, :, joint],
+                                  inverse_world[:, :, joint - 1])
+            new_parent = numpy.matmul(offset, new_world[:, :, joint - 1])
+        candidate = numpy.matmul(local[:, :, joint], new_parent)
+
+        # aim at the solved child
+        if joint < joints - 1:
+            child = numpy.matmul(world[:, :, joint + 1, 3:4, :],
+                                 inverse_world[:, :, joint])
+            child = numpy.matmul(child, candidate)[..., 0, :3]
+            origin = candidate[..., 3, :3]
+            delta = _rotation_between(child - origin,
+                                      positions[:, :, joint + 1] - origin)
+            candidate = candidate.copy()
+            candidate[..., :3, :3] = numpy.matmul(candidate[..., :3, :3],
+                                                  delta)
+        new_world[:, :, joint] = candidate
+
+        # back to local space, scale free
+        matrix = numpy.matmul(candidate, numpy.linalg.inv(new_parent))
+        matrix = matrix[..., :3, :3]
+        matrix = matrix / numpy.linalg.norm(matrix, axis=-1)[..., None]
+        rotations[:, :, joint] = euler_from_matrix(matrix,
+                                                   rotate_orders[joint])
+    return rotations
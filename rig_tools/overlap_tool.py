@@ -23,6 +23,25 @@
         point_lock, int: "base" = 0, "both-ends" = 1
         frame_range: Tuple (int(start), int(end))
 
+    # no nHair, simulate offline and key the controls
+    tool.solve([controls], (1, 100))
+
+    # wedge drag and damp, preview side by side, apply variant 4
+    store = tool.wedge(meta_node, {"drag": (0, .2), "damp": (0, .5)}, 3)
+    tool.preview_wedge(store)
+    tool.apply_wedge(meta_node, store, 4)
+
+    # change a built rig in place
+    tool.update(meta_node, point_lock=1, frame_range=(10, 200))
+
+    # unchanged settings play from the cache, the solver is off meanwhile
+    tool.play_cached(meta_node, (1, 100))
+
+    # one nucleus solve for all of kong's rigs
+    tool.build(params, shared_nucleus="kong")
+    tool.share_nucleus(meta_node, "kong")
+    tool.unshare_nucleus(meta_node)
+
 :see also:
     ani_tools/ui/overlap_tool_ui.py
 
@@ -41,13 +60,28 @@ TODO:
 #------------------------------------------------------------------- IMPORTS --#
 
 # built-in
+import os
 import re
 import json
+import shutil
+import tempfile
 
 # third party
-from maya import cmds, mel
+from maya import cmds, mel, OpenMaya
 from PySide import QtGui, QtCore
 
+try:
+    import numpy
+except ImportError:
+    pass
+
+# internal
+from rig_tools import overlap_batch, overlap_cache, overlap_solver
+from rig_tools import overlap_wedge
+
+# external
+from pipe_utils import anim_utils, attr_schema, meta_utils
+
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- GLOBALS --#
 
@@ -55,8 +89,42 @@ CON = "constraint"
 JOINT = "joint"
 ATTRS = ("tx", "ty", "tz", "rx", "ry", "rz", "sx", "sy", "sz", "v")
 TR_ATTRS = ("tx", "ty", "tz", "rx", "ry", "rz")
+ROTATE_ATTRS = ("rx", "ry", "rz")
 SCALE_ATTRS = ("sx", "sy", "sz")
 LOCAL_SCALE_ATTRS = ("localScaleX", "localScaleY", "localScaleZ")
+WEDGE_GROUP = "overlapWedge_grp"
+SHARED_NUCLEUS = "{0}_sharedNucleus_DyNuc"
+META_TYPE = "overlapRig"
+
+# cached playback, control channel: pairBlend input and output
+CACHE_BLEND_PLUGS = {"tx": ("inTranslateX", "outTranslateX"),
+                     "ty": ("inTranslateY", "outTranslateY"),
+                     "tz": ("inTranslateZ", "outTranslateZ"),
+                     "rx": ("inRotateX", "outRotateX"),
+                     "ry": ("inRotateY", "outRotateY"),
+                     "rz": ("inRotateZ", "outRotateZ")}
+
+# rig: callback id, dynamic control edits end cached playback
+_CACHE_CALLBACKS = globals().get("_CACHE_CALLBACKS", dict())
+
+# dynamic control attributes, in channel box order
+DYNAMIC_SCHEMA = attr_schema.Schema()
+DYNAMIC_SCHEMA.header("dynamic")
+DYNAMIC_SCHEMA.add("EN", "enum", enum="on:off")
+DYNAMIC_SCHEMA.add("motionDrag", connect=["{hair}.motionDrag"])
+DYNAMIC_SCHEMA.add("drag", connect=["{hair}.drag"])
+DYNAMIC_SCHEMA.add("damp", default=0, connect=["{hair}.damp"])
+DYNAMIC_SCHEMA.add("iterations", connect=["{hair}.iterations"])
+DYNAMIC_SCHEMA.add("stiffness", default=1, minimum=0, maximum=1,
+                   keyable=False, connect=["{hair}.stiffness"])
+DYNAMIC_SCHEMA.add("startCurveAttract", default=1, keyable=False,
+                   connect=["{hair}.startCurveAttract"])
+DYNAMIC_SCHEMA.header("scaleAttraction")
+DYNAMIC_SCHEMA.extend(attr_schema.ramp("Attract", "{hair}.attractionScale",
+                                       (1.0, 0.8, 0.6, 0.4, 0.2, 0.0)))
+DYNAMIC_SCHEMA.header("scaleStiffness")
+DYNAMIC_SCHEMA.extend(attr_schema.ramp("Stiff", "{hair}.stiffnessScale",
+                                       (1.0, 0.8, 0.6, 0.4, 0.2, 0.0)))
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
@@ -88,7 +156,7 @@ class OverlapTool(object):
         self.dynamic_ik_curve = None
 
     def build(self, rig_name, parent_control, selected_controls,
-              point_lock, frame_range):
+              point_lock, frame_range, shared_nucleus=None):
         """
         Entry point.
         @params:
@@ -97,6 +165,8 @@ class OverlapTool(object):
             selected_controls: The sequential order of the FK controls.
             point_lock: "base" = 0, "both-ends" = 1.
             frame_range: Tuple (int(start), int(end))
+            shared_nucleus: Name of a shared nucleus (per character or
+                            scene, i.e., "kong"), None for a private one.
         """
         # initialize
         self.__init__()
@@ -125,6 +195,10 @@ class OverlapTool(object):
         # begin dynamic build
         self._make_rig_dynamic()
         self._set_attributes()
+        if shared_nucleus:
+            self.nucleus = self._assign_nucleus(self.hair_system,
+                                                shared_nucleus,
+                                                self.start_frame)
 
         # transfer keys
         self._transfer_keys(self.controls, self.fk_controls)
@@ -135,35 +209,810 @@ class OverlapTool(object):
         # finalize
         self._finalize()
 
-    def bake(self, controls, frame_range):
+    def bake(self, controls, frame_range, tolerance=None, rig=None):
         """
         Responsible for baking out the dynamic animation to the original rig.
         @params:
             controls: Controls that you're baking the animation onto.
             frame_range: Targeted frame range (int(start), int(end)).
+            tolerance: If given, reduces the baked keys within this error.
+            rig: Meta node of the rig, if given the solve is cached.
         """
         start = frame_range[0]
         end = frame_range[1]
 
+        # unchanged settings, skip the solver
+        record = None
+        cache_key = None
+        if rig:
+            self.remove_cached(rig)
+            cache_key = self.cache_key(rig, frame_range)
+            record = overlap_cache.CACHE.get(cache_key)
+            if record and record["controls"] != list(controls):
+                record = None
+
         # bake
-        cmds.bakeResults(controls, sm=True, t=(start, end), at=TR_ATTRS)
+        if record:
+            anim_utils.write_keys(controls, TR_ATTRS, record["times"],
+                                  record["values"])
+        else:
+            cmds.bakeResults(controls, sm=True, t=(start, end), at=TR_ATTRS)
+            if cache_key:
+                times, values = anim_utils.read_keys(controls, TR_ATTRS,
+                                                     (start, end))
+                record = {"controls": list(controls),
+                          "attributes": list(TR_ATTRS),
+                          "times": times,
+                          "values": values}
+                overlap_cache.CACHE.put(cache_key, record)
+
+        # thin out the dense keys
+        if tolerance:
+            anim_utils.reduce_keys(controls, TR_ATTRS, (start, end), tolerance)
+
+    def cache_key(self, rig, frame_range):
+        """
+        Hashes the solver inputs of a rig, see overlap_cache.build_key.
+        @params:
+            rig: Meta node of the rig.
+            frame_range: Tuple (int(start), int(end)).
+        """
+        dynamic_control = self.meta(rig)["dynamicControl"]
+        return overlap_cache.build_key(dynamic_control,
+                                       self.input_controls(rig), frame_range)
 
-    def batch_bake(self, frame_range=None):
+    def play_cached(self, rig, frame_range):
+        """
+        Plays a rig from its cached solve if its settings, input animation
+        and frame range are unchanged: the controls follow the cached
+        values and its hair system stops evaluating. Returns True if it
+        plays from the cache. Editing the dynamic control goes back to the
+        solver.
+        @params:
+            rig: Meta node of the rig.
+            frame_range: Tuple (int(start), int(end)).
+        """
+        meta = self.meta(rig)
+        record = overlap_cache.CACHE.get(self.cache_key(rig, frame_range))
+        if not record or record["controls"] != meta["controls"]:
+            self.stop_cached(rig)
+            return False
+
+        caches = self._cache_playback(rig)
+        anim_utils.write_keys(caches, TR_ATTRS, record["times"],
+                              record["values"])
+        self._set_cached(rig, True)
+
+        # back to the solver as soon as a setting changes
+        if rig not in _CACHE_CALLBACKS:
+            selection_list = OpenMaya.MSelectionList()
+            selection_list.add(meta["dynamicControl"])
+            mobject = OpenMaya.MObject()
+            selection_list.getDependNode(0, mobject)
+            _CACHE_CALLBACKS[rig] = \
+                OpenMaya.MNodeMessage.addAttributeChangedCallback(
+                    mobject, self._dynamic_control_changed, rig)
+        return True
+
+    def stop_cached(self, rig):
+        """
+        Plays a rig from its solver again.
+        @params:
+            rig: Meta node of the rig.
+        """
+        if rig in _CACHE_CALLBACKS:
+            OpenMaya.MMessage.removeCallback(_CACHE_CALLBACKS.pop(rig))
+        if self.meta(rig).get("cacheBlends"):
+            self._set_cached(rig, False)
+
+    def remove_cached(self, rig):
+        """
+        Removes the cached playback nodes of a rig, the controls are
+        connected back to their constraints.
+        @params:
+            rig: Meta node of the rig.
+        """
+        self.stop_cached(rig)
+        meta = self.meta(rig)
+        if not meta.get("cacheBlends"):
+            return
+        for plug, source in meta["cacheSources"]:
+            if source and cmds.objExists(source):
+                cmds.connectAttr(source, plug, f=True)
+        nodes = meta["cacheBlends"] + meta["cacheControls"]
+        cmds.delete([node for node in nodes if cmds.objExists(node)])
+        meta_utils.update(rig, cacheBlends=list(), cacheControls=list(),
+                          cacheSources=list())
+
+    def _cache_playback(self, rig):
+        """
+        Puts a pairBlend between every control and its constraint, blending
+        to a cache transform keyed with the cached values. Returns the cache
+        transforms, made once per rig.
+        """
+        meta = self.meta(rig)
+        if meta.get("cacheBlends"):
+            return meta["cacheControls"]
+
+        blends = list()
+        caches = list()
+        sources = list()
+        for control in meta["controls"]:
+            name = control.replace(":", "_")
+            cache = cmds.createNode("transform", n=name + "_DyCache",
+                                    p=meta["rootGroup"])
+            blend = cmds.createNode("pairBlend", n=name + "_DyCacheBlend")
+            for attr in TR_ATTRS:
+                plug = "{0}.{1}".format(control, attr)
+                in_plug, out_plug = CACHE_BLEND_PLUGS[attr]
+                source = cmds.listConnections(plug, s=True, d=False, p=True)
+                source = source[0] if source else None
+                if source:
+                    cmds.connectAttr(source, "{0}.{1}1".format(blend,
+                                                               in_plug))
+                else:
+                    cmds.setAttr("{0}.{1}1".format(blend, in_plug),
+                                 cmds.getAttr(plug))
+                cmds.connectAttr("{0}.{1}".format(cache, attr),
+                                 "{0}.{1}2".format(blend, in_plug))
+                cmds.connectAttr("{0}.{1}".format(blend, out_plug), plug,
+                                 f=True)
+                sources.append((plug, source))
+            cmds.hide(cache)
+            blends.append(blend)
+            caches.append(cache)
+
+        meta_utils.update(rig, cacheBlends=blends, cacheControls=caches,
+                          cacheSources=sources)
+        return caches
+
+    def _set_cached(self, rig, state):
+        """
+        Switches the controls between the cache and the solver, the hair
+        system doesn't evaluate while cached.
+        """
+        meta = self.meta(rig)
+        for blend in meta["cacheBlends"]:
+            cmds.setAttr("{0}.weight".format(blend), int(state))
+        cmds.setAttr("{0}Shape.nodeState".format(meta["hairSystem"]),
+                     int(state))
+
+    def _dynamic_control_changed(self, message, plug, other_plug, rig):
+        if message & OpenMaya.MNodeMessage.kAttributeSet:
+            # not from inside the callback
+            cmds.evalDeferred(lambda: self.stop_cached(rig))
+
+    def input_controls(self, rig):
+        """
+        Returns the controls carrying the input animation of a rig.
+        @params:
+            rig: Meta node of the rig.
+        """
+        parent_control = self.meta(rig)["parentControl"]
+        controls = self.fk_locators(rig)
+        controls.append(parent_control)
+        return controls
+
+    def fk_locators(self, rig):
+        """
+        Returns the FK locator controls (DyFKCtrl) of a rig, root to tip.
+        @params:
+            rig: Meta node of the rig.
+        """
+        root_group = self.meta(rig)["rootGroup"]
+        transforms = cmds.ls(root_group, dag=True, type="transform")
+        return [obj for obj in transforms if obj.endswith("DyFKCtrl")]
+
+    def read_settings(self, dynamic_control):
+        """
+        Returns the dynamic control settings as a dict.
+        """
+        settings = dict()
+        attributes = cmds.listAttr(dynamic_control, ud=True) or list()
+        for attribute in attributes:
+            value = cmds.getAttr("{0}.{1}".format(dynamic_control, attribute))
+            settings[attribute] = value
+        return settings
+
+    def solve_rig(self, rig, frame_range=None, tolerance=None):
+        """
+        Bakes a rig with the offline Verlet solver instead of nHair.
+        @params:
+            rig: Meta node of the rig.
+            frame_range: Tuple (int(start), int(end)), defaults to the rig's.
+            tolerance: If given, reduces the keys within this error.
+        """
+        meta = self.meta(rig)
+        if not frame_range:
+            frame_range = (int(meta["startFrame"]),
+                           int(meta["endFrame"]))
+        dynamic_control = meta["dynamicControl"]
+        attributes = self.read_settings(dynamic_control)
+        settings = overlap_solver.settings_from_attributes(attributes)
+        point_lock = int(meta["pointLock"])
+        controls = meta["controls"]
+
+        self.remove_cached(rig)
+        self.solve([controls], frame_range, settings, point_lock,
+                   [self.fk_locators(rig)], tolerance)
+
+    def solve(self, chains, frame_range, settings=None, point_lock=0,
+              sources=None, tolerance=None):
+        """
+        Offline overlap, simulates the chains and keys their rotations.
+        No hairSystem, follicle or nucleus is created.
+        @params:
+            chains: List of FK control chains, root to tip.
+            frame_range: Tuple (int(start), int(end)).
+            settings: See overlap_solver.settings_from_attributes.
+            point_lock: "base" = 0, "both-ends" = 1.
+            sources: Matching chains carrying the input animation,
+                     defaults to the chains themselves.
+            tolerance: If given, reduces the keys within this error.
+        """
+        if not overlap_solver.NUMPY:
+            message = "The Verlet solver requires numpy."
+            return OpenMaya.MGlobal.displayError(message)
+        if not sources:
+            sources = chains
+
+        start = int(frame_range[0])
+        end = int(frame_range[1])
+        times = range(start, end + 1)
+
+        # chains with the same joint count and rotate orders are solved
+        # together, the rotations are decomposed per group
+        groups = dict()
+        for count, chain in enumerate(chains):
+            rotate_orders = list()
+            for control in chain:
+                order = cmds.getAttr("{0}.rotateOrder".format(control))
+                rotate_orders.append(overlap_solver.ROTATE_ORDERS[order])
+            groups.setdefault(tuple(rotate_orders), list()).append(count)
+
+        for rotate_orders, indices in groups.iteritems():
+            world, parent = self._sample_matrices([sources[i] for i in
+                                                   indices], times)
+            goals = world[:, :, :, 3, :3]
+            positions = overlap_solver.solve(goals, settings, point_lock)
+            rotations = overlap_solver.chain_rotations(world, parent,
+                                                       positions,
+                                                       list(rotate_orders))
+            # key
+            for column, index in enumerate(indices):
+                chain = chains[index]
+                values = list()
+                for joint in xrange(len(chain)):
+                    values.append([rotations[:, column, joint, axis].tolist()
+                                   for axis in xrange(3)])
+                anim_utils.write_keys(chain, ROTATE_ATTRS, times, values)
+                if tolerance:
+                    anim_utils.reduce_keys(chain, ROTATE_ATTRS, (start, end),
+                                           tolerance)
+
+    def _sample_matrices(self, chains, times):
+        """
+        Samples world and parent matrices, (frames, chains, joints, 4, 4).
+        """
+        joints = len(chains[0])
+        shape = (len(times), len(chains), joints, 4, 4)
+        world = numpy.empty(shape)
+        parent = numpy.empty(shape)
+        for frame, time in enumerate(times):
+            for column, chain in enumerate(chains):
+                for joint, control in enumerate(chain):
+                    matrix = cmds.getAttr("{0}.worldMatrix".format(control),
+                                          time=time)
+                    world[frame, column, joint] = numpy.reshape(matrix, (4, 4))
+                    matrix = cmds.getAttr("{0}.parentMatrix".format(control),
+                                          time=time)
+                    parent[frame, column, joint] = numpy.reshape(matrix,
+                                                                 (4, 4))
+        return world, parent
+
+    def wedge(self, rig, ranges, steps=3, frame_range=None, workers=None):
+        """
+        Solves variants of a rig's dynamic settings in parallel.
+        Returns an overlap_wedge.WedgeStore, see preview_wedge/apply_wedge.
+        @params:
+            rig: Meta node of the rig.
+            ranges: Dict of setting: (min, max), i.e., {"drag": (0, 0.2)}.
+            steps: Samples per range, steps ** len(ranges) variants.
+            frame_range: Tuple (int(start), int(end)), defaults to the rig's.
+            workers: Worker process count, defaults to the cpu count.
+        """
+        meta = self.meta(rig)
+        if not overlap_solver.NUMPY:
+            message = "Wedging requires numpy."
+            return OpenMaya.MGlobal.displayError(message)
+        if not frame_range:
+            frame_range = (int(meta["startFrame"]),
+                           int(meta["endFrame"]))
+        times = range(int(frame_range[0]), int(frame_range[1]) + 1)
+        dynamic_control = meta["dynamicControl"]
+        attributes = self.read_settings(dynamic_control)
+        settings = overlap_solver.settings_from_attributes(attributes)
+        point_lock = int(meta["pointLock"])
+
+        # sample once, the workers never see maya
+        world, parent = self._sample_matrices([self.fk_locators(rig)], times)
+        goals = world[:, :, :, 3, :3]
+        variants = overlap_wedge.build_variants(settings, ranges, steps)
+        positions = overlap_wedge.run(goals, variants, point_lock, workers)
+
+        controls = meta["controls"]
+        return overlap_wedge.WedgeStore(controls, times, variants, ranges,
+                                        world, parent, positions)
+
+    def preview_wedge(self, store, spacing=None):
+        """
+        Builds keyed locator chains of every variant, side by side along x.
+        Returns the preview group.
+        @params:
+            store: overlap_wedge.WedgeStore.
+            spacing: Distance between variants, defaults to the chain width.
+        """
+        self.delete_wedge_preview()
+        positions = store.positions[:, :, 0]
+        if spacing is None:
+            extent = positions[..., 0].max() - positions[..., 0].min()
+            spacing = max(extent * 1.5, 1.0)
+
+        preview_group = cmds.group(empty=True, name=WEDGE_GROUP)
+        joints = positions.shape[2]
+        for index in xrange(len(store.variants)):
+            name = "overlapWedge{0:02d}".format(index)
+            group = cmds.group(empty=True, name=name + "_grp",
+                               parent=preview_group)
+            cmds.setAttr("{0}.tx".format(group), spacing * (index + 1))
+            cmds.addAttr(group, ln="variant", dt="string")
+            cmds.setAttr("{0}.variant".format(group), store.label(index),
+                         type="string")
+
+            # locators keyed on the solved positions, curve drawn through
+            locators = list()
+            for joint in xrange(joints):
+                locator = cmds.spaceLocator(name="{0}_{1:02d}_loc".format(
+                                            name, joint))[0]
+                locators.append(cmds.parent(locator, group)[0])
+            values = [[positions[index, :, joint, axis].tolist() for axis
+                       in xrange(3)] for joint in xrange(joints)]
+            anim_utils.write_keys(locators, ("tx", "ty", "tz"), store.times,
+                                  values)
+            curve = cmds.curve(d=1, p=[(0, 0, 0)] * joints,
+                               name=name + "_crv")
+            curve = cmds.parent(curve, group)[0]
+            shape = cmds.listRelatives(curve, shapes=True)[0]
+            for joint, locator in enumerate(locators):
+                cmds.connectAttr("{0}.translate".format(locator),
+                                 "{0}.controlPoints[{1}]".format(shape, joint))
+        return preview_group
+
+    def delete_wedge_preview(self):
+        """
+        Removes the wedge preview, if any.
+        """
+        if cmds.objExists(WEDGE_GROUP):
+            cmds.delete(WEDGE_GROUP)
+
+    def apply_wedge(self, rig, store, index, tolerance=None):
+        """
+        Applies a wedge variant, its settings go on the dynamic control and
+        its solved result is keyed onto the rig's controls.
+        @params:
+            rig: Meta node of the rig.
+            store: overlap_wedge.WedgeStore.
+            index: The picked variant.
+            tolerance: If given, reduces the keys within this error.
+        """
+        variant = store.variants[index]
+        dynamic_control = self.meta(rig)["dynamicControl"]
+        for setting in store.ranges:
+            plug = "{0}.{1}".format(dynamic_control, setting)
+            if cmds.objExists(plug):
+                cmds.setAttr(plug, variant[setting])
+
+        # the solve is already done, only the rotations are left
+        self.remove_cached(rig)
+        controls = store.controls
+        rotate_orders = list()
+        for control in controls:
+            order = cmds.getAttr("{0}.rotateOrder".format(control))
+            rotate_orders.append(overlap_solver.ROTATE_ORDERS[order])
+        rotations = overlap_solver.chain_rotations(store.world, store.parent,
+                                                   store.positions[index],
+                                                   rotate_orders)
+        values = list()
+        for joint in xrange(len(controls)):
+            values.append([rotations[:, 0, joint, axis].tolist() for axis
+                           in xrange(3)])
+        anim_utils.write_keys(controls, ROTATE_ATTRS, store.times, values)
+        if tolerance:
+            anim_utils.reduce_keys(controls, ROTATE_ATTRS,
+                                   (store.times[0], store.times[-1]),
+                                   tolerance)
+        self.delete_wedge_preview()
+
+    def export_batch(self, directory, frame_range=None, rigs=None):
+        """
+        Exports rigs as overlap_batch job files, one per nucleus (rigs on
+        the same nucleus share solver state). Returns the job paths.
+        @params:
+            directory: Where the jobs are written.
+            frame_range: Tuple (int(start), int(end)), defaults to the scene.
+            rigs: Meta nodes, defaults to every rig in the scene.
+        """
+        if not frame_range:
+            frame_range = (cmds.playbackOptions(q=True, min=True),
+                           cmds.playbackOptions(q=True, max=True))
+        times = range(int(frame_range[0]), int(frame_range[1]) + 1)
+        if not rigs:
+            rigs = self.find_meta_attribute("metaNode")
+
+        groups = dict()
+        for rig in rigs:
+            groups.setdefault(self._nucleus(rig), list()).append(rig)
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        job_paths = list()
+        for count, nucleus in enumerate(sorted(groups)):
+            data = list()
+            for rig in groups[nucleus]:
+                controls = self.meta(rig)["controls"]
+                dynamic_control = self.meta(rig)["dynamicControl"]
+                attributes = self.read_settings(dynamic_control)
+                rotate_orders = list()
+                for control in controls:
+                    order = cmds.getAttr("{0}.rotateOrder".format(control))
+                    rotate_orders.append(overlap_solver.ROTATE_ORDERS[order])
+                world, parent = self._sample_matrices([self.fk_locators(rig)],
+                                                      times)
+                data.append({
+                    "rig": rig,
+                    "controls": controls,
+                    "rotate_orders": rotate_orders,
+                    "settings": overlap_solver.settings_from_attributes(
+                        attributes),
+                    "point_lock": int(self.meta(rig)["pointLock"]),
+                    "world": world[:, 0],
+                    "parent": parent[:, 0]})
+            path = os.path.join(directory, "overlap_job{0:03d}.npz".format(
+                                count))
+            job_paths.append(overlap_batch.write_job(path, data, times))
+        return job_paths
+
+    def batch_solve(self, frame_range=None, tolerance=None, workers=None,
+                    local=False):
+        """
+        Bakes every rig in the scene with the offline solver, in parallel
+        worker processes.
+        @params:
+            frame_range: Tuple (int(start), int(end)), defaults to the scene.
+            tolerance: If given, reduces the keys within this error.
+            workers: Worker process count, defaults to the cpu count.
+            local: Solve in this session (overlap_batch.LocalWorker).
+        """
+        if not overlap_solver.NUMPY:
+            message = "Batch solving requires numpy."
+            return OpenMaya.MGlobal.displayError(message)
+        if not frame_range:
+            frame_range = (cmds.playbackOptions(q=True, min=True),
+                           cmds.playbackOptions(q=True, max=True))
+        start = int(frame_range[0])
+        end = int(frame_range[1])
+        times = range(start, end + 1)
+
+        directory = tempfile.mkdtemp(prefix="overlap_batch_")
+        try:
+            job_paths = self.export_batch(directory, (start, end))
+            worker = None
+            if local:
+                worker = overlap_batch.LocalWorker
+            results = overlap_batch.run(job_paths, workers, worker)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        # merge, keys[control][attribute][frame]
+        for rig, keys in results.iteritems():
+            self.remove_cached(rig)
+            controls = self.meta(rig)["controls"]
+            anim_utils.write_keys(controls, ROTATE_ATTRS, times,
+                                  keys.tolist())
+            if tolerance:
+                anim_utils.reduce_keys(controls, ROTATE_ATTRS, (start, end),
+                                       tolerance)
+
+    def _nucleus(self, rig):
+        """
+        Returns the nucleus solving a rig, or its hairSystem if it has none.
+        """
+        hair_system = self.meta(rig)["hairSystem"]
+        nodes = [hair_system]
+        nodes.extend(cmds.listRelatives(hair_system, shapes=True) or list())
+        for node in nodes:
+            nucleus = cmds.listConnections(node, type="nucleus")
+            if nucleus:
+                return nucleus[0]
+        return hair_system
+
+    def batch_bake(self, frame_range=None, tolerance=None):
         """
         Bakes out all rigs in the scene.
         @params:
             frame_range: If no frame range give, it will bake based on scene.
+            tolerance: If given, reduces the baked keys within this error.
         """
         if not frame_range:
             self.start_frame = cmds.playbackOptions(q=True, min=True)
             self.end_frame = cmds.playbackOptions(q=True, max=True)
+            frame_range = (self.start_frame, self.end_frame)
 
-        # grab controls
+        # grab controls, off cached playback
         controls = self.find_meta_attribute("controls")
+        for rig in self.meta_records():
+            self.remove_cached(rig)
 
         # bake
         if controls:
-            self.bake(controls, frame_range)
+            self.bake(controls, frame_range, tolerance)
+
+    def update(self, rig, selected_controls=None, point_lock=None,
+               frame_range=None):
+        """
+        Updates a built rig in place, only the affected pieces are touched.
+        Returns the rig's meta node, which is new if the chain was rebuilt.
+        @params:
+            rig: Meta node of the rig.
+            selected_controls: The sequential order of the FK controls.
+            point_lock: "base" = 0, "both-ends" = 1.
+            frame_range: Tuple (int(start), int(end)).
+        """
+        # a different chain needs new joints, curve and hair, rebuild it
+        controls = self.meta(rig)["controls"]
+        if selected_controls and list(selected_controls) != controls:
+            return self._rebuild(rig, selected_controls, point_lock,
+                                 frame_range)
+
+        # point lock, straight on the follicle
+        if point_lock is not None:
+            if point_lock != int(self.meta(rig)["pointLock"]):
+                follicle = self._meta_follicle(rig)
+                value = 1
+                if point_lock == 1:
+                    value = 3
+                cmds.setAttr("{0}.pointLock".format(follicle), value)
+                meta_utils.update(rig, pointLock=point_lock)
+
+        # frame range, nucleus start, the motion path and input keys
+        if frame_range:
+            start = int(frame_range[0])
+            end = int(frame_range[1])
+            old_start = int(self.meta(rig)["startFrame"])
+            old_end = int(self.meta(rig)["endFrame"])
+            if (start, end) != (old_start, old_end):
+                nucleus = self._meta_nucleus(rig)
+                if nucleus:
+                    hair_system = self.meta(rig)["hairSystem"]
+                    self._set_start_frame(hair_system, nucleus, start)
+                motion_path = self._meta_motion_path(rig)
+                if motion_path:
+                    curve = cmds.keyframe("{0}.uValue".format(motion_path),
+                                          q=True, n=True)[0]
+                    # keys can't pass each other, order the moves
+                    keys = ((0, start), (1, end))
+                    if start >= old_end:
+                        keys = ((1, end), (0, start))
+                    for index, time in keys:
+                        cmds.keyframe(curve, index=(index, index), a=True,
+                                      tc=time)
+
+                # the input keys of the new range
+                self._transfer_keys(controls, self.fk_locators(rig),
+                                    (start, end))
+                meta_utils.update(rig, startFrame=start, endFrame=end)
+        return rig
+
+    def share_nucleus(self, rig, name):
+        """
+        Moves a rig onto a shared nucleus, created if needed.
+        @params:
+            rig: Meta node of the rig.
+            name: Name of the shared nucleus, i.e., the character.
+        """
+        return self._move_nucleus(rig, name)
+
+    def unshare_nucleus(self, rig):
+        """
+        Moves a rig back onto its own private nucleus.
+        @params:
+            rig: Meta node of the rig.
+        """
+        return self._move_nucleus(rig, None)
+
+    def _move_nucleus(self, rig, name):
+        """
+        Moves a rig between shared and private nuclei, updates the meta node.
+        """
+        meta = self.meta(rig)
+        self.rig_name = meta["rigName"]
+        hair_system = meta["hairSystem"]
+        start = int(meta["startFrame"])
+        nucleus = self._assign_nucleus(hair_system, name, start)
+
+        # private solvers live and die with the rig
+        if not name:
+            pos_group = cmds.listRelatives(hair_system, p=True)[0]
+            if cmds.listRelatives(nucleus, p=True) != [pos_group]:
+                nucleus = cmds.parent(nucleus, pos_group)[0]
+
+        meta_utils.update(rig, nucleus=nucleus)
+        return nucleus
+
+    def _assign_nucleus(self, hair_system, name, start_frame):
+        """
+        Assigns a hair system to a nucleus and returns it.
+        @params:
+            hair_system: The rig's hair system.
+            name: Shared nucleus name, None makes a new private nucleus.
+            start_frame: The rig's start frame.
+        """
+        shape = "{0}Shape".format(hair_system)
+        old_nuclei = set(cmds.listConnections(shape, type="nucleus") or list())
+        nucleus = ""
+        if name:
+            nucleus = SHARED_NUCLEUS.format(name)
+        if nucleus in old_nuclei:
+            return nucleus
+
+        # an empty name makes maya create a new solver
+        cmds.select(shape, r=True)
+        target = ""
+        if cmds.objExists(nucleus):
+            target = nucleus
+        mel.eval('assignNSolver "{0}"'.format(target))
+        cmds.select(cl=True)
+        new_nucleus = cmds.listConnections(shape, type="nucleus")[0]
+        if new_nucleus != nucleus:
+            if not nucleus:
+                nucleus = self._get_unique_name("dynamicNucleus", "DyNuc")
+            new_nucleus = cmds.rename(new_nucleus, nucleus)
+
+        self._set_start_frame(hair_system, new_nucleus, start_frame)
+
+        # every rig solves through its nucleus, shared or private, so
+        # moving it between them keeps its simulation (older rigs ran the
+        # classic hair solver)
+        cmds.setAttr("{0}.active".format(shape), 1)
+
+        # remove solvers nothing is using anymore
+        for old_nucleus in old_nuclei:
+            if not cmds.objExists(old_nucleus):
+                continue
+            if old_nucleus.endswith(SHARED_NUCLEUS.format("")):
+                self._set_start_frame(None, old_nucleus, None)
+            if not self._nucleus_members(old_nucleus):
+                cmds.delete(old_nucleus)
+        return new_nucleus
+
+    def _nucleus_members(self, nucleus):
+        """
+        Returns the hair system shapes solved by a nucleus.
+        """
+        members = cmds.listConnections(nucleus, type="hairSystem", shapes=True)
+        return sorted(set(members or list()))
+
+    def _set_start_frame(self, hair_system, nucleus, start_frame):
+        """
+        Sets a rig's start frame. A nucleus has one start frame for all of
+        its rigs, a shared one starts with the earliest of them and warns
+        when they differ. Each hair system keeps its own start frame, for
+        when it's moved back to a private nucleus.
+        @params:
+            hair_system: The rig's hair system, None only refreshes the
+                         shared nucleus.
+            nucleus: The nucleus it is solved by.
+            start_frame: New start frame.
+        """
+        if not nucleus.endswith(SHARED_NUCLEUS.format("")):
+            cmds.setAttr("{0}.startFrame".format(nucleus), start_frame)
+            return
+
+        if hair_system:
+            plug = "{0}Shape.startFrame".format(hair_system)
+            sources = cmds.listConnections(plug, s=True, d=False, p=True)
+            if sources:
+                cmds.disconnectAttr(sources[0], plug)
+            cmds.setAttr(plug, start_frame)
+
+        starts = [cmds.getAttr("{0}.startFrame".format(member)) for member
+                  in self._nucleus_members(nucleus)]
+        if starts:
+            cmds.setAttr("{0}.startFrame".format(nucleus), min(starts))
+        if len(set(starts)) > 1:
+            message = ("The rigs on {0} start on different frames, they all "
+                       "solve from frame {1}.".format(nucleus, min(starts)))
+            OpenMaya.MGlobal.displayWarning(message)
+
+    def _rebuild(self, rig, selected_controls, point_lock=None,
+                 frame_range=None):
+        """
+        Rebuilds a rig on a new chain, keeping its name, parent control and
+        dynamic settings.
+        """
+        meta = self.meta(rig)
+        rig_name = meta["rigName"]
+        parent_control = meta["parentControl"]
+        dynamic_control = meta["dynamicControl"]
+        settings = self.read_settings(dynamic_control)
+        if point_lock is None:
+            point_lock = int(meta["pointLock"])
+        if not frame_range:
+            frame_range = (int(meta["startFrame"]),
+                           int(meta["endFrame"]))
+
+        shared_nucleus = None
+        nucleus = self._meta_nucleus(rig)
+        suffix = SHARED_NUCLEUS.format("")
+        if nucleus and nucleus.endswith(suffix):
+            shared_nucleus = nucleus[:-len(suffix)]
+
+        self.delete(meta["rootGroup"])
+        self.build(rig_name, parent_control, selected_controls, point_lock,
+                   frame_range, shared_nucleus)
+
+        # settings back on the new dynamic control
+        for attribute, value in settings.iteritems():
+            plug = "{0}.{1}".format(self.dynamic_control, attribute)
+            if not cmds.objExists(plug) or cmds.getAttr(plug, l=True):
+                continue
+            if isinstance(value, list):
+                continue
+            try:
+                cmds.setAttr(plug, value)
+            except RuntimeError:
+                pass
+        return self.meta_node
+
+    def _meta_follicle(self, rig):
+        """
+        Returns the follicle shape of a rig, rigs built before it was stored
+        in the meta node are looked up through the hair system.
+        """
+        follicle = self.meta(rig).get("follicle")
+        if not follicle:
+            hair_system = self.meta(rig)["hairSystem"]
+            follicle = cmds.listConnections("{0}Shape".format(hair_system),
+                                            type="follicle")[0]
+        shapes = cmds.listRelatives(follicle, shapes=True)
+        if shapes:
+            return shapes[0]
+        return follicle
+
+    def _meta_nucleus(self, rig):
+        """
+        Returns the nucleus of a rig.
+        """
+        nucleus = self.meta(rig).get("nucleus")
+        if nucleus and cmds.objExists(nucleus):
+            return nucleus
+        nucleus = self._nucleus(rig)
+        if cmds.nodeType(nucleus) == "nucleus":
+            return nucleus
+
+    def _meta_motion_path(self, rig):
+        """
+        Returns the motion path keeping the dynamic chain from flipping.
+        """
+        motion_path = self.meta(rig).get("motionPath")
+        if motion_path and cmds.objExists(motion_path):
+            return motion_path
+        root_group = self.meta(rig)["rootGroup"]
+        for node in cmds.ls(root_group, dag=True, type="transform"):
+            if node.endswith("DyJntGrp"):
+                motion_path = cmds.listConnections(node, type="motionPath")
+                if motion_path:
+                    return motion_path[0]
 
     def delete(self, rig):
         """
@@ -174,27 +1023,32 @@ class OverlapTool(object):
         if not rig:
             return
 
+        # controls back on their constraints first
+        records = self.meta_records()
+        for node, data in records.iteritems():
+            if data["rootGroup"] == rig:
+                self.remove_cached(node)
+
         # delete rig
         cmds.delete(rig)
 
         # delete meta node
-        for node in cmds.ls(type="network"):
-            if node.endswith("DyMETA"):
-                root_group = cmds.getAttr("{0}.rootGroup".format(node))
-                if root_group == rig:
-                    cmds.delete(node)
+        for node, data in records.iteritems():
+            if data["rootGroup"] == rig:
+                cmds.delete(node)
 
     def batch_delete(self):
         """
         Deletes all overlap rigs in the scene.
         """
         # delete all dynamic rigs
-        rigs = self.find_meta_attribute("rootGroup")
-        for rig in rigs:
-            cmds.delete(rig)
-        for node in cmds.ls(type="network"):
-            if node.endswith("DyMETA"):
-                cmds.delete(node)
+        records = self.meta_records()
+        for node, data in records.iteritems():
+            self.remove_cached(node)
+            if cmds.objExists(data["rootGroup"]):
+                cmds.delete(data["rootGroup"])
+        if records:
+            cmds.delete(records.keys())
 
     def find_meta_attribute(self, attribute):
         """
@@ -202,31 +1056,53 @@ class OverlapTool(object):
         """
         # find rigs
         meta = list()
-        meta_nodes = cmds.ls(type="network")
-        for node in meta_nodes:
-            if node.endswith("DyMETA"):
-                value = cmds.getAttr("{0}.{1}".format(node, attribute))
-                if attribute == "controls":
-                    meta.extend(value)
-                    continue
-                meta.append(value)
+        for data in self.meta_records().itervalues():
+            value = data[attribute]
+            if attribute == "controls":
+                meta.extend(value)
+                continue
+            meta.append(value)
         if attribute == "controls":
             return meta
         return list(set(meta))
 
-    def _transfer_keys(self, from_controls, to_controls):
+    def meta(self, rig):
+        """
+        Returns the meta data of a rig.
+        @params:
+            rig: Meta node of the rig.
+        """
+        return meta_utils.read(rig)
+
+    def meta_records(self):
+        """
+        Returns the meta data of every rig in the scene, {meta node: data}.
+        """
+        return meta_utils.read_all(META_TYPE, "DyMETA")
+
+    def _transfer_keys(self, from_controls, to_controls, frame_range=None):
         """
         Responsible for the transfer of keys, given a provided frame range.
         @param:
             from_controls: Controls with keys you want to transfer.
             to_controls: Controls you want to transfer keys too.
-        """
-        start = self.start_frame
-        end = self.end_frame
+            frame_range: Tuple (int(start), int(end)), replaces the keys
+                         in it. Defaults to the build's frame range.
+        """
+        if frame_range:
+            start, end = frame_range
+            kwargs = {"time": (start, end), "option": "replace"}
+        else:
+            start = self.start_frame
+            end = self.end_frame
+            kwargs = dict()
         for count, control in enumerate(from_controls):
             copy = cmds.copyKey(control, time=(start, end), at=TR_ATTRS)
+            if not copy:
+                continue
             try:
-                paste = cmds.pasteKey(to_controls[count], at=TR_ATTRS)
+                paste = cmds.pasteKey(to_controls[count], at=TR_ATTRS,
+                                      **kwargs)
             except RuntimeError:
                 continue
 
@@ -407,189 +1283,49 @@ class OverlapTool(object):
         # create the attributes
         dyCtrl = self.dynamic_control
         hairSys = self.hair_system
-        fol = self.follicle
         nuc = self.nucleus
 
-        # turn off Nuc Solver and set start frame
-        cmds.setAttr("{0}Shape.active".format(hairSys), 0)
+        # solve through the nucleus and set start frame
+        cmds.setAttr("{0}Shape.active".format(hairSys), 1)
         cmds.setAttr("{0}.startFrame".format(nuc), self.start_frame)
 
-        # let's begin
-        self._dynamic_settings(dyCtrl, hairSys, fol)
-        self._attraction_settings(dyCtrl, hairSys, fol)
-        self._stiffness_settings(dyCtrl, hairSys, fol)
-        self._control_settings(dyCtrl, hairSys, fol)
-
-    def _dynamic_settings(self, dyCtrl, hairSys, fol):
-        """
-        Responsible for setting the dynamic control attributes.
-        """
-        # header
-        cmds.addAttr(dyCtrl, ln="dynamic", at="enum",
-                     en="settings:", k=True)
-        cmds.setAttr("{0}.dynamic".format(dyCtrl), l=True)
-
-        # EN
-        cmds.addAttr(dyCtrl, ln="EN", at="enum", en="on:off", k=True)
-
-        # off
-        cmds.setAttr("{0}.EN".format(dyCtrl), 1)
-        cmds.setAttr("{0}Shape.simulationMethod".format(hairSys), 0)
-        cmds.setDrivenKeyframe("{0}Shape.simulationMethod".format(hairSys),
-                          "{0}.EN".format(dyCtrl))
-
-        # on
-        cmds.setAttr("{0}.EN".format(dyCtrl), 0)
-        cmds.setAttr("{0}Shape.simulationMethod".format(hairSys), 3)
-        cmds.setDrivenKeyframe("{0}Shape.simulationMethod".format(hairSys),
-                          "{0}.EN".format(dyCtrl))
-
-        # motion drag
-        cmds.addAttr(dyCtrl, ln="motionDrag", at="float", k=1, hnv=1, hxv=1)
-        cmds.connectAttr("{0}.motionDrag".format(dyCtrl),
-                         "{0}Shape.motionDrag".format(hairSys), f=1)
-
-        # drag
-        cmds.addAttr(dyCtrl, ln="drag", at="float",
-                     k=1, hnv=1, hxv=1)
-        cmds.connectAttr("{0}.drag".format(dyCtrl),
-                         "{0}Shape.drag".format(hairSys), f=1)
-
-        # damp
-        cmds.addAttr(dyCtrl, ln="damp", at="float",
-                     dv=0, k=1, hnv=1, hxv=1)
-        cmds.connectAttr("{0}.damp".format(dyCtrl),
-                         "{0}Shape.damp".format(hairSys), f=1)
-
-        # iterations
-        cmds.addAttr(dyCtrl, ln="iterations", at="float", k=1, hnv=1, hxv=1)
-        cmds.connectAttr("{0}.iterations".format(dyCtrl),
-                         "{0}Shape.iterations".format(hairSys), f=1)
-
-        # stiffness
-        cmds.addAttr(dyCtrl, ln="stiffness", at="float", k=0, hnv=1, hxv=1,
-                     dv=1, min=0, max=1)
-        cmds.connectAttr("{0}.stiffness".format(dyCtrl),
-                         "{0}Shape.stiffness".format(hairSys), f=1)
-
-    def _attraction_settings(self, dyCtrl, hairSys, fol):
-        """
-        Responsible for setting the start curve attract attraction settings.
-        """
-        # start curve attract
-        cmds.addAttr(dyCtrl, ln="startCurveAttract", at="float",
-                     dv=1, k=0, hnv=1, hxv=1)
-        cmds.connectAttr("{0}.startCurveAttract".format(dyCtrl),
-                         "{0}Shape.startCurveAttract".format(hairSys), f=1)
-
-        # header
-        cmds.addAttr(dyCtrl, ln="scaleAttraction", at="enum",
-                     en="settings:", k=True)
-        cmds.setAttr("{0}.scaleAttraction".format(dyCtrl), l=True)
-
-        # begin attribute setting
-        self._scale_settings(dyCtrl, hairSys, fol, "attractionScale")
-
-    def _stiffness_settings(self, dyCtrl, hairSys, fol):
-        """
-        Responsible for setting the stiffness scale settings.
-        """
-        # header
-        cmds.addAttr(dyCtrl, ln="scaleStiffness", at="enum",
-                     en="settings:", k=True)
-        cmds.setAttr("{0}.scaleStiffness".format(dyCtrl), l=True)
-
-        # begin attribute setting
-        self._scale_settings(dyCtrl, hairSys, fol, "stiffnessScale")
-
-    def _scale_settings(self, dyCtrl, hairSys, fol, scale_attribute):
-        """
-        Responsible for setting the start curve attract attraction settings.
-        """
-        # attraction attributes
-        positions = list()
-        end_name = scale_attribute.split("Scale")[0].capitalize()
-        if end_name == "Stiffness":
-            end_name = "Stiff"
-        elif end_name == "Attraction":
-            end_name = "Attract"
-
-        # inital values
-        for count in xrange(5):
-            position = float(count)/5
-            positions.append(position)
-        positions.append(1)
-        values = list(reversed(positions))
-
-        # set attributes
-        for count in xrange(5):
-            if count == 0:
-                attribute = "{0}{1}".format(end_name, "Start")
-            else:
-                attribute = "{0}0{1}".format(end_name, count)
-            position = positions[count]
-            value = values[count]
-            cmds.addAttr(dyCtrl, ln=attribute, at="float",
-                         dv=value, k=1, hnv=1, hxv=1, max=1, min=0)
-            cmds.setAttr("{0}Shape.{1}[{2}]."\
-                         "{1}_Position".format(hairSys, scale_attribute, count),
-                         position)
-            cmds.connectAttr("{0}.{1}".format(dyCtrl, attribute),
-                             "{0}Shape.{1}[{2}]."\
-                             "{1}_FloatValue".format(hairSys, scale_attribute,
-                                                     count))
-            cmds.setAttr("{0}Shape.{1}[{2}]."\
-                         "{1}_Interp".format(hairSys, scale_attribute, count),3)
-        # last position
-        last_pos = len(positions)
-        long_name = "{0}{1}".format(end_name, "End")
-        cmds.addAttr(dyCtrl, ln=long_name, at="float", dv=0,
-                     k=1, hnv=1, hxv=1, max=1, min=0)
-        cmds.setAttr("{0}Shape.{1}[{2}]."\
-                     "{1}_Position".format(hairSys,scale_attribute, last_pos),1)
-        cmds.connectAttr("{0}.{1}".format(dyCtrl, long_name),
-                         "{0}Shape.{1}[{2}]."\
-                         "{1}_FloatValue".format(hairSys, scale_attribute,
-                                                 last_pos))
-        cmds.setAttr("{0}Shape.{1}[{2}]."\
-                     "{1}_Interp".format(hairSys, scale_attribute, last_pos), 3)
-
-    def _control_settings(self, dyCtrl, hairSys, fol):
-        """
-        Responsible for setting the control attributes.
-        """
-        # header
-        cmds.addAttr(dyCtrl, ln="control",at="enum",
-                     en="Settings:", k=True)
-        cmds.setAttr("{0}.control".format(dyCtrl), l=True)
-
-        # show/hide attributes
-        self._display_attributes("locatorVis", self.fk_group, dyCtrl)
-        # scale locators
-        cmds.addAttr(dyCtrl, ln="locatorScale", at="float", dv=1, k=True)
-        for control in self.fk_controls:
-            for attr in LOCAL_SCALE_ATTRS:
-                cmds.connectAttr("{0}.locatorScale".format(dyCtrl),
-                                 "{0}Shape.{1}".format(control, attr))
+        # let's begin, one modifier for the whole schema
+        schema = attr_schema.Schema()
+        schema.extend(DYNAMIC_SCHEMA)
+        schema.extend(self._control_schema())
+        schema.apply(dyCtrl, hair=hairSys + "Shape")
 
-        self._display_attributes("dynamicVis", self.dynamic_control, dyCtrl)
-        # scale dynamic control
-        cmds.addAttr(dyCtrl, ln="dynamicScale", at="float", dv=1, k=True)
-        for attr in SCALE_ATTRS:
-            cmds.connectAttr("{0}.dynamicScale".format(dyCtrl),
-                             "{0}.{1}".format(dyCtrl, attr))
+        # EN drives the simulation method, off = 0, on = 3
+        for enable, method in ((1, 0), (0, 3)):
+            cmds.setAttr("{0}.EN".format(dyCtrl), enable)
+            cmds.setAttr("{0}Shape.simulationMethod".format(hairSys), method)
+            cmds.setDrivenKeyframe("{0}Shape.simulationMethod".format(hairSys),
+                                   "{0}.EN".format(dyCtrl))
 
-    def _display_attributes(self, attribute, group, control):
+    def _control_schema(self):
         """
-        Set's the show and hide attributes for the dynamic and locator controls.
+        Schema of the control attributes, visibility and scale of the
+        locators and the dynamic control.
         """
-        # show/hide controls
-        cmds.addAttr(control, ln=attribute, at="long",
-                     dv=1,min=0, max=1, k=True)
+        schema = attr_schema.Schema()
+        schema.header("control", "Settings")
 
-        # hide locators
-        cmds.connectAttr("{0}.{1}".format(control, attribute),
-                         "{0}.visibility".format(group))
+        # show/hide and scale locators
+        schema.add("locatorVis", "long", default=1, minimum=0, maximum=1,
+                   connect=["{0}.visibility".format(self.fk_group)])
+        schema.add("locatorScale", default=1)
+        for control in self.fk_controls:
+            for attr in LOCAL_SCALE_ATTRS:
+                schema.connect("{node}.locatorScale",
+                               "{0}Shape.{1}".format(control, attr))
+
+        # show/hide and scale dynamic control
+        schema.add("dynamicVis", "long", default=1, minimum=0, maximum=1,
+                   connect=["{node}.visibility"])
+        schema.add("dynamicScale", default=1)
+        for attr in SCALE_ATTRS:
+            schema.connect("{node}.dynamicScale", "{node}." + attr)
+        return schema
 
     def distribute(self):
         """
@@ -710,7 +1446,8 @@ class OverlapTool(object):
         cmds.select(cl=True)
         cmds.select(self.motion_parent)
         cmds.select(self.curve, add=True)
-        cmds.pathAnimation(su=self.start_frame, eu=self.end_frame)
+        self.motion_path = cmds.pathAnimation(su=self.start_frame,
+                                              eu=self.end_frame)
 
         # lock and hide attributes on dynamic control
         for attr in ATTRS:
@@ -724,9 +1461,9 @@ class OverlapTool(object):
         """
         Creates a network node to hold the meta data for the rig.
         """
-        network_node = cmds.createNode("network")
         meta_node_name = self._get_unique_name("metaNode", "DyMETA")
-        meta_node = cmds.rename(network_node, meta_node_name)
+        meta_node = meta_utils.create(META_TYPE, dict(), meta_node_name)
+        self.meta_node = meta_node
         data = {
                 "rootGroup" : self.root_group,
                 "rigName" : self.rig_name,
@@ -737,17 +1474,12 @@ class OverlapTool(object):
                 "endFrame" : self.end_frame,
                 "dynamicControl" : self.dynamic_control,
                 "metaNode" : meta_node,
-                "hairSystem" : self.hair_system}
+                "hairSystem" : self.hair_system,
+                "follicle" : self.follicle,
+                "nucleus" : self.nucleus,
+                "motionPath" : self.motion_path}
         # build data
-        for meta, data in data.iteritems():
-            if meta == "controls":
-                cmds.addAttr(meta_node, dt="stringArray", ln=meta)
-                cmds.setAttr("{0}.{1}".format(meta_node, meta),
-                             *([len(data)]+data), type="stringArray")
-                continue
-            cmds.addAttr(meta_node, dt="string", ln=meta)
-            cmds.setAttr("{0}.{1}".format(meta_node, meta),
-                         data, type="string")
+        meta_utils.write(meta_node, data)
 
     def _get_unique_name(self, obj_type, suffix):
         """
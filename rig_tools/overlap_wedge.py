@@ -0,0 +1,256 @@
+#!/usr/bin/python
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Wedging for the overlap tool.
+
+    Builds variants of the dynamic settings over user picked ranges and
+    solves them in parallel worker processes (mayapy, or any python with
+    numpy) with the offline Verlet solver. Results land in a WedgeStore,
+    one compact float32 array of joint trajectories for all variants,
+    which the overlap tool previews side by side and applies from.
+
+    Nothing in here touches Maya, the worker side runs this file as a
+    script:
+        mayapy overlap_wedge.py job.npz result.npz
+
+:use:
+    from rig_tools import overlap_wedge
+    variants = overlap_wedge.build_variants(settings, {"drag": (0, .2)}, 3)
+    positions = overlap_wedge.run(goals, variants, point_lock=0)
+
+:see also:
+    rig_tools/overlap_solver.py
+    rig_tools/overlap_tool.py
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import sys
+import json
+import time
+import shutil
+import itertools
+import subprocess
+import tempfile
+import multiprocessing
+
+# third party
+try:
+    import numpy
+except ImportError:
+    pass
+
+# internal
+try:
+    from rig_tools import overlap_solver
+except ImportError:
+    # worker process, run as a script
+    import overlap_solver
+
+#------------------------------------------------------------------------------#
+#----------------------------------------------------------------- FUNCTIONS --#
+
+def build_variants(settings, ranges, steps=3):
+    """
+    Grid of settings over the given ranges.
+    @params:
+        settings: Base settings, see overlap_solver.settings_from_attributes.
+        ranges: Dict of setting: (min, max), i.e., {"drag": (0, 0.2)}.
+        steps: Samples per range.
+    """
+    names = sorted(ranges)
+    samples = list()
+    for name in names:
+        low, high = ranges[name]
+        samples.append(numpy.linspace(low, high, steps).tolist())
+
+    variants = list()
+    for values in itertools.product(*samples):
+        variant = dict(settings)
+        variant.update(zip(names, values))
+        variants.append(variant)
+    return variants
+
+def python_executable():
+    """
+    The interpreter for worker processes, mayapy when run inside Maya.
+    """
+    executable = sys.executable
+    name = os.path.basename(executable).lower()
+    if name.startswith("maya") and not name.startswith("mayapy"):
+        extension = os.path.splitext(executable)[1]
+        executable = os.path.join(os.path.dirname(executable),
+                                  "mayapy" + extension)
+    return executable
+
+def start_worker(path, *args):
+    """
+    Starts a worker process running a module file as a script, with the
+    pipe's root on its path. From the pipe archive there is no file to
+    run, the module is run from inside the archive with -m.
+    @params:
+        path: The module's __file__.
+        args: Script arguments.
+    """
+    script = os.path.abspath(path)
+    if script.endswith((".pyc", ".pyo")):
+        script = script[:-1]
+    directory, name = os.path.split(script)
+
+    # the worker imports pipe_utils too
+    environment = dict(os.environ)
+    paths = [directory, os.path.dirname(directory)]
+    if environment.get("PYTHONPATH"):
+        paths.append(environment["PYTHONPATH"])
+    environment["PYTHONPATH"] = os.pathsep.join(paths)
+
+    if os.path.isfile(script):
+        command = [python_executable(), script]
+    else:
+        command = [python_executable(), "-m", os.path.splitext(name)[0]]
+    return subprocess.Popen(command + list(args), env=environment)
+
+def run(goals, variants, point_lock=0, workers=None, local=False):
+    """
+    Solves every variant, returns positions (variants, frames, chains,
+    joints, 3) as float32.
+    @params:
+        goals: Input world positions (frames, chains, joints, 3).
+        variants: List of settings, see build_variants.
+        point_lock: "base" = 0, "both-ends" = 1.
+        workers: Worker process count, defaults to the cpu count.
+        local: Solve in this process instead, no workers.
+    """
+    if local:
+        return solve_variants(goals, variants, point_lock)
+
+    if not workers:
+        workers = multiprocessing.cpu_count()
+    workers = max(min(workers, len(variants)), 1)
+
+    # one job per worker, process start up is the expensive part
+    chunks = [range(count, len(variants), workers) for count in
+              xrange(workers)]
+    directory = tempfile.mkdtemp(prefix="overlap_wedge_")
+    try:
+        processes = list()
+        for count, chunk in enumerate(chunks):
+            job = os.path.join(directory, "job{0}.npz".format(count))
+            result = os.path.join(directory, "result{0}.npz".format(count))
+            write_job(job, goals, [variants[i] for i in chunk], point_lock)
+            process = start_worker(__file__, job, result)
+            processes.append((process, result, chunk))
+
+        positions = None
+        for process, result, chunk in processes:
+            if process.wait() != 0:
+                raise RuntimeError("Wedge worker failed: {0}".format(result))
+            data = numpy.load(result)["positions"]
+            if positions is None:
+                positions = numpy.empty((len(variants),) + data.shape[1:],
+                                        dtype=numpy.float32)
+            positions[chunk] = data
+        return positions
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def solve_variants(goals, variants, point_lock=0):
+    """
+    Solves the variants one after the other in this process.
+    """
+    goals = numpy.asarray(goals, dtype=float)
+    positions = numpy.empty((len(variants),) + goals.shape,
+                            dtype=numpy.float32)
+    for count, variant in enumerate(variants):
+        positions[count] = overlap_solver.solve(goals, variant, point_lock)
+    return positions
+
+def write_job(path, goals, variants, point_lock):
+    """
+    Writes a worker job file.
+    """
+    numpy.savez(path, goals=numpy.asarray(goals, dtype=float),
+                variants=json.dumps(variants), point_lock=point_lock)
+
+def _worker(job, result):
+    """
+    Worker process entry point.
+    """
+    data = numpy.load(job)
+    variants = json.loads(str(data["variants"]))
+    point_lock = int(data["point_lock"])
+    positions = solve_variants(data["goals"], variants, point_lock)
+    numpy.savez(result, positions=positions)
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class WedgeStore(object):
+    """
+    Compact store of a wedge, everything needed to preview and apply it.
+        controls: The wedged FK controls, root to tip.
+        times: Frames.
+        variants: List of settings.
+        ranges: The wedged settings and their ranges.
+        world, parent: Sampled input matrices (frames, 1, joints, 4, 4).
+        positions: Solved joints (variants, frames, 1, joints, 3), float32.
+    """
+    def __init__(self, controls=None, times=None, variants=None, ranges=None,
+                 world=None, parent=None, positions=None):
+        self.controls = controls or list()
+        self.times = times or list()
+        self.variants = variants or list()
+        self.ranges = ranges or dict()
+        self.world = world
+        self.parent = parent
+        self.positions = positions
+        self.created = time.time()
+
+    def label(self, index):
+        """
+        Short description of a variant, i.e., "03: drag=0.1 damp=0.2".
+        """
+        variant = self.variants[index]
+        values = ["{0}={1:.3g}".format(name, variant[name]) for name
+                  in sorted(self.ranges)]
+        return "{0:02d}: {1}".format(index, " ".join(values))
+
+    def save(self, path):
+        """
+        Saves the store as a compressed npz.
+        """
+        header = {"controls": self.controls, "times": self.times,
+                  "variants": self.variants, "ranges": self.ranges,
+                  "created": self.created}
+        numpy.savez_compressed(path, header=json.dumps(header),
+                               world=self.world, parent=self.parent,
+                               positions=self.positions)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a store saved with save().
+        """
+        data = numpy.load(path)
+        header = json.loads(str(data["header"]))
+        store = cls(header["controls"], header["times"], header["variants"],
+                    header["ranges"], data["world"], data["parent"],
+                    data["positions"])
+        store.created = header["created"]
+        return store
+
+#------------------------------------------------------------------------------#
+#---------------------------------------------------------------------- MAIN --#
+
+if __name__ == "__main__":
+    _worker(sys.argv[1], sys.argv[2])
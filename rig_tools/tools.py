@@ -16,10 +16,16 @@
 
 # third party
 import pymel.core as pm
-from maya import cmds, mel
+from maya import cmds, mel, OpenMaya
 
 # external
-from pipe_utils.name_utils import NameUtils
+from pipe_utils.decorators import undo
+from pipe_utils.name_utils import NameUtils, NameIndex
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+TWIST_PLUGINS = ("matrixNodes", "quatNodes")
 
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
@@ -99,6 +105,105 @@ class RigTools(object):
         # TODO: apply aim constraint using aim axis
         # perhaps the aim constraint would work better.
 
+    @classmethod
+    @undo
+    def build_twist_chains(cls, specs, asset="asset", side="ud", part="limb",
+                           suffix="twistJnt"):
+        """
+        Builds twist joints for many limbs in one undo chunk.
+        Returns {start joint: [twist joints]}.
+        @ARGS:
+            specs: List of (start joint, end joint, count).
+            asset, side, part, suffix (see pipe_utils.name_utils.NameUtils)
+        NOTES:
+            specs = [("lowerarm_l", "hand_l", 3), ("lowerarm_r", "hand_r", 3),
+                     ("calf_l", "foot_l", 2), ("calf_r", "foot_r", 2)]
+            tools.RigTools.build_twist_chains(specs, "kong")
+
+            The twist of the end joint is read off its matrix relative to
+            the start joint (swing/twist split of the quaternion) and
+            shared out by weight, one node network per limb instead of an
+            orientConstraint per twist joint.
+        """
+        for plugin in TWIST_PLUGINS:
+            cmds.loadPlugin(plugin, qt=True)
+
+        index = NameIndex()
+        twist_chains = dict()
+        for start_joint, end_joint, count in specs:
+            # positions and weights, evenly spread between the two joints
+            offset = cmds.getAttr("{0}.t".format(end_joint))[0]
+            weights = [float(value) / (count + 1) for value in
+                       xrange(1, count + 1)]
+
+            twist_joints = list()
+            for weight in weights:
+                name = index.get_unique_name(asset, side, part, suffix)
+                joint = cmds.createNode("joint", n=name, p=start_joint)
+                cmds.setAttr("{0}.t".format(joint),
+                             *[value * weight for value in offset])
+                twist_joints.append(joint)
+
+            # end twist relative to the start, rest pose removed
+            rest = cls._relative_matrix(end_joint, start_joint).inverse()
+            mult = cmds.createNode("multMatrix",
+                                   n=index.get_unique_name(asset, side, part,
+                                                           "twistMM"))
+            cmds.connectAttr("{0}.worldMatrix[0]".format(end_joint),
+                             "{0}.matrixIn[0]".format(mult))
+            cmds.connectAttr("{0}.worldInverseMatrix[0]".format(start_joint),
+                             "{0}.matrixIn[1]".format(mult))
+            cmds.setAttr("{0}.matrixIn[2]".format(mult),
+                         [rest(row, column) for row in xrange(4)
+                          for column in xrange(4)], type="matrix")
+            decompose = cmds.createNode("decomposeMatrix",
+                                        n=index.get_unique_name(
+                                            asset, side, part, "twistDM"))
+            cmds.connectAttr("{0}.matrixSum".format(mult),
+                             "{0}.inputMatrix".format(decompose))
+
+            # twist only, x and w of the quaternion
+            normalize = cmds.createNode("quatNormalize",
+                                        n=index.get_unique_name(
+                                            asset, side, part, "twistQN"))
+            for axis in "XW":
+                cmds.connectAttr("{0}.outputQuat{1}".format(decompose, axis),
+                                 "{0}.inputQuat{1}".format(normalize, axis))
+            euler = cmds.createNode("quatToEuler",
+                                    n=index.get_unique_name(asset, side, part,
+                                                            "twistQE"))
+            cmds.connectAttr("{0}.outputQuat".format(normalize),
+                             "{0}.inputQuat".format(euler))
+
+            # weights, three joints per multiplyDivide
+            for first in xrange(0, count, 3):
+                multiply = cmds.createNode("multiplyDivide",
+                                           n=index.get_unique_name(
+                                               asset, side, part, "twistMD"))
+                for axis, joint, weight in zip("XYZ", twist_joints[first:],
+                                               weights[first:]):
+                    cmds.connectAttr("{0}.outputRotateX".format(euler),
+                                     "{0}.input1{1}".format(multiply, axis))
+                    cmds.setAttr("{0}.input2{1}".format(multiply, axis),
+                                 weight)
+                    cmds.connectAttr("{0}.output{1}".format(multiply, axis),
+                                     "{0}.rx".format(joint))
+            twist_chains[start_joint] = twist_joints
+        return twist_chains
+
+    @classmethod
+    def _relative_matrix(cls, joint, parent):
+        """
+        Returns the world matrix of joint in the space of parent (MMatrix).
+        """
+        matrices = list()
+        for node in (joint, parent):
+            values = cmds.getAttr("{0}.worldMatrix[0]".format(node))
+            matrix = OpenMaya.MMatrix()
+            OpenMaya.MScriptUtil.createMatrixFromList(values, matrix)
+            matrices.append(matrix)
+        return matrices[0] * matrices[1].inverse()
+
     @classmethod
     def build_stretchy_limb(cls):
         """
@@ -27,22 +27,35 @@ if separator != '/':
     root_path = root_path.replace(os.sep, '/')
 
 
+# running from the pipe archive (see system_tools/package_builder), the
+# resources are read from where userSetup extracted them
+ARCHIVE = not os.path.isdir(root_path)
+RESOURCE_ENV = "ABC_PIPE_RESOURCES"
+resource_path = root_path
+if ARCHIVE:
+    resource_path = os.environ.get(RESOURCE_ENV, root_path)
+
 # directories
 RIG_TOOLS = root_path + 'rig_tools/'
-MODULES = root_path + 'modules/'
-IMAGES = root_path + 'images/'
+MODULES = resource_path + 'modules/'
+IMAGES = resource_path + 'images/'
 PIPE_UI = root_path + 'pipe_ui/'
 PIPE_CORE = root_path + 'pipe_core/'
 PIPE_UTILS = root_path + 'pipe_utils/'
-MEL = root_path + "mel/"
+MEL = resource_path + "mel/"
 ICONS = IMAGES + "icons/"
 THIRD_PARTY = root_path + "third_party/"
-SHELVES = PIPE_UI + "shelves/"
+SHELVES = resource_path + "pipe_ui/shelves/"
+PLUGINS = resource_path + "plugins/"
 
 # dir tuple
 directories = (RIG_TOOLS, PIPE_UTILS, MODULES, IMAGES, PIPE_UI, PIPE_CORE,
                MEL, ICONS, SHELVES, THIRD_PARTY)
 
+# directories holding python, imported through pipe_core/import_index.py
+code_directories = (RIG_TOOLS, PIPE_UTILS, MODULES, PIPE_UI, PIPE_CORE,
+                    THIRD_PARTY)
+
 # sides
 sides = ['c', 'l', 'r']
 
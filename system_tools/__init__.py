@@ -15,8 +15,8 @@
     root module 'telims_pipe'.
 
 This __init__ is for transport. If placed in maya/scripts directory, you
-can simply: import telims_pipe. This __init__ will automatically append
-the path to rigging_tools inside the sys.path list.
+can simply: import telims_pipe. This __init__ will automatically make the
+pipe importable, through the import index (see pipe_core/import_index.py).
 """
 
 #------------------------------------------------------------------------------#
@@ -32,10 +32,9 @@ import settings
 #------------------------------------------------------------------------------#
 #--------------------------------------------------------------------- START --#
 
-# add telims_pipe to the PYTHONPATH variable for this session
-sys.path.append(settings.root_path)
-for directory in settings.directories:
-    sys.path.append(directory)
+# serve the pipe's imports from the import index for this session
+from pipe_core import import_index
+import_index.install(cmds.internalVar(upd=True) + import_index.CACHE_FILE)
 
 # reset all modules
 if globals().has_key('init_modules'):
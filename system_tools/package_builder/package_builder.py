@@ -12,6 +12,18 @@
 
 :to use:
     python package_builder.py
+
+:pipe archive:
+    The "pipe archive" format writes one zip Maya imports from directly
+    (zipimport), modules byte-compiled, no loose files on the share:
+        abc_pipe/...          compiled modules (.pyc) and other files
+        resources/...         images, mel, shelves, plugins and module files
+        manifest.json         root name, build id, resource list
+    userSetup extracts the resources to a local cache once per build, as
+    Maya can't read MEL, icons or images out of a zip. Build it with the
+    Python of the target Maya (mayapy), compiled files are version bound.
+
+        build_archive("D:/tools/abc_pipe", "D:/dist/abc_pipe.zip")
 """
 
 #------------------------------------------------------------------------------#
@@ -19,7 +31,8 @@
 
 # built-in
 import os, sys, shutil, errno, json
-from zipfile import ZipFile, ZIP_DEFLATED
+import imp, marshal, struct, time, hashlib
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
 
 # third-party
 from PySide import QtGui, QtCore
@@ -29,6 +42,13 @@ from PySide import QtGui, QtCore
 
 SCRIPTS_PATH = "D:/Build/usr/jeremy_ernst/MayaTools"
 
+# pipe archive
+ARCHIVE_MANIFEST = "manifest.json"
+ARCHIVE_RESOURCES = "resources"
+RESOURCE_DIRECTORIES = ("images", "mel", "modules", "pipe_ui/shelves",
+                        "plugins")
+ARCHIVE_SKIP = (".git", ".svn", "tests", "presets")
+
 #------------------------------------------------------------------------------#
 #--------------------------------------------------------------------- UTILS --#
 
@@ -99,6 +119,80 @@ def json_load(path=None):
     data = json.load(fobj)
     return data
 
+def compile_source(path, archive_name):
+    """
+    Byte-compiles a module, returns the .pyc data.
+    @params:
+        path: The .py file.
+        archive_name: Its name in the archive, shown in tracebacks.
+    """
+    with open(path, "rU") as source_file:
+        source = source_file.read()
+    code = compile(source + "\n", archive_name, "exec")
+    mtime = struct.pack("<I", int(os.path.getmtime(path)))
+    return imp.get_magic() + mtime + marshal.dumps(code)
+
+def build_archive(root_directory, archive_path, paths=None):
+    """
+    Writes the pipe archive, returns its manifest.
+    @params:
+        root_directory: The pipe's root, i.e., abc_pipe.
+        archive_path: The zip file.
+        paths: Files to include, defaults to everything under the root.
+    """
+    root_directory = convert_path(os.path.normpath(root_directory))
+    root = os.path.basename(root_directory)
+    if paths is None:
+        paths = list()
+        for directory, dirs, files in os.walk(root_directory):
+            dirs[:] = [name for name in dirs if name not in ARCHIVE_SKIP]
+            paths.extend(os.path.join(directory, name) for name in files)
+
+    relative_paths = list()
+    for path in paths:
+        path = convert_path(os.path.normpath(path))
+        if os.path.isfile(path) and not path.endswith((".pyc", ".pyo")):
+            relative_paths.append(path[len(root_directory) + 1:])
+
+    sha = hashlib.sha1()
+    resources = list()
+    archive = ZipFile(archive_path, "w", ZIP_DEFLATED, True)
+    try:
+        for relative_path in sorted(relative_paths):
+            path = convert_path(os.path.join(root_directory, relative_path))
+            with open(path, "rb") as data_file:
+                data = data_file.read()
+            sha.update(relative_path)
+            sha.update(data)
+
+            archive_name = "{0}/{1}".format(root, relative_path)
+            if relative_path.endswith(".py"):
+                _write_entry(archive, archive_name + "c",
+                             compile_source(path, archive_name))
+            else:
+                _write_entry(archive, archive_name, data)
+
+            # extracted by userSetup, Maya reads these from disk
+            if relative_path.startswith(tuple(directory + "/" for directory
+                                              in RESOURCE_DIRECTORIES)):
+                name = "{0}/{1}".format(ARCHIVE_RESOURCES, relative_path)
+                _write_entry(archive, name, data)
+                resources.append(name)
+
+        manifest = {"root": root, "build": sha.hexdigest()[:12],
+                    "resources": resources, "created": time.time()}
+        _write_entry(archive, ARCHIVE_MANIFEST,
+                     json.dumps(manifest, indent=2, sort_keys=True))
+    finally:
+        archive.close()
+    return manifest
+
+def _write_entry(archive, name, data):
+    info = ZipInfo(name, time.localtime()[:6])
+    info.compress_type = ZIP_DEFLATED
+    info.external_attr = 0644 << 16
+    archive.writestr(info, data)
+
 #------------------------------------------------------------------------------#
 #------------------------------------------------------------------- CLASSES --#
 
@@ -284,9 +378,9 @@ class PackageBuilderWidget(QtGui.QFrame):
         self.format = QtGui.QComboBox()
         self.format.setEditable(True)
         self.format.lineEdit().setAlignment(QtCore.Qt.AlignCenter)
-        for option in ["zip", "-- None --"]:
+        for option in ["zip", "pipe archive", "-- None --"]:
             self.format.addItem(option)
-        self.format.setCurrentIndex(1)
+        self.format.setCurrentIndex(2)
         name_layout.addWidget(name_label)
         name_layout.addWidget(self.name_line)
         name_layout.addWidget(format_label)
@@ -543,6 +637,11 @@ class PackageBuilderWidget(QtGui.QFrame):
                 new_path = convert_path("{0}/{1}".format(root, new_path))
                 archive.write(path, new_path)
             archive.close()
+        # or build the pipe archive, see build_archive
+        elif file_format == "pipe archive":
+            archive_path = convert_path("{0}/{1}.zip".format(out_path, name))
+            build_archive(self.root_directory, archive_path,
+                          list(self.package_container.itervalues()))
         self.notification.setText("Process Complete!")
 
     def _delete_item(self):
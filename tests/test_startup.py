@@ -0,0 +1,91 @@
+#------------------------------------------------------------------------------#
+#-------------------------------------------------------------------- HEADER --#
+
+"""
+:author:
+    acarlisle
+
+:description:
+    Startup tests, building the ABC menu must not import any tool.
+
+:use:
+    mayapy -m unittest discover -s tests
+"""
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- IMPORTS --#
+
+# built-in
+import os
+import sys
+import time
+import unittest
+
+# third-party
+try:
+    from maya import cmds
+    MAYA = True
+except ImportError:
+    MAYA = False
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# heavy imports the menu has to leave for later
+HEAVY_MODULES = ("pymel.core", "PySide", "maya.app.general.mayaMixin")
+
+# seconds, importing and building the menu
+MENU_BUDGET = 0.5
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+@unittest.skipUnless(MAYA, "needs mayapy")
+class TestMenuStartup(unittest.TestCase):
+    """
+    abc_menu at startup.
+    """
+    @classmethod
+    def setUpClass(cls):
+        if ROOT not in sys.path:
+            sys.path.append(ROOT)
+        # cmds is empty in mayapy until standalone is up
+        if not hasattr(cmds, "about"):
+            import maya.standalone
+            maya.standalone.initialize()
+
+    def setUp(self):
+        sys.modules.pop("pipe_ui.menus.abc_menu", None)
+        self.before = set(sys.modules)
+
+    def _new_modules(self):
+        return set(sys.modules) - self.before
+
+    def test_import_loads_no_tools(self):
+        start = time.time()
+        from pipe_ui.menus import abc_menu
+        # interactive Maya only, standalone has no main window
+        if not cmds.about(batch=True):
+            abc_menu.abc_menu()
+        elapsed = time.time() - start
+
+        loaded = self._new_modules()
+        for label, module_name, class_name, method in abc_menu.TOOLS:
+            self.assertNotIn(module_name, loaded)
+        for module_name in HEAVY_MODULES:
+            self.assertNotIn(module_name, loaded)
+        self.assertLess(elapsed, MENU_BUDGET)
+
+    def test_registry_modules_exist(self):
+        from pipe_ui.menus import abc_menu
+        for label, module_name, class_name, method in abc_menu.TOOLS:
+            path = os.path.join(ROOT, *module_name.split(".")) + ".py"
+            self.assertTrue(os.path.exists(path), path)
+
+#------------------------------------------------------------------------------#
+#---------------------------------------------------------------------- MAIN --#
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,27 @@
 
 :NOTE:
     No internal or external imports, it'll break the userSetup.
+
+:session:
+    The pipeline is set up once per session, on the first new scene. The
+    abc_setup.txt path is resolved once, environment paths are only
+    added when missing, and the scene job is removed once setup is done.
+
+:archive:
+    The pipe can run from the archive system_tools/package_builder makes
+    (one zip of compiled modules). Point ABC_PIPE_ARCHIVE, or abc_setup.txt,
+    at the zip. It is imported from with zipimport, its resources (images,
+    mel, shelves, module files) are extracted to the user app directory
+    once per build and settings reads them from there.
+
+:profiling:
+    Set ABC_PROFILE_STARTUP=1 before launching Maya to time the pipeline
+    bootstrap. Every import and setup step is recorded with its wall time
+    and memory, and written to the user prefs directory as folded stacks
+    (flamegraph.pl, speedscope), one file for time (microseconds) and one
+    for memory (kilobytes), named after the host:
+        abc_startup_<host>_<date>_time.folded
+        abc_startup_<host>_<date>_memory.folded
 """
 
 #------------------------------------------------------------------------------#
@@ -18,13 +39,220 @@
 # built-in
 import os
 import sys
+import time
+import json
+import timeit
+import socket
+import zipfile
+import __builtin__
+try:
+    import resource
+except ImportError:
+    resource = None
 
 # third-party
 from maya import cmds, mel
 
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- GLOBALS --#
+
+PROFILE_ENV = "ABC_PROFILE_STARTUP"
+SETUP_FILE = "abc_setup.txt"
+
+# pipe archive, see system_tools/package_builder
+ARCHIVE_ENV = "ABC_PIPE_ARCHIVE"
+RESOURCE_ENV = "ABC_PIPE_RESOURCES"
+ARCHIVE_MANIFEST = "manifest.json"
+ARCHIVE_RESOURCES = "resources"
+ARCHIVE_CACHE = "abc_pipe_cache"
+
+# session state, kept if userSetup is reloaded
+INITIALIZED = globals().get("INITIALIZED", False)
+SCRIPT_JOB = globals().get("SCRIPT_JOB")
+RESOLVED = globals().get("RESOLVED", dict())
+
+#------------------------------------------------------------------------------#
+#------------------------------------------------------------------- CLASSES --#
+
+class StartupProfiler(object):
+    """
+    Records wall time and memory of imports and setup steps as folded
+    stacks, self values only, the way flame graphs sum them.
+    """
+    def __init__(self):
+        # frame: [name, start time, start memory, child time, child memory]
+        self.stack = list()
+        self.samples = dict()
+        self.original_import = None
+
+    def start(self):
+        self.original_import = __builtin__.__import__
+        __builtin__.__import__ = self._import
+
+    def stop(self):
+        if self.original_import:
+            __builtin__.__import__ = self.original_import
+            self.original_import = None
+
+    def step(self, name, function, *args, **kwargs):
+        """
+        Runs a function as a named step.
+        """
+        self._push(name)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._pop()
+
+    def write(self, directory):
+        """
+        Writes the time and memory reports, returns their paths.
+        """
+        name = "abc_startup_{0}_{1}".format(socket.gethostname(),
+                                            time.strftime("%Y%m%d_%H%M%S"))
+        paths = list()
+        for count, (kind, scale) in enumerate((("time", 1000000),
+                                                ("memory", 1))):
+            path = os.path.join(directory, "{0}_{1}.folded".format(name, kind))
+            with open(path, "w") as report:
+                for stack in sorted(self.samples):
+                    value = int(self.samples[stack][count] * scale)
+                    if value > 0:
+                        report.write("{0} {1}\n".format(stack, value))
+            paths.append(path)
+        return paths
+
+    def _import(self, name, *args, **kwargs):
+        # only imports that load something
+        if name in sys.modules:
+            return self.original_import(name, *args, **kwargs)
+        self._push("import " + name)
+        try:
+            return self.original_import(name, *args, **kwargs)
+        finally:
+            self._pop()
+
+    def _push(self, name):
+        self.stack.append([name, timeit.default_timer(), get_memory(), 0.0,
+                           0])
+
+    def _pop(self):
+        name, start_time, start_memory, child_time, child_memory = \
+            self.stack[-1]
+        stack = ";".join(frame[0] for frame in self.stack)
+        self.stack.pop()
+
+        total_time = timeit.default_timer() - start_time
+        total_memory = max(get_memory() - start_memory, 0)
+        sample = self.samples.setdefault(stack, [0.0, 0])
+        sample[0] += total_time - child_time
+        sample[1] += max(total_memory - child_memory, 0)
+        if self.stack:
+            self.stack[-1][3] += total_time
+            self.stack[-1][4] += total_memory
+
+PROFILER = None
+if os.environ.get(PROFILE_ENV):
+    PROFILER = StartupProfiler()
+    PROFILER.start()
+
 #------------------------------------------------------------------------------#
 #----------------------------------------------------------------- FUNCTIONS --#
 
+def get_memory():
+    """
+    Peak memory of the process in kilobytes, 0 where it can't be read.
+    """
+    if resource:
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on mac
+        if sys.platform == "darwin":
+            memory /= 1024
+        return memory
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / 1024
+    except ImportError:
+        return 0
+
+def profile_step(name, function, *args, **kwargs):
+    """
+    Runs a setup step, through the profiler when it's on.
+    """
+    if PROFILER:
+        return PROFILER.step(name, function, *args, **kwargs)
+    return function(*args, **kwargs)
+
+def write_profile():
+    """
+    Stops the profiler and writes its reports to the user prefs.
+    """
+    global PROFILER
+    if not PROFILER:
+        return
+    PROFILER.stop()
+    paths = PROFILER.write(cmds.internalVar(upd=True))
+    PROFILER = None
+    print "ABC startup profile: {0}".format(", ".join(paths))
+
+def get_pipe_path():
+    """
+    Returns the abc_pipe path, the archive from ABC_PIPE_ARCHIVE or the
+    path in abc_setup.txt, read once per session.
+    """
+    if "pipe_path" not in RESOLVED:
+        path = cmds.internalVar(upd=True) + SETUP_FILE
+        pipe_path = os.environ.get(ARCHIVE_ENV)
+        if not pipe_path and os.path.exists(path):
+            with open(path, 'r') as setup_file:
+                pipe_path = setup_file.readline().strip()
+        RESOLVED["pipe_path"] = pipe_path
+    return RESOLVED["pipe_path"]
+
+def add_env_path(variable, path):
+    """
+    Adds a path to an environment variable once, dropping repeats.
+    """
+    paths = list()
+    for value in os.environ.get(variable, "").split(os.pathsep) + [path]:
+        if value and value not in paths:
+            paths.append(value)
+    os.environ[variable] = os.pathsep.join(paths)
+
+def add_sys_path(path):
+    if path not in sys.path:
+        sys.path.append(path)
+
+def setup_archive(archive):
+    """
+    Extracts the archive's resources to the local cache, once per build,
+    returns the pipe's root inside the archive.
+    """
+    archive = archive.replace(os.sep, "/")
+    zip_file = zipfile.ZipFile(archive)
+    try:
+        manifest = json.loads(zip_file.read(ARCHIVE_MANIFEST))
+        cache = os.path.join(cmds.internalVar(uad=True), ARCHIVE_CACHE,
+                             manifest["build"])
+        # written last, a partial extraction is done again
+        done = os.path.join(cache, ARCHIVE_MANIFEST)
+        if not os.path.exists(done):
+            for name in manifest["resources"]:
+                zip_file.extract(name, cache)
+            with open(done, "w") as manifest_file:
+                json.dump(manifest, manifest_file)
+    finally:
+        zip_file.close()
+
+    resources = os.path.join(cache, ARCHIVE_RESOURCES).replace(os.sep, "/")
+    os.environ[RESOURCE_ENV] = resources + "/"
+
+    # import abc_pipe from the archive, the rest from its root
+    root = "{0}/{1}".format(archive, manifest["root"])
+    add_sys_path(archive)
+    add_sys_path(root + "/third_party")
+    return root
+
 def abc_setup_ui():
     """
     UI setup for abc pipe.
@@ -72,12 +300,13 @@ def browse(*args):
 
     # build txt file containing path
     cmds.deleteUI("abc_setup_ui")
-    path = cmds.internalVar(upd = True) + "abc_setup.txt"
+    path = cmds.internalVar(upd = True) + SETUP_FILE
 
     # write
     f = open(path, 'w')
     f.write(abc_pipe_dir)
     f.close()
+    RESOLVED["pipe_path"] = abc_pipe_dir
 
     # setup menu
     abc_pipe_setup()
@@ -90,20 +319,38 @@ def cancel(*args):
 
 def abc_pipe_setup():
     """
-    Adds abc_pipe to PYTHON path variable.
+    Adds abc_pipe to PYTHON path variable, once per session.
     """
-    path = cmds.internalVar(upd=True) + "abc_setup.txt"
-    if os.path.exists(path):
-        f = open(path, 'r')
-        path = f.readline()
-        if os.path.exists(path):
-            if not path in sys.path:
-                sys.path.append(path)
+    global INITIALIZED
+    if INITIALIZED:
+        return
+
+    path = get_pipe_path()
+    if not path or not os.path.exists(path):
+        return abc_setup_ui()
+    # a failed step must not leave the import hook in place
+    try:
+        if zipfile.is_zipfile(path):
+            path = profile_step("setup_archive", setup_archive, path)
+        add_sys_path(path)
 
         # run setup
-        setup_menus()
-    else:
-        abc_setup_ui()
+        profile_step("setup_menus", setup_menus)
+        INITIALIZED = True
+        remove_script_job()
+    finally:
+        write_profile()
+
+def remove_script_job():
+    """
+    Kills the scene job after the setup, deferred as it may be running it.
+    """
+    global SCRIPT_JOB
+    if SCRIPT_JOB is None:
+        return
+    job = SCRIPT_JOB
+    SCRIPT_JOB = None
+    cmds.evalDeferred(lambda: cmds.scriptJob(kill=job, force=True))
 
 def setup_menus():
     """
@@ -114,15 +361,21 @@ def setup_menus():
     import settings
 
     # setup environment
-    sys.path.append(settings.THIRD_PARTY)
-    os.environ["MAYA_SCRIPT_PATH"] += str(";" + settings.MEL)
-    os.environ["XBMLANGPATH"] += str(";" + settings.ICONS)
+    profile_step("environment", setup_environment, settings)
 
     # abc menu
     from pipe_ui.menus import abc_menu
-    mel.eval("source cometMenu.mel;")
-    menu = abc_menu.abc_menu()
+    profile_step("source cometMenu.mel", mel.eval, "source cometMenu.mel;")
+    menu = profile_step("abc_menu", abc_menu.abc_menu)
+
+def setup_environment(settings):
+    """
+    Adds the MEL and icon paths, python comes from the import index.
+    """
+    add_env_path("MAYA_SCRIPT_PATH", settings.MEL)
+    add_env_path("XBMLANGPATH", settings.ICONS)
 
 
 # script job
-script_job = cmds.scriptJob(event=["NewSceneOpened", abc_pipe_setup])
+if not INITIALIZED and SCRIPT_JOB is None:
+    SCRIPT_JOB = cmds.scriptJob(event=["NewSceneOpened", abc_pipe_setup])